@@ -8,8 +8,10 @@ from fastapi.responses import RedirectResponse
 from api.dependencies import ALGORITHM, SECRET_KEY, get_current_user, get_db
 from api.users import is_admin
 from app.config import get_settings
+from app.database import get_collection
 from app.limiter import limiter
-from app.security import pwd_context
+from app.principal_cache import invalidate_user
+from app.security import password_hasher
 from models.auth import ForgotPasswordRequest, ResetPasswordRequest
 from models.login import LoginModel
 from models.users import User
@@ -40,16 +42,34 @@ def create_access_token(data: dict, expires_delta: timedelta):
     return encoded_jwt
 
 
+def build_token_claims(user: dict) -> dict:
+    """
+    Build the claims embedded in a user's access token. In claims mode the token
+    also carries the user id, roles and token version so role checks can run
+    without loading the user document.
+    """
+    claims = {"sub": user["username"]}
+    if settings.JWT_CLAIMS_MODE:
+        claims.update(
+            {
+                "uid": str(user["_id"]),
+                "roles": user.get("roles", []),
+                "ver": user.get("token_version", 0),
+            }
+        )
+    return claims
+
+
 @router.post("/login", status_code=status.HTTP_200_OK)
 @limiter.limit("10/minute")
 async def login_user(request: Request, user: LoginModel, db=Depends(get_db)):
     """Login a user"""
-    user_collection = db["users"]
+    user_collection = get_collection(db, "users")
     found_user = await user_collection.find_one({"username": user.username})
 
     if found_user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    elif not pwd_context.verify(
+    elif not await password_hasher.verify(
         user.password if user.password else "", found_user["password"]
     ):
         raise HTTPException(status_code=401, detail="Incorrect password")
@@ -57,7 +77,7 @@ async def login_user(request: Request, user: LoginModel, db=Depends(get_db)):
     # Convert found_user to User model and remove its password from the response
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data=build_token_claims(found_user), expires_delta=access_token_expires
     )
     return {
         "token": access_token,
@@ -107,7 +127,7 @@ async def auth_google(request: Request, db=Depends(get_db)):
     if not email:
         raise HTTPException(status_code=400, detail="Email not provided by Google")
 
-    user_collection = db["users"]
+    user_collection = get_collection(db, "users")
     user = await user_collection.find_one({"email": email})
 
     if not user:
@@ -131,7 +151,7 @@ async def auth_google(request: Request, db=Depends(get_db)):
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user["username"]}, expires_delta=access_token_expires
+        data=build_token_claims(user), expires_delta=access_token_expires
     )
 
     is_admin = "admin" in user.get("roles", [])
@@ -148,7 +168,7 @@ async def forgot_password(
     Initiate password reset process.
     Note: For MVP, this logs the link to console instead of sending email.
     """
-    user_collection = db["users"]
+    user_collection = get_collection(db, "users")
     user = await user_collection.find_one({"email": body.email})
 
     if not user:
@@ -203,7 +223,7 @@ async def reset_password(
     request: Request, body: ResetPasswordRequest, db=Depends(get_db)
 ):
     """Reset password using a valid token"""
-    user_collection = db["users"]
+    user_collection = get_collection(db, "users")
 
     # Find user with matching token and valid expiration
     user = await user_collection.find_one(
@@ -219,14 +239,16 @@ async def reset_password(
         )
 
     # Update password and clear token
-    new_password_hash = pwd_context.hash(body.new_password)
+    new_password_hash = await password_hasher.hash(body.new_password)
 
     await user_collection.update_one(
         {"_id": user["_id"]},
         {
             "$set": {"password": new_password_hash},
             "$unset": {"reset_token": "", "reset_token_expires": ""},
+            "$inc": {"token_version": 1},
         },
     )
+    invalidate_user(str(user["_id"]))
 
     return {"message": "Password reset successfully"}
@@ -1,30 +1,64 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, Query, Request, status
 
-from api.dependencies import RoleChecker, get_card_service, get_current_user
-from api.users import is_admin
+from api.dependencies import RoleChecker, get_card_service
+from app.catalog_version import conditional_get
 from app.limiter import limiter
 from models.cards import Card
 from models.py_object_id import PyObjectId
 from models.update_card import UpdateCard
-from models.users import User
-from services.cards import CardService
+from services.cards import IMPORT_CHUNK_SIZE, CardService
+from utils.pagination import MAX_PAGE_SIZE, CursorPage
+from utils.projection import (
+    FIELDS_DESCRIPTION,
+    parse_fields,
+    partial_model,
+    sparse_response,
+)
+from utils.streaming import (
+    iter_request_lines,
+    ndjson_response,
+    ndjson_stream,
+    parse_csv_rows,
+    parse_ndjson_rows,
+    wants_ndjson,
+)
 
 router = APIRouter(prefix="/api/cards", tags=["Cards"])
 
+MAX_IMPORT_CHUNK_SIZE = 5000
 
-@router.get("/all", response_model=list[Card])
-@limiter.limit("5/minute")
-@router.get("/all", response_model=list[Card])
+
+@router.get(
+    "/all",
+    response_model=list[Card] | CursorPage[Card],
+    dependencies=[Depends(RoleChecker(["admin"]))],
+)
 @limiter.limit("5/minute")
 async def get_all_cards(
     request: Request,
-    current_user: User = Depends(get_current_user),
+    fields: str | None = Query(default=None, description=FIELDS_DESCRIPTION),
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
     card_service: CardService = Depends(get_card_service),
 ):
-    """Retrieve all cards from the database"""
-    if not is_admin(current_user):
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    return await card_service.get_all_cards()
+    """
+    Retrieve all cards from the database.
+    Passing limit or cursor returns a single page of cards instead, and an
+    Accept: application/x-ndjson header streams the cards one per line.
+    """
+    parsed_fields = parse_fields(fields)
+    if limit is not None or cursor is not None:
+        cards = await card_service.get_cards_page(limit, cursor, parsed_fields)
+    elif wants_ndjson(request):
+        return ndjson_response(
+            card_service.iter_all_cards(parsed_fields),
+            partial_model(Card) if parsed_fields else Card,
+            exclude_unset=bool(parsed_fields),
+        )
+    else:
+        cards = await card_service.get_all_cards(parsed_fields)
+
+    return sparse_response(cards) if parsed_fields else cards
 
 
 @router.post(
@@ -37,13 +71,9 @@ async def get_all_cards(
 async def create_card(
     request: Request,
     card: Card,
-    current_user: User = Depends(get_current_user),
     card_service: CardService = Depends(get_card_service),
 ):
     """Create a new card in the database"""
-    if not is_admin(current_user):
-        raise HTTPException(status_code=401, detail="Unauthorized")
-
     return await card_service.create_card(card)
 
 
@@ -57,18 +87,46 @@ async def create_card(
 async def create_cards_bulk(
     request: Request,
     cards: list[Card],
-    current_user: User = Depends(get_current_user),
     card_service: CardService = Depends(get_card_service),
 ):
     """Create multiple cards in a single request"""
-    if not is_admin(current_user):
-        raise HTTPException(status_code=401, detail="Unauthorized")
-
     return await card_service.create_cards_bulk(cards)
 
 
+@router.post(
+    "/import",
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(RoleChecker(["admin"]))],
+)
+@limiter.limit("5/minute")
+async def import_cards(
+    request: Request,
+    chunk_size: int = Query(default=IMPORT_CHUNK_SIZE, ge=1, le=MAX_IMPORT_CHUNK_SIZE),
+    card_service: CardService = Depends(get_card_service),
+):
+    """
+    Import cards from a newline-delimited JSON body (one card per line), or from
+    CSV when sent as text/csv with a front_text,back_text,lesson_ids header and
+    lesson ids separated by semicolons.
+    The body is parsed as it arrives and the cards are inserted chunk_size at a
+    time. The response is streamed as newline-delimited JSON: a line per chunk
+    with the ids created and the rejected lines, then a summary line.
+    """
+    lines = iter_request_lines(request)
+    if request.headers.get("content-type", "").startswith("text/csv"):
+        rows = parse_csv_rows(lines, list_fields={"lesson_ids"})
+    else:
+        rows = parse_ndjson_rows(lines)
+
+    return ndjson_stream(
+        card_service.import_cards(rows, chunk_size),
+        status_code=status.HTTP_201_CREATED,
+    )
+
+
 @router.get("/{card_id}", response_model=Card)
 @limiter.limit("10/minute")
+@conditional_get
 async def get_card(
     request: Request,
     card_id: PyObjectId,
@@ -99,13 +157,9 @@ async def update_card(
     request: Request,
     card_id: PyObjectId,
     updated_info: UpdateCard,
-    current_user: User = Depends(get_current_user),
     card_service: CardService = Depends(get_card_service),
 ):
     """Update a card in the database by id"""
-    if not is_admin(current_user):
-        raise HTTPException(status_code=401, detail="Unauthorized")
-
     return await card_service.update_card(str(card_id), updated_info)
 
 
@@ -118,13 +172,9 @@ async def update_card(
 async def delete_card(
     request: Request,
     card_id: PyObjectId,
-    current_user: User = Depends(get_current_user),
     card_service: CardService = Depends(get_card_service),
 ):
     """Delete a card from the database by id"""
-    if not is_admin(current_user):
-        raise HTTPException(status_code=401, detail="Unauthorized")
-
     await card_service.delete_card(str(card_id))
 
 
@@ -1,12 +1,18 @@
 import jose
 import jwt
+from bson import ObjectId
 from fastapi import Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordBearer
-from pymongo import AsyncMongoClient
 from pymongo.asynchronous.collection import AsyncCollection
 from pymongo.asynchronous.database import AsyncDatabase
 
 from app.config import get_settings
+from app.database import create_mongo_client
+from app.principal_cache import (
+    PRINCIPAL_PROJECTION,
+    principal_cache,
+    token_version_cache,
+)
 from models.users import User
 from services.cards import CardService
 from services.lessons import LessonService
@@ -37,7 +43,7 @@ async def get_db(request: Request):
         global db_client
         if db_client is None:
             mongo_host = settings.MONGO_HOST
-            db_client = AsyncMongoClient(mongo_host)
+            db_client = create_mongo_client(mongo_host)
         yield db_client["lingua-tile"]
 
 
@@ -57,6 +63,48 @@ def get_lesson_service(db=Depends(get_db)) -> LessonService:
     return LessonService(db)
 
 
+async def load_principal(username: str, db) -> User | None:
+    """
+    Resolve the user behind a token subject, serving it from the principal cache
+    when possible. The returned user does not include the password,
+    completed_lessons or push_subscriptions fields.
+    """
+    principal = principal_cache.get(username)
+    if principal is None:
+        user_collection: AsyncCollection = db["users"]
+        principal = await user_collection.find_one(
+            {"username": username}, PRINCIPAL_PROJECTION
+        )
+        if principal is None:
+            return None
+        principal_cache.set(username, principal)
+
+    return User(**principal)
+
+
+async def get_token_version(user_id: str, db) -> int | None:
+    """
+    Return the current token version of a user, or None if the user no longer
+    exists. Versions are cached briefly so claims-bearing tokens can be checked
+    without a database round trip on every request.
+    """
+    version = token_version_cache.get(user_id)
+    if version is None:
+        if not ObjectId.is_valid(user_id):
+            return None
+
+        user = await db["users"].find_one(
+            {"_id": ObjectId(user_id)}, {"token_version": 1}
+        )
+        if user is None:
+            return None
+
+        version = user.get("token_version", 0)
+        token_version_cache.set(user_id, version)
+
+    return version
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme), db=Depends(get_db)
 ) -> User:
@@ -73,23 +121,26 @@ async def get_current_user(
                 status_code=401, detail="Invalid authentication credentials"
             )
 
-        user_collection: AsyncCollection = db["users"]
-
-        # Find the user in the database by username
-        user = await user_collection.find_one({"username": username})
+        user = await load_principal(username, db)
         if user is None:
             raise HTTPException(
                 status_code=401, detail="Invalid authentication credentials"
             )
 
-        return User(**user)
+        # Claims-bearing tokens are revoked by bumping the user's token version
+        if "ver" in payload and payload["ver"] != user.token_version:
+            raise HTTPException(
+                status_code=401, detail="Invalid authentication credentials"
+            )
+
+        return user
 
     except jose.exceptions.ExpiredSignatureError:
         raise HTTPException(
             status_code=401, detail="Invalid authentication credentials"
         ) from None
 
-    except jose.exceptions.JWTError:
+    except (jose.exceptions.JWTError, jwt.InvalidTokenError):
         raise HTTPException(
             status_code=401, detail="Invalid authentication credentials"
         ) from None
@@ -111,14 +162,17 @@ async def get_current_user_optional(
         if username is None:
             return None
 
-        user_collection: AsyncCollection = db["users"]
-        user = await user_collection.find_one({"username": username})
-        if user is None:
+        user = await load_principal(username, db)
+        if user is None or ("ver" in payload and payload["ver"] != user.token_version):
             return None
 
-        return User(**user)
+        return user
 
-    except (jose.exceptions.ExpiredSignatureError, jose.exceptions.JWTError):
+    except (
+        jose.exceptions.ExpiredSignatureError,
+        jose.exceptions.JWTError,
+        jwt.InvalidTokenError,
+    ):
         return None
 
 
@@ -126,7 +180,39 @@ class RoleChecker:
     def __init__(self, allowed_roles: list[str]):
         self.allowed_roles = allowed_roles
 
-    def __call__(self, user: User = Depends(get_current_user)):
-        if any(role in user.roles for role in self.allowed_roles):
-            return user
+    async def __call__(self, token: str = Depends(oauth2_scheme), db=Depends(get_db)):
+        roles = await self._get_claimed_roles(token, db)
+        if roles is None:
+            # Tokens issued without claims need the user document to read roles
+            user = await get_current_user(token, db)
+            roles = user.roles
+
+        if any(role in roles for role in self.allowed_roles):
+            return roles
         raise HTTPException(status_code=403, detail="Operation not permitted")
+
+    @staticmethod
+    async def _get_claimed_roles(token: str, db) -> list[str] | None:
+        """
+        Read the roles embedded in a claims-bearing token, checking that the token
+        has not been revoked. Returns None if the token carries no role claims.
+        """
+        if not SECRET_KEY:
+            raise HTTPException(status_code=500, detail="Server configuration error")
+
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except jwt.InvalidTokenError:
+            raise HTTPException(
+                status_code=401, detail="Invalid authentication credentials"
+            ) from None
+
+        if "roles" not in payload or "uid" not in payload:
+            return None
+
+        if await get_token_version(payload["uid"], db) != payload.get("ver", 0):
+            raise HTTPException(
+                status_code=401, detail="Invalid authentication credentials"
+            )
+
+        return payload["roles"]
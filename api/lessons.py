@@ -1,6 +1,5 @@
-from aiocache import cached
 from dotenv import load_dotenv
-from fastapi import APIRouter, Depends, Request, status
+from fastapi import APIRouter, Depends, Query, Request, status
 
 from api.dependencies import (
     RoleChecker,
@@ -8,25 +7,48 @@ from api.dependencies import (
     get_current_user_optional,
     get_lesson_service,
 )
+from app.catalog_version import conditional_get
+from app.config import get_settings
 from app.limiter import limiter
+from app.response_cache import cached_response
 from models.lessons import Lesson
 from models.py_object_id import PyObjectId
+from models.review_log import ReviewLog
 from models.update_lesson import UpdateLesson
 from models.users import User
 from services.lessons import LessonService
+from utils.pagination import MAX_PAGE_SIZE
+from utils.projection import (
+    FIELDS_DESCRIPTION,
+    fields_cache_suffix,
+    parse_fields,
+    sparse_response,
+)
+from utils.streaming import ndjson_response, wants_ndjson
 
 load_dotenv(".env")
+settings = get_settings()
 router = APIRouter(prefix="/api/lessons", tags=["Lessons"])
 
 
 @router.get("/all", response_model=list[Lesson], status_code=status.HTTP_200_OK)
 @limiter.limit("10/minute")
-@cached(ttl=600, key="all_lessons", alias="default")
+@conditional_get
+@cached_response(
+    ttl=settings.CACHE_LESSONS_TTL_SECONDS,
+    key_builder=lambda f, *args, **kwargs: (
+        "all_lessons" + fields_cache_suffix(kwargs.get("fields"))
+    ),
+)
 async def get_all_lessons(
-    request: Request, lesson_service: LessonService = Depends(get_lesson_service)
+    request: Request,
+    fields: str | None = Query(default=None, description=FIELDS_DESCRIPTION),
+    lesson_service: LessonService = Depends(get_lesson_service),
 ):
     """Retrieve all lessons from the database"""
-    return await lesson_service.get_all_lessons()
+    parsed_fields = parse_fields(fields)
+    lessons = await lesson_service.get_all_lessons(parsed_fields)
+    return sparse_response(lessons) if parsed_fields else lessons
 
 
 @router.post(
@@ -44,6 +66,22 @@ async def create_lesson(
     return await lesson_service.create_lesson(lesson)
 
 
+@router.post(
+    "/create-bulk",
+    response_model=list[Lesson],
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(RoleChecker(["admin"]))],
+)
+@limiter.limit("5/minute")
+async def create_lessons_bulk(
+    request: Request,
+    lessons: list[Lesson],
+    lesson_service: LessonService = Depends(get_lesson_service),
+):
+    """Create multiple lessons in a single request"""
+    return await lesson_service.create_lessons_bulk(lessons)
+
+
 @router.get("/total", status_code=status.HTTP_200_OK)
 @limiter.limit("10/minute")
 async def get_total_lesson_count(
@@ -55,18 +93,24 @@ async def get_total_lesson_count(
 
 @router.get("/by-category/{category}")
 @limiter.limit("10/minute")
-@cached(
-    ttl=600,
-    key_builder=lambda f, *args, **kwargs: f"category_{kwargs['category'].lower()}",
-    alias="default",
+@conditional_get
+@cached_response(
+    ttl=settings.CACHE_LESSONS_TTL_SECONDS,
+    key_builder=lambda f, *args, **kwargs: (
+        f"category_{kwargs['category'].lower()}"
+        + fields_cache_suffix(kwargs.get("fields"))
+    ),
 )
 async def get_lessons_by_category(
     request: Request,
     category: str,
+    fields: str | None = Query(default=None, description=FIELDS_DESCRIPTION),
     lesson_service: LessonService = Depends(get_lesson_service),
 ):
     """Retrieve all lessons from the database by category"""
-    return await lesson_service.get_lessons_by_category(category)
+    parsed_fields = parse_fields(fields)
+    lessons = await lesson_service.get_lessons_by_category(category, parsed_fields)
+    return sparse_response(lessons) if parsed_fields else lessons
 
 
 @router.get("/review/{lesson_id}", status_code=status.HTTP_200_OK)
@@ -153,8 +197,24 @@ async def review_lesson(
 @limiter.limit("10/minute")
 async def get_review_history(
     request: Request,
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
     current_user: User = Depends(get_current_user),
     lesson_service: LessonService = Depends(get_lesson_service),
 ):
-    """Retrieve all review logs for the current user to show history"""
+    """
+    Retrieve all review logs for the current user to show history.
+    Passing limit or cursor returns a single page of logs instead, and an
+    Accept: application/x-ndjson header streams the logs one per line.
+    """
+    if limit is not None or cursor is not None:
+        return await lesson_service.get_review_history_page(
+            str(current_user.id), limit, cursor
+        )
+
+    if wants_ndjson(request):
+        return ndjson_response(
+            lesson_service.iter_review_history(str(current_user.id)), ReviewLog
+        )
+
     return await lesson_service.get_review_history(str(current_user.id))
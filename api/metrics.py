@@ -0,0 +1,64 @@
+import secrets
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import PlainTextResponse
+
+from api.dependencies import RoleChecker
+from app.cache_config import cache_stats
+from app.cache_warmup import cache_warmer
+from app.config import get_settings
+from app.limiter import limiter
+from app.metrics import CONTENT_TYPE, registry
+from app.mongo_monitoring import command_listener
+
+settings = get_settings()
+
+router = APIRouter(prefix="/api/metrics", tags=["Metrics"])
+
+
+@router.get("/mongo", dependencies=[Depends(RoleChecker(["admin"]))])
+@limiter.limit("30/minute")
+async def get_mongo_metrics(
+    request: Request,
+    request_id: str | None = Query(
+        None, description="Only list the recent commands issued by this request"
+    ),
+):
+    """Latency histograms and document counts of the MongoDB commands, per collection"""
+    return command_listener.snapshot(request_id)
+
+
+@router.delete(
+    "/mongo",
+    status_code=status.HTTP_204_NO_CONTENT,
+    dependencies=[Depends(RoleChecker(["admin"]))],
+)
+@limiter.limit("10/minute")
+async def reset_mongo_metrics(request: Request):
+    """Reset the collected MongoDB command metrics"""
+    command_listener.reset()
+
+
+@router.get("/cache", dependencies=[Depends(RoleChecker(["admin"]))])
+@limiter.limit("30/minute")
+async def get_cache_metrics(request: Request):
+    """Capacity, usage, hit and eviction counts of each cache tier"""
+    return {**cache_stats(), "warmup": cache_warmer.stats()}
+
+
+def verify_metrics_token(request: Request):
+    if settings.METRICS_TOKEN is None:
+        if settings.METRICS_PUBLIC:
+            return
+        raise HTTPException(
+            status_code=403, detail="Metrics are disabled, set METRICS_TOKEN"
+        )
+    authorization = request.headers.get("Authorization", "")
+    if not secrets.compare_digest(authorization, f"Bearer {settings.METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+
+@router.get("", dependencies=[Depends(verify_metrics_token)])
+async def get_metrics():
+    """Request, cache and MongoDB pool metrics in the Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
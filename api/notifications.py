@@ -3,7 +3,9 @@ from fastapi import APIRouter, Depends, HTTPException, Request, status
 
 from api.dependencies import get_current_user, get_db
 from app.config import get_settings
+from app.database import get_collection
 from app.limiter import limiter
+from app.principal_cache import principal_cache
 from models.users import PushSubscription, PushUnsubscribe, User
 
 router = APIRouter(prefix="/api/notifications", tags=["Notifications"])
@@ -35,13 +37,14 @@ async def subscribe(
     # Add subscription to user's list if it doesn't exist
     # We match by endpoint to ensure uniqueness
     # Note: user_id is a string from Pydantic, but MongoDB uses ObjectId for _id
-    await db["users"].update_one(
+    await get_collection(db, "users").update_one(
         {
             "_id": ObjectId(user_id),
             "push_subscriptions.endpoint": {"$ne": subscription.endpoint},
         },
         {"$push": {"push_subscriptions": subscription.model_dump()}},
     )
+    principal_cache.invalidate(user_id)
 
     # If the subscription endpoint already exists, we might want to update keys,
     # but for now we assume endpoint is unique enough or we just didn't add it again.
@@ -66,9 +69,10 @@ async def unsubscribe(
     if not user_id:
         raise HTTPException(status_code=404, detail="User not found")
 
-    await db["users"].update_one(
+    await get_collection(db, "users").update_one(
         {"_id": ObjectId(user_id)},
         {"$pull": {"push_subscriptions": {"endpoint": subscription.endpoint}}},
     )
+    principal_cache.invalidate(user_id)
 
     return {"message": "Unsubscribed successfully"}
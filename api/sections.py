@@ -1,12 +1,22 @@
-from aiocache import cached
-from fastapi import APIRouter, Depends, Request, status
+from fastapi import APIRouter, Depends, Query, Request, status
 
 from api.dependencies import RoleChecker, get_section_service
+from app.catalog_version import conditional_get
+from app.config import get_settings
 from app.limiter import limiter
+from app.response_cache import cached_response
 from models.py_object_id import PyObjectId
 from models.sections import Section
 from models.update_section import UpdateSection
 from services.sections import SectionService
+from utils.projection import (
+    FIELDS_DESCRIPTION,
+    fields_cache_suffix,
+    parse_fields,
+    sparse_response,
+)
+
+settings = get_settings()
 
 router = APIRouter(prefix="/api/sections", tags=["Sections"])
 
@@ -27,23 +37,29 @@ async def create_section(
 
 @router.get("/all")
 @limiter.limit("10/minute")
-@cached(
-    ttl=3600,
-    key="all_sections",
-    alias="default",
+@conditional_get
+@cached_response(
+    ttl=settings.CACHE_SECTIONS_TTL_SECONDS,
+    key_builder=lambda f, *args, **kwargs: (
+        "all_sections" + fields_cache_suffix(kwargs.get("fields"))
+    ),
 )
 async def get_all_sections(
-    request: Request, section_service: SectionService = Depends(get_section_service)
+    request: Request,
+    fields: str | None = Query(default=None, description=FIELDS_DESCRIPTION),
+    section_service: SectionService = Depends(get_section_service),
 ):
-    return await section_service.get_all_sections()
+    parsed_fields = parse_fields(fields)
+    sections = await section_service.get_all_sections(parsed_fields)
+    return sparse_response(sections) if parsed_fields else sections
 
 
 @router.get("/{section_id}/download")
 @limiter.limit("5/minute")
-@cached(
-    ttl=600,
+@conditional_get
+@cached_response(
+    ttl=settings.CACHE_DOWNLOAD_TTL_SECONDS,
     key_builder=lambda f, *args, **kwargs: f"download_{kwargs['section_id']}",
-    alias="default",
 )
 async def download_section(
     request: Request,
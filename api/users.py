@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 
 from api.dependencies import (
     RoleChecker,
@@ -12,6 +12,8 @@ from models.py_object_id import PyObjectId
 from models.update_user import UpdateUser
 from models.users import User
 from services.users import UserService
+from utils.pagination import MAX_PAGE_SIZE, CursorPage
+from utils.streaming import ndjson_response, wants_ndjson
 
 router = APIRouter(prefix="/api/users", tags=["Users"])
 
@@ -42,9 +44,14 @@ async def get_user_activity(
 
 @router.get("/", response_model=User, response_model_exclude={"password"})
 @limiter.limit("15/minute")
-async def get_current_user(request: Request, current_user: User = Depends(get_client)):
+async def get_current_user(
+    request: Request,
+    current_user: User = Depends(get_client),
+    user_service: UserService = Depends(get_user_service),
+):
     """Retrieve the current user"""
-    return current_user
+    # The authenticated principal is a lean projection, so load the full profile
+    return await user_service.get_user_by_id(str(current_user.id))
 
 
 @router.get(
@@ -57,7 +64,7 @@ async def get_current_user(request: Request, current_user: User = Depends(get_cl
 async def get_user(
     request: Request,
     user_id: PyObjectId,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_client),
     user_service: UserService = Depends(get_user_service),
 ):
     """Retrieve a user from the database by id"""
@@ -69,20 +76,35 @@ async def get_user(
 
 @router.get(
     "/admin/all",
-    response_model=list[User],
+    response_model=list[User] | CursorPage[User],
     response_model_exclude={"password"},
     dependencies=[Depends(RoleChecker(["admin"]))],
 )
 @limiter.limit("10/minute")
 async def get_all_users(
     request: Request,
-    current_user: User = Depends(get_current_user),
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    q: str | None = Query(default=None, description="Username or email prefix"),
+    current_user: User = Depends(get_client),
     user_service: UserService = Depends(get_user_service),
 ):
-    """Retrieve all users from the database"""
+    """
+    Retrieve all users from the database.
+    Passing limit, cursor or q returns a single page of users instead, and an
+    Accept: application/x-ndjson header streams the users one per line.
+    """
     if not is_admin(current_user):
         raise HTTPException(status_code=403, detail="Not authorized to view all users")
 
+    if limit is not None or cursor is not None or q is not None:
+        return await user_service.get_users_page(limit, cursor, q)
+
+    if wants_ndjson(request):
+        return ndjson_response(
+            user_service.iter_all_users(), User, exclude={"password"}
+        )
+
     return await user_service.get_all_users()
 
 
@@ -94,7 +116,7 @@ async def update_user(
     request: Request,
     user_id: PyObjectId,
     updated_info: UpdateUser,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_client),
     user_service: UserService = Depends(get_user_service),
 ):
     """Update a user in the database by id"""
@@ -111,7 +133,7 @@ async def update_user(
 async def delete_user(
     request: Request,
     user_id: PyObjectId,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_client),
     user_service: UserService = Depends(get_user_service),
 ):
     """Delete a user from the database by id"""
@@ -127,7 +149,7 @@ async def delete_user(
 @limiter.limit("3/hour")
 async def reset_user_progress(
     request: Request,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_client),
     user_service: UserService = Depends(get_user_service),
 ):
     """Reset the current user's progress (reviews and XP)"""
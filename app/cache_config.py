@@ -1,13 +1,75 @@
 from aiocache import caches
 
+from app.config import get_settings
+from app.metrics import (
+    cache_l1_bytes,
+    cache_l1_entries,
+    cache_l1_evictions_total,
+    cache_l1_max_bytes,
+    cache_tier_requests_total,
+    registry,
+)
+
+settings = get_settings()
+
+
+def _backend_config() -> dict:
+    """
+    The tiered cache, with a bounded per-process tier in front of Redis when
+    CACHE_BACKEND is "redis" and on its own when it is "memory".
+    """
+    if settings.CACHE_BACKEND not in ("memory", "redis"):
+        raise ValueError(f"Unknown cache backend: {settings.CACHE_BACKEND}")
+    if settings.CACHE_BACKEND == "redis" and not settings.CACHE_REDIS_URL:
+        # The invalidation bus only goes through Redis when the URL is set, so
+        # without it the shared tier would never hear of other instances' writes
+        raise ValueError('CACHE_REDIS_URL must be set when CACHE_BACKEND is "redis"')
+
+    config = {
+        "cache": "app.tiered_cache.TieredCache",
+        "l1_max_bytes": settings.CACHE_L1_MAX_BYTES,
+        "l1_max_entry_bytes": settings.CACHE_L1_MAX_ENTRY_BYTES,
+        "l1_ttl": settings.CACHE_L1_TTL_SECONDS,
+    }
+    if settings.CACHE_BACKEND == "redis":
+        # Shared by every instance, needs the redis package
+        config["redis_url"] = settings.CACHE_REDIS_URL
+        config["key_prefix"] = settings.CACHE_KEY_PREFIX
+    return config
+
 
 def setup_cache():
     caches.set_config(
         {
             "default": {
-                "cache": "aiocache.SimpleMemoryCache",
+                **_backend_config(),
                 "serializer": {"class": "aiocache.serializers.PickleSerializer"},
+                "plugins": [{"class": "app.metrics.CacheMetricsPlugin"}],
                 "ttl": 600,  # 10 minutes default TTL
             }
         }
     )
+
+
+def cache_stats() -> dict:
+    """Capacity, usage and eviction counts of the default cache's tiers."""
+    return caches.get("default").stats()
+
+
+def _collect_metrics() -> None:
+    stats = cache_stats()
+    l1, l2 = stats["l1"], stats["l2"]
+    cache_l1_bytes.set(l1["size_bytes"])
+    cache_l1_max_bytes.set(l1["max_bytes"])
+    cache_l1_entries.set(l1["entries"])
+    cache_l1_evictions_total.set(l1["evictions"], "capacity")
+    cache_l1_evictions_total.set(l1["expirations"], "expired")
+    cache_l1_evictions_total.set(l1["rejected"], "too_large")
+    cache_tier_requests_total.set(l1["hits"], "l1", "hit")
+    cache_tier_requests_total.set(l1["misses"], "l1", "miss")
+    if l2["enabled"]:
+        cache_tier_requests_total.set(l2["hits"], "l2", "hit")
+        cache_tier_requests_total.set(l2["misses"], "l2", "miss")
+
+
+registry.add_collector(_collect_metrics)
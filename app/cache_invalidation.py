@@ -0,0 +1,319 @@
+import asyncio
+import json
+import logging
+import uuid
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable
+
+from aiocache import caches
+
+from app.cache_tags import SharedTagVersions, tag_versions
+from app.catalog_version import catalog_version
+from app.config import get_settings
+from app.metrics import cache_invalidations_total, registry
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+InvalidationHandler = Callable[[list[str]], Awaitable[None]]
+VersionHandler = Callable[[int, list[str]], None]
+
+# Delay before the subscriber reconnects after losing the Redis connection
+RECONNECT_DELAY_SECONDS = 1.0
+
+
+class InvalidationBus(ABC):
+    """
+    Broadcasts the cache namespaces cleared by one instance of the app to every
+    other instance, so that state kept in-process (the memory cache backend,
+    local cache tiers) does not outlive the data it was computed from.
+
+    Each message may also carry the catalog version the change produced and the
+    cache tags it invalidated (see app.cache_tags), passed to the version
+    handlers.
+
+    Handlers only receive invalidations published by other instances: the
+    publishing instance has already cleared its own state.
+    """
+
+    def __init__(self):
+        self.instance_id = uuid.uuid4().hex
+        self._handlers: list[InvalidationHandler] = []
+        self._version_handlers: list[VersionHandler] = []
+        self.published = 0
+        self.received = 0
+
+    def subscribe(self, handler: InvalidationHandler) -> None:
+        self._handlers.append(handler)
+
+    def subscribe_version(self, handler: VersionHandler) -> None:
+        self._version_handlers.append(handler)
+
+    @abstractmethod
+    async def start(self) -> None:
+        """Connect, and start receiving invalidations from other instances."""
+
+    @abstractmethod
+    async def stop(self) -> None:
+        """Stop receiving invalidations and disconnect."""
+
+    @abstractmethod
+    async def publish(
+        self,
+        namespaces: list[str],
+        catalog_version: int | None = None,
+        tags: list[str] | None = None,
+    ) -> None:
+        """Send an invalidation to every other instance."""
+
+    async def _deliver(
+        self,
+        origin: str,
+        namespaces: list[str],
+        catalog_version: int | None = None,
+        tags: list[str] | None = None,
+    ) -> None:
+        if origin == self.instance_id:
+            return
+
+        self.received += 1
+        for handler in self._handlers:
+            try:
+                await handler(namespaces)
+            except Exception:
+                logger.exception("Cache invalidation handler failed")
+
+        # After the caches are cleared, so the new version never tags old data
+        if catalog_version is not None:
+            for version_handler in self._version_handlers:
+                version_handler(catalog_version, tags or [])
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self).__name__,
+            "instance_id": self.instance_id,
+            "published": self.published,
+            "received": self.received,
+        }
+
+
+class LocalBroker:
+    """In-process message broker connecting LocalInvalidationBus instances."""
+
+    def __init__(self):
+        self.buses: list["LocalInvalidationBus"] = []
+
+    async def publish(
+        self,
+        origin: str,
+        namespaces: list[str],
+        catalog_version: int | None = None,
+        tags: list[str] | None = None,
+    ) -> None:
+        for bus in list(self.buses):
+            await bus._deliver(origin, namespaces, catalog_version, tags)
+
+
+class LocalInvalidationBus(InvalidationBus):
+    """
+    Stand-in for the Redis bus, used by tests and single-instance deployments.
+    Buses attached to the same broker behave like instances sharing a channel.
+    """
+
+    def __init__(self, broker: LocalBroker | None = None):
+        super().__init__()
+        self.broker = broker or LocalBroker()
+        self.broker.buses.append(self)
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def publish(
+        self,
+        namespaces: list[str],
+        catalog_version: int | None = None,
+        tags: list[str] | None = None,
+    ) -> None:
+        self.published += 1
+        await self.broker.publish(self.instance_id, namespaces, catalog_version, tags)
+
+
+class RedisInvalidationBus(InvalidationBus):
+    """Invalidation bus over a Redis pub/sub channel."""
+
+    def __init__(self, url: str, channel: str):
+        super().__init__()
+        self.url = url
+        self.channel = channel
+        self._redis = None
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        # Optional dependency, only needed when a Redis URL is configured
+        from redis import asyncio as redis
+
+        if self._task is not None:
+            return
+        self._redis = redis.from_url(self.url)
+        self._task = asyncio.create_task(
+            self._listen(), name="cache-invalidation-subscriber"
+        )
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    async def publish(
+        self,
+        namespaces: list[str],
+        catalog_version: int | None = None,
+        tags: list[str] | None = None,
+    ) -> None:
+        if self._redis is None:
+            return
+
+        message = json.dumps(
+            {
+                "origin": self.instance_id,
+                "namespaces": namespaces,
+                "catalog_version": catalog_version,
+                "tags": tags,
+            }
+        )
+        try:
+            await self._redis.publish(self.channel, message)
+            self.published += 1
+        except Exception:
+            # The local cache is already cleared; peers fall back to their TTLs
+            logger.exception("Failed to publish cache invalidation")
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        payload = json.loads(message["data"])
+                        await self._deliver(
+                            payload["origin"],
+                            payload["namespaces"],
+                            payload.get("catalog_version"),
+                            payload.get("tags"),
+                        )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Cache invalidation subscriber disconnected")
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+
+def create_invalidation_bus() -> InvalidationBus:
+    if settings.CACHE_REDIS_URL:
+        return RedisInvalidationBus(
+            settings.CACHE_REDIS_URL, settings.CACHE_INVALIDATION_CHANNEL
+        )
+    return LocalInvalidationBus()
+
+
+invalidation_bus = create_invalidation_bus()
+
+
+def create_shared_tag_versions() -> SharedTagVersions | None:
+    # Only a shared cache holds entries written before an instance started
+    if settings.CACHE_BACKEND != "redis":
+        return None
+    return SharedTagVersions(
+        settings.CACHE_REDIS_URL,
+        settings.CACHE_TAG_VERSIONS_KEY,
+        settings.CACHE_TAG_VERSION_RETENTION_SECONDS,
+    )
+
+
+shared_tag_versions = create_shared_tag_versions()
+
+
+async def _clear_cache(namespaces: list[str]) -> None:
+    cache = caches.get("default")
+    for namespace in namespaces:
+        await cache.clear(namespace=namespace)
+
+
+async def _clear_cache_tier(namespaces: list[str]) -> None:
+    # Only the per-process tier: a shared tier was cleared by the publisher
+    cache = caches.get("default")
+    for namespace in namespaces:
+        cache.clear_local(namespace)
+
+
+async def invalidate_cache(
+    namespaces: list[str], tags: list[str] | None = None
+) -> None:
+    """
+    Record a catalog change: clear every cache key starting with one of
+    ``namespaces`` from the default cache, bump the catalog version, invalidate
+    ``tags`` at that version, and tell the other instances to do the same.
+    """
+    tags = sorted(set(tags or []))
+    await _clear_cache(namespaces)
+    version = catalog_version.bump()
+    tag_versions.invalidate(tags, version)
+    if shared_tag_versions is not None:
+        try:
+            await shared_tag_versions.save(tags, version)
+        except Exception:
+            # Running instances still learn of it from the invalidation channel
+            logger.exception("Failed to share cache tag versions")
+    await invalidation_bus.publish(namespaces, catalog_version=version, tags=tags)
+
+
+async def load_shared_tag_versions() -> None:
+    """
+    Learn the tag versions written before this instance started, so that shared
+    cache entries from then can be validated instead of ignored. Called once the
+    invalidation bus is started, which reports the invalidations made after.
+    """
+    if shared_tag_versions is None:
+        return
+    try:
+        tag_versions.load(await shared_tag_versions.load())
+    except Exception:
+        logger.exception(
+            "Failed to load cache tag versions, ignoring entries cached before startup"
+        )
+
+
+async def announce_catalog_version() -> None:
+    """Bring the other instances up to this instance's catalog version."""
+    await invalidation_bus.publish([], catalog_version=catalog_version.value)
+
+
+invalidation_bus.subscribe(_clear_cache_tier)
+
+
+def _observe_version(version: int, tags: list[str]) -> None:
+    catalog_version.observe(version)
+    tag_versions.invalidate(tags, version)
+
+
+invalidation_bus.subscribe_version(_observe_version)
+
+
+def _collect_metrics() -> None:
+    cache_invalidations_total.set(invalidation_bus.published, "published")
+    cache_invalidations_total.set(invalidation_bus.received, "received")
+
+
+registry.add_collector(_collect_metrics)
@@ -0,0 +1,163 @@
+"""
+Tag-based, versioned invalidation of cached catalog responses.
+
+Writes invalidate tags such as ``lessons``, ``lesson:<id>`` or ``card:<id>``
+by giving them a new catalog version. Cached responses depend on tags in two
+ways:
+
+- key tags are known from the key alone (``download_<id>`` depends on
+  ``section:<id>``) and their versions are part of the stored key, so a write
+  moves readers to a new key. A response computed while the write was landing
+  is stored under the old key and never read again.
+- entry tags are only known from the response (the lessons and cards in a
+  section download). They are stored with the entry, together with the time
+  its computation started, and the entry is ignored once any of them was
+  invalidated after that.
+
+Versions are catalog versions (see app.catalog_version): hybrid clock readings
+that other instances learn over the invalidation channel. With a shared cache
+they are also kept in Redis, where an instance that starts later reads them.
+"""
+
+import json
+
+from app.catalog_version import catalog_version, now_us
+
+# Separates the tag header of a cached entry from the response body
+HEADER_END = b"\n"
+
+
+class TagVersions:
+    """
+    The version of every invalidated tag seen by this instance. Tags it has not
+    seen are reported at version 0, so that instances agree on the keys of data
+    nobody has written to.
+
+    Entries stamped before ``trusted_from`` are never current: until the shared
+    versions are loaded, writes made before this process started are unknown to
+    it, and so is whether an entry written back then is fresh.
+    """
+
+    def __init__(self):
+        self.trusted_from = catalog_version.value
+        self._versions: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    def invalidate(self, tags: list[str], version: int) -> None:
+        for tag in tags:
+            if version > self._versions.get(tag, 0):
+                self._versions[tag] = version
+
+    def load(self, versions: dict[str, int]) -> None:
+        """
+        Take in the versions shared by every instance (see SharedTagVersions),
+        after which entries written before this process started are trusted too.
+        """
+        for tag, version in versions.items():
+            self.invalidate([tag], version)
+        self.trusted_from = 0
+
+    def key_version(self, tags: list[str]) -> int:
+        return max((self._versions.get(tag, 0) for tag in tags), default=0)
+
+    def is_current(self, tags: list[str], stamp: int) -> bool:
+        """Whether none of ``tags`` was invalidated after ``stamp``."""
+        if stamp < self.trusted_from:
+            return False
+        return all(self._versions.get(tag, 0) <= stamp for tag in tags)
+
+
+tag_versions = TagVersions()
+
+
+class SharedTagVersions:
+    """
+    Tag versions kept in a Redis sorted set scored by version, for instances that
+    start after the writes. ``ZADD GT`` (Redis 6.2) keeps the newest version of a
+    tag whatever order concurrent writers land in. Versions older than
+    ``retention_seconds`` are dropped: every entry they could outdate has expired
+    by then, so reading such a tag at version 0 is just as safe.
+    """
+
+    def __init__(self, url: str, key: str, retention_seconds: int):
+        self.url = url
+        self.key = key
+        self.retention_seconds = retention_seconds
+        self._redis = None
+
+    def _client(self):
+        if self._redis is None:
+            # Optional dependency, only needed when the cache is shared
+            from redis import asyncio as redis
+
+            self._redis = redis.from_url(self.url)
+        return self._redis
+
+    async def save(self, tags: list[str], version: int) -> None:
+        if not tags:
+            return
+        client = self._client()
+        await client.zadd(self.key, {tag: version for tag in tags}, gt=True)
+        expired = now_us() - self.retention_seconds * 1_000_000
+        await client.zremrangebyscore(self.key, "-inf", expired)
+
+    async def load(self) -> dict[str, int]:
+        entries = await self._client().zrange(self.key, 0, -1, withscores=True)
+        return {tag.decode(): int(version) for tag, version in entries}
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+
+def key_tags(key: str) -> list[str]:
+    """The tags a cached catalog response depends on, known from its key."""
+    if key.startswith(("all_lessons", "category_")):
+        return ["lessons"]
+    if key.startswith("all_sections"):
+        return ["sections"]
+    if key.startswith("download_"):
+        return [f"section:{key.removeprefix('download_')}"]
+    return []
+
+
+def entry_tags(key: str, result) -> list[str]:
+    """
+    The tags a cached catalog response depends on beyond its key tags: the
+    lessons and cards bundled in a section download.
+    """
+    if not key.startswith("download_") or not isinstance(result, dict):
+        return []
+    return [
+        *(f"lesson:{lesson.id}" for lesson in result.get("lessons", [])),
+        *(f"card:{card.id}" for card in result.get("cards", [])),
+    ]
+
+
+def versioned_key(key: str) -> str:
+    return f"{key}@{tag_versions.key_version(key_tags(key)):x}"
+
+
+def stamp() -> int:
+    """Taken before a response is computed, to date the entry it produces."""
+    return max(catalog_version.value, now_us())
+
+
+def pack_entry(body: bytes, entry_stamp: int, tags: list[str]) -> bytes:
+    header = json.dumps({"stamp": entry_stamp, "tags": tags}, separators=(",", ":"))
+    return header.encode() + HEADER_END + body
+
+
+def unpack_entry(value: bytes) -> bytes | None:
+    """The response body of a cached entry, or None if it is out of date."""
+    header, _, body = value.partition(HEADER_END)
+    try:
+        metadata = json.loads(header)
+    except ValueError:
+        return None
+    if not tag_versions.is_current(metadata["tags"], metadata["stamp"]):
+        return None
+    return body
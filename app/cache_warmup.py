@@ -0,0 +1,153 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+from pymongo.asynchronous.database import AsyncDatabase
+
+from app.config import get_settings
+from app.response_cache import hot_keys, response_slot, store_response
+from services.lessons import LESSON_CATEGORIES, LessonService
+from services.sections import SectionService
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+Loader = Callable[[AsyncDatabase], Awaitable]
+
+
+def response_loader(key: str) -> tuple[Loader, int] | None:
+    """
+    How to recompute the cached response stored under ``key`` and its TTL, for
+    the catalog routes. Sparse fieldset variants are left to expire.
+    """
+    if ":" in key:
+        return None
+    if key == "all_lessons":
+        return (
+            lambda db: LessonService(db).get_all_lessons(),
+            settings.CACHE_LESSONS_TTL_SECONDS,
+        )
+    if key.startswith("category_"):
+        category = key.removeprefix("category_")
+        return (
+            lambda db: LessonService(db).get_lessons_by_category(category),
+            settings.CACHE_LESSONS_TTL_SECONDS,
+        )
+    if key == "all_sections":
+        return (
+            lambda db: SectionService(db).get_all_sections(),
+            settings.CACHE_SECTIONS_TTL_SECONDS,
+        )
+    if key.startswith("download_"):
+        section_id = key.removeprefix("download_")
+        return (
+            lambda db: SectionService(db).get_section_for_download(section_id),
+            settings.CACHE_DOWNLOAD_TTL_SECONDS,
+        )
+    return None
+
+
+class CacheWarmer:
+    """
+    Fills the response cache with the catalog at startup, and keeps the busiest
+    responses in it: every ``interval_seconds`` the responses served at least
+    ``min_hits`` times that expire within ``refresh_ahead_seconds`` are
+    recomputed, so their readers never see them expire.
+
+    Responses are stored like the routes store them, so one computed while a
+    catalog write lands is outdated by it (see app.cache_tags).
+    """
+
+    def __init__(
+        self, refresh_ahead_seconds: float, interval_seconds: float, min_hits: int
+    ):
+        self.refresh_ahead_seconds = refresh_ahead_seconds
+        self.interval_seconds = interval_seconds
+        self.min_hits = min_hits
+        self._db: AsyncDatabase | None = None
+        self._task: asyncio.Task | None = None
+        self.warmed = 0
+        self.refreshed = 0
+        self.failed = 0
+
+    async def load(self, db: AsyncDatabase, key: str) -> bool:
+        loader = response_loader(key)
+        if loader is None:
+            return False
+        load, ttl = loader
+
+        slot = response_slot(key)
+        result = await load(db)
+        return await store_response(key, result, ttl, slot) is not None
+
+    async def warm(self, db: AsyncDatabase) -> None:
+        """Cache the lesson and section listings and the popular downloads."""
+        keys = [
+            "all_lessons",
+            *(f"category_{category}" for category in LESSON_CATEGORIES),
+            "all_sections",
+        ]
+        section_ids = await SectionService(db).get_popular_section_ids(
+            settings.CACHE_WARMUP_POPULAR_SECTIONS,
+            settings.CACHE_WARMUP_POPULARITY_DAYS,
+        )
+        keys.extend(f"download_{section_id}" for section_id in section_ids)
+
+        for key in keys:
+            try:
+                if await self.load(db, key):
+                    self.warmed += 1
+            except Exception:
+                self.failed += 1
+                logger.exception("Failed to warm cached response %s", key)
+        logger.info(f"Warmed {self.warmed} of {len(keys)} cached responses")
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, db: AsyncDatabase) -> None:
+        if self.running:
+            return
+        self._db = db
+        self._task = asyncio.create_task(self._run(), name="cache-refresh-ahead")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def refresh_due(self) -> None:
+        for key, _ in hot_keys.due(self.refresh_ahead_seconds, self.min_hits):
+            try:
+                if await self.load(self._db, key):
+                    self.refreshed += 1
+            except Exception:
+                self.failed += 1
+                logger.exception("Failed to refresh cached response %s", key)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            await self.refresh_due()
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "tracked_keys": len(hot_keys),
+            "warmed": self.warmed,
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+        }
+
+
+cache_warmer = CacheWarmer(
+    refresh_ahead_seconds=settings.CACHE_REFRESH_AHEAD_SECONDS,
+    interval_seconds=settings.CACHE_REFRESH_INTERVAL_SECONDS,
+    min_hits=settings.CACHE_REFRESH_MIN_HITS,
+)
@@ -0,0 +1,89 @@
+import functools
+import time
+from collections.abc import Callable
+
+from fastapi.encoders import jsonable_encoder
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+def now_us() -> int:
+    return time.time_ns() // 1000
+
+
+class CatalogVersion:
+    """
+    A version number for the lesson, section and card catalog, increased by every
+    catalog write and used as the ETag of the catalog routes.
+
+    Versions are hybrid clock readings: a bump moves to the current time in
+    microseconds, or one past the last version if the clock is behind. Instances
+    exchange new versions over the cache invalidation channel and keep the
+    highest they have seen, so a version never goes backwards and one that was
+    issued is never reused for different data. A starting instance begins at its
+    start time, above any version issued before it.
+    """
+
+    def __init__(self):
+        self.value = now_us()
+
+    def bump(self) -> int:
+        self.value = max(self.value + 1, now_us())
+        return self.value
+
+    def observe(self, version: int) -> None:
+        self.value = max(self.value, version)
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.value:x}"'
+
+
+catalog_version = CatalogVersion()
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+def conditional_get(func: Callable) -> Callable:
+    """
+    Tag a catalog route with the catalog version and answer 304 Not Modified
+    when the client already holds it, before the route touches the cache or
+    the database.
+
+    The version is read before the route runs: a write that lands while the
+    response is computed only makes the next request send it again.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        request: Request = kwargs["request"]
+        etag = catalog_version.etag
+        headers = {
+            "ETag": etag,
+            "Cache-Control": (
+                f"public, max-age={settings.CATALOG_MAX_AGE_SECONDS}, must-revalidate"
+            ),
+        }
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+
+        result = await func(*args, **kwargs)
+        if not isinstance(result, Response):
+            result = JSONResponse(content=jsonable_encoder(result))
+        if result.status_code == 200:
+            result.headers.update(headers)
+        return result
+
+    return wrapper
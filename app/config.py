@@ -14,9 +14,94 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10_000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    # Embed the user id, roles and token version in access tokens so role checks
+    # can run without loading the user document
+    JWT_CLAIMS_MODE: bool = False
+    TOKEN_VERSION_CACHE_TTL_SECONDS: int = 30
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    # Bearer token required to scrape /api/metrics, which is disabled when unset
+    METRICS_TOKEN: str | None = None
+    # Serve /api/metrics without a token, for local development only
+    METRICS_PUBLIC: bool = False
 
     # Database
     MONGO_HOST: str
+    MONGO_MIN_POOL_SIZE: int = 5
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MAX_IDLE_TIME_MS: int = 5 * 60 * 1000
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 10_000
+    # Index creation at startup, bounded so an unreachable server cannot hold it up
+    MONGO_INDEX_TIMEOUT_SECONDS: float = 30
+    # Wire compression, in order of preference (zstd needs the zstandard package)
+    MONGO_COMPRESSORS: str = "zstd,zlib"
+    # Write concern "w" per collection; collections not listed use the client default
+    MONGO_WRITE_CONCERNS: dict[str, str] = {"review_logs": "1", "users": "majority"}
+    # Catalog reads (lesson, section and card listings) may be routed to replica set
+    # secondaries, e.g. "secondaryPreferred"; reviews and users always use the primary
+    MONGO_CATALOG_READ_PREFERENCE: str = "primary"
+    MONGO_CATALOG_READ_CONCERN: str = "majority"
+    MONGO_CATALOG_MAX_STALENESS_SECONDS: int = -1
+    # Apply card/lesson/section reference updates in a transaction (needs a replica set)
+    MONGO_LINK_TRANSACTIONS: bool = False
+    # Review logs are buffered and inserted in batches
+    REVIEW_LOG_BATCH_SIZE: int = 500
+    REVIEW_LOG_FLUSH_INTERVAL_SECONDS: float = 1.0
+    REVIEW_LOG_MAX_QUEUE_SIZE: int = 10_000
+    # Flushes failing on transient errors are retried with exponential backoff
+    REVIEW_LOG_FLUSH_RETRIES: int = 5
+    REVIEW_LOG_RETRY_BACKOFF_SECONDS: float = 0.5
+
+    # Lesson import
+    # Sentences of bulk imports are tokenized on a pool of worker processes
+    TOKENIZER_WORKERS: int = 2
+    TOKENIZER_MIN_BATCH_SIZE: int = 200
+    TOKENIZER_CHUNK_SIZE: int = 100
+    # "forkserver" or "spawn", workers must not be forked from the server
+    TOKENIZER_START_METHOD: str = "forkserver"
+
+    # Cache
+    # "memory" keeps a cache per instance, "redis" shares one across instances
+    CACHE_BACKEND: str = "memory"
+    # Required by the "redis" backend. Also carries invalidations between
+    # instances when set, whatever the backend
+    CACHE_REDIS_URL: str | None = None
+    CACHE_INVALIDATION_CHANNEL: str = "lingua-tile:cache-invalidation"
+    # Every key the cache writes to Redis starts with it, and clearing the cache
+    # deletes only those
+    CACHE_KEY_PREFIX: str = "lingua-tile:cache:"
+    # Versions of the invalidated cache tags, for instances started later. Kept
+    # for longer than any cache entry lives
+    CACHE_TAG_VERSIONS_KEY: str = "lingua-tile:cache-tag-versions"
+    CACHE_TAG_VERSION_RETENTION_SECONDS: int = 24 * 60 * 60
+    # Per-process tier in front of the backend, bounded by the size of its values
+    CACHE_L1_MAX_BYTES: int = 32 * 1024 * 1024
+    # Larger values are never kept in the per-process tier
+    CACHE_L1_MAX_ENTRY_BYTES: int = 4 * 1024 * 1024
+    # How long a value read from Redis is kept in the per-process tier
+    CACHE_L1_TTL_SECONDS: int = 60
+    # How long catalog responses are cached
+    CACHE_LESSONS_TTL_SECONDS: int = 600
+    CACHE_SECTIONS_TTL_SECONDS: int = 3600
+    CACHE_DOWNLOAD_TTL_SECONDS: int = 600
+    # Startup warmup of the catalog responses, bounded so a slow database cannot
+    # hold up startup
+    CACHE_WARMUP_ENABLED: bool = True
+    CACHE_WARMUP_TIMEOUT_SECONDS: float = 10
+    # Sections whose downloads are warmed, ranked by recent review activity
+    CACHE_WARMUP_POPULAR_SECTIONS: int = 5
+    CACHE_WARMUP_POPULARITY_DAYS: int = 7
+    # Responses served at least CACHE_REFRESH_MIN_HITS times since they were
+    # cached are recomputed CACHE_REFRESH_AHEAD_SECONDS before they expire
+    CACHE_REFRESH_AHEAD_SECONDS: float = 60
+    CACHE_REFRESH_INTERVAL_SECONDS: float = 15
+    CACHE_REFRESH_MIN_HITS: int = 3
+    # How long clients may reuse catalog responses before revalidating their ETag
+    CATALOG_MAX_AGE_SECONDS: int = 0
+    # How old a catalog read may be to answer callers while it is being refreshed
+    SINGLE_FLIGHT_STALE_SECONDS: float = 30
 
     # External APIs
     API_KEY: str | None = None
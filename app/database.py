@@ -0,0 +1,158 @@
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from pymongo import AsyncMongoClient, WriteConcern
+from pymongo.asynchronous.client_session import AsyncClientSession
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import (
+    Nearest,
+    Primary,
+    PrimaryPreferred,
+    Secondary,
+    SecondaryPreferred,
+    _ServerMode,
+)
+
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def create_mongo_client(
+    host: str | None = None, event_listeners: list | None = None
+) -> AsyncMongoClient:
+    """Create a Mongo client using the pool and compression settings."""
+    return AsyncMongoClient(
+        host or settings.MONGO_HOST,
+        event_listeners=event_listeners or [],
+        minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+        maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+        maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        # Compressors the server does not support are skipped during the handshake
+        compressors=settings.MONGO_COMPRESSORS or None,
+    )
+
+
+async def warm_up_connections(client: AsyncMongoClient, count: int) -> None:
+    """
+    Open ``count`` pooled connections up front so the first requests after a
+    cold start do not pay for the TCP and TLS handshakes. Concurrent pings each
+    need their own connection, which forces the pool to grow.
+    """
+    if count <= 0:
+        return
+
+    results = await asyncio.gather(
+        *(client.admin.command("ping") for _ in range(count)),
+        return_exceptions=True,
+    )
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors:
+        logger.warning(f"Failed to pre-warm {len(errors)} MongoDB connection(s)")
+    else:
+        logger.info(f"Pre-warmed {count} MongoDB connection(s)")
+
+
+def write_concern_for(collection_name: str) -> WriteConcern | None:
+    """The write concern configured for a collection, None to use the default."""
+    w = settings.MONGO_WRITE_CONCERNS.get(collection_name)
+    if w is None:
+        return None
+    return WriteConcern(w=int(w) if w.isdigit() else w)
+
+
+def get_collection(db: AsyncDatabase, collection_name: str) -> AsyncCollection:
+    return db.get_collection(
+        collection_name, write_concern=write_concern_for(collection_name)
+    )
+
+
+_SECONDARY_READ_PREFERENCES = {
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+def catalog_read_preference() -> _ServerMode:
+    """The read preference used for catalog reads."""
+    mode = settings.MONGO_CATALOG_READ_PREFERENCE
+    if mode == "primary":
+        return Primary()
+    if mode not in _SECONDARY_READ_PREFERENCES:
+        raise ValueError(f"Unknown read preference: {mode}")
+    return _SECONDARY_READ_PREFERENCES[mode](
+        max_staleness=settings.MONGO_CATALOG_MAX_STALENESS_SECONDS
+    )
+
+
+def get_catalog_collection(db: AsyncDatabase, collection_name: str) -> AsyncCollection:
+    """A collection whose reads follow the catalog read preference and concern."""
+    return db.get_collection(
+        collection_name,
+        read_preference=catalog_read_preference(),
+        read_concern=ReadConcern(settings.MONGO_CATALOG_READ_CONCERN),
+        write_concern=write_concern_for(collection_name),
+    )
+
+
+class CausalClock:
+    """
+    The latest cluster and operation time seen by catalog writes in this process.
+    Catalog reads advance their session to it, so a secondary only answers once it
+    has replicated those writes: an admin reads their own edits, and caches are
+    never refilled with data older than the last write.
+    """
+
+    def __init__(self):
+        self.cluster_time: dict | None = None
+        self.operation_time = None
+
+    def advance(self, session: AsyncClientSession) -> None:
+        if self.cluster_time is not None:
+            session.advance_cluster_time(self.cluster_time)
+        if self.operation_time is not None:
+            session.advance_operation_time(self.operation_time)
+
+    def observe(self, session: AsyncClientSession) -> None:
+        cluster_time = session.cluster_time
+        if cluster_time is not None and (
+            self.cluster_time is None
+            or cluster_time["clusterTime"] > self.cluster_time["clusterTime"]
+        ):
+            self.cluster_time = cluster_time
+
+        operation_time = session.operation_time
+        if operation_time is not None and (
+            self.operation_time is None or operation_time > self.operation_time
+        ):
+            self.operation_time = operation_time
+
+
+catalog_clock = CausalClock()
+
+
+@asynccontextmanager
+async def catalog_session(
+    client: AsyncMongoClient,
+) -> AsyncIterator[AsyncClientSession | None]:
+    """
+    A causally consistent session for catalog reads and writes, synchronised with
+    the catalog clock. Yields None when catalog reads go to the primary, which is
+    consistent without one.
+    """
+    if settings.MONGO_CATALOG_READ_PREFERENCE == "primary":
+        yield None
+        return
+
+    async with client.start_session(causal_consistency=True) as session:
+        catalog_clock.advance(session)
+        yield session
+        catalog_clock.observe(session)
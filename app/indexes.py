@@ -0,0 +1,73 @@
+import logging
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Indexes backing the queries issued by services/*.py, keyed by collection.
+# Every entry is named explicitly so that re-applying the registry is a no-op.
+INDEXES: dict[str, list[IndexModel]] = {
+    "users": [
+        IndexModel([("username", ASCENDING)], name="username_1", unique=True),
+        IndexModel([("email", ASCENDING)], name="email_1"),
+        IndexModel([("reset_token", ASCENDING)], name="reset_token_1", sparse=True),
+    ],
+    "lesson_reviews": [
+        IndexModel(
+            [("lesson_id", ASCENDING), ("user_id", ASCENDING)],
+            name="lesson_id_1_user_id_1",
+            # One review state per user and lesson, so concurrent upserts cannot
+            # create duplicates
+            unique=True,
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("next_review", ASCENDING)],
+            name="user_id_1_next_review_1",
+        ),
+    ],
+    "review_logs": [
+        IndexModel(
+            [("user_id", ASCENDING), ("review_date", DESCENDING)],
+            name="user_id_1_review_date_-1",
+        ),
+        # Recent activity across all users, which ranks sections for cache warmup
+        IndexModel([("review_date", DESCENDING)], name="review_date_-1"),
+    ],
+    "lessons": [
+        IndexModel(
+            [("category", ASCENDING), ("order_index", ASCENDING)],
+            name="category_1_order_index_1",
+        ),
+        IndexModel([("order_index", ASCENDING)], name="order_index_1"),
+        IndexModel([("section_id", ASCENDING)], name="section_id_1"),
+    ],
+    "cards": [
+        IndexModel([("lesson_ids", ASCENDING)], name="lesson_ids_1"),
+    ],
+    "sections": [
+        IndexModel([("order_index", ASCENDING)], name="order_index_1"),
+        IndexModel([("lesson_ids", ASCENDING)], name="lesson_ids_1"),
+    ],
+}
+
+
+async def ensure_indexes(db: AsyncDatabase) -> None:
+    """
+    Create every index in the registry that does not exist yet.
+    Indexes are created one at a time so that a single failure (e.g. a unique
+    index over existing duplicates) is logged without blocking the others.
+    """
+    for collection_name, indexes in INDEXES.items():
+        collection = db[collection_name]
+        for index in indexes:
+            try:
+                await collection.create_indexes([index])
+            except PyMongoError as e:
+                logger.error(
+                    f"Failed to create index {index.document['name']} "
+                    f"on {collection_name}: {e}"
+                )
+
+    logger.info("Ensured MongoDB indexes")
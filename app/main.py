@@ -1,3 +1,4 @@
+import asyncio
 import logging
 
 # from apscheduler.schedulers.asyncio import AsyncIOScheduler
@@ -7,7 +8,6 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pymongo import AsyncMongoClient
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
@@ -24,16 +24,31 @@ from api.auth import router as auth_router
 from api.cards import router as cards_router
 from api.health import router as health_router
 from api.lessons import router as lessons_router
+from api.metrics import router as metrics_router
 from api.notifications import router as notifications_router
 from api.sections import router as section_router
 from api.translations import router as translations_router
 from api.users import router as users_router
 from app.cache_config import setup_cache
+from app.cache_invalidation import (
+    announce_catalog_version,
+    invalidation_bus,
+    load_shared_tag_versions,
+    shared_tag_versions,
+)
+from app.cache_warmup import cache_warmer
 from app.config import get_settings
+from app.database import create_mongo_client, get_collection, warm_up_connections
 from app.exception_handlers import add_exception_handlers
+from app.indexes import ensure_indexes
 from app.limiter import limiter
 from app.logging_config import setup_logging
 from app.middleware.correlation import CorrelationIdMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.mongo_monitoring import command_listener, pool_listener
+from app.security import password_hasher
+from app.tokenizer import sentence_tokenizer
+from app.write_behind import review_log_buffer
 
 # setup_cache()
 settings = get_settings()
@@ -43,18 +58,51 @@ settings = get_settings()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     setup_logging()
+    if settings.METRICS_PUBLIC and settings.METRICS_TOKEN is None:
+        logging.warning("METRICS_PUBLIC is set, /api/metrics is served to anyone")
     mongo_host = settings.MONGO_HOST
     if mongo_host:
-        dependencies.db_client = AsyncMongoClient(mongo_host)
+        dependencies.db_client = create_mongo_client(
+            mongo_host, event_listeners=[command_listener, pool_listener]
+        )
         # Store in app.state for cleaner access (even though dependencies.db_client is still used)
         app.state.mongo_client = dependencies.db_client
         logging.info("Connected to MongoDB")
+        await warm_up_connections(dependencies.db_client, settings.MONGO_MIN_POOL_SIZE)
+
+        try:
+            await asyncio.wait_for(
+                ensure_indexes(dependencies.db_client["lingua-tile"]),
+                settings.MONGO_INDEX_TIMEOUT_SECONDS,
+            )
+        except TimeoutError:
+            logging.warning("Index creation timed out, starting without it")
+        review_log_buffer.start(
+            get_collection(dependencies.db_client["lingua-tile"], "review_logs")
+        )
     else:
         logging.warning("MONGO_HOST not set, skipping MongoDB connection")
 
+    await invalidation_bus.start()
+    await load_shared_tag_versions()
+    await announce_catalog_version()
+
+    if mongo_host and settings.CACHE_WARMUP_ENABLED:
+        catalog_db = dependencies.db_client["lingua-tile"]
+        try:
+            await asyncio.wait_for(
+                cache_warmer.warm(catalog_db), settings.CACHE_WARMUP_TIMEOUT_SECONDS
+            )
+        except TimeoutError:
+            logging.warning("Cache warmup timed out, serving with a partial cache")
+        except Exception:
+            logging.exception("Cache warmup failed")
+        cache_warmer.start(catalog_db)
+
     # scheduler.add_job(
     #     check_overdue_reviews,
     #     IntervalTrigger(hours=24),  # Check every 24 hours
+    #     kwargs={"client": dependencies.db_client},  # Reuse the app's connection pool
     #     id="check_reviews",
     #     replace_existing=True,
     # )
@@ -62,6 +110,15 @@ async def lifespan(app: FastAPI):
 
     yield
 
+    await cache_warmer.stop()
+    await invalidation_bus.stop()
+    if shared_tag_versions is not None:
+        await shared_tag_versions.close()
+    password_hasher.shutdown()
+    sentence_tokenizer.shutdown()
+    # Flush buffered writes before the connection is closed
+    await review_log_buffer.stop()
+
     if dependencies.db_client:
         await dependencies.db_client.close()
         logging.info("Closed MongoDB connection")
@@ -81,6 +138,7 @@ app.include_router(auth_router)
 app.include_router(users_router)
 app.include_router(section_router)
 app.include_router(notifications_router)
+app.include_router(metrics_router)
 
 origins = ["*"]
 app.add_middleware(
@@ -89,6 +147,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 
@@ -105,3 +164,5 @@ app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 app.add_middleware(SlowAPIMiddleware)
 app.add_middleware(CorrelationIdMiddleware)
 app.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY)
+# Outermost, so the measured latency covers every other middleware
+app.add_middleware(MetricsMiddleware)
@@ -0,0 +1,300 @@
+"""
+Minimal metric collectors rendered in the Prometheus text exposition format.
+
+Updates are plain dict operations without locks: every collector is only
+touched from the event loop thread, and a single increment is atomic under the
+GIL anyway. Histograms count each observation in one bucket only and
+accumulate the buckets when they are rendered, so recording stays O(log n).
+"""
+
+from bisect import bisect_left
+
+from aiocache.plugins import BasePlugin
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds of the request latency buckets in seconds, the last bucket is +Inf
+LATENCY_BUCKETS_SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(str(value))}"'
+        for name, value in zip(names, values, strict=True)
+    )
+    return f"{{{pairs}}}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for labels, value in sorted(self._values.items()):
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, labels)} "
+                f"{_format_value(value)}"
+            )
+        return lines
+
+    def clear(self) -> None:
+        self._values.clear()
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def set(self, value: float, *labels: str) -> None:
+        """Mirror a cumulative count that is tracked elsewhere."""
+        self._values[labels] = value
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS_SECONDS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        self._bucket_counts: dict[tuple[str, ...], list[int]] = {}
+        self._sums: dict[tuple[str, ...], float] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        counts = self._bucket_counts.get(labels)
+        if counts is None:
+            counts = self._bucket_counts[labels] = [0] * (len(self.buckets) + 1)
+            self._sums[labels] = 0.0
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[labels] += value
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        bucket_labelnames = (*self.labelnames, "le")
+        for labels, counts in sorted(self._bucket_counts.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts, strict=True):
+                cumulative += count
+                le = bound if isinstance(bound, str) else _format_value(bound)
+                lines.append(
+                    f"{self.name}_bucket"
+                    f"{_format_labels(bucket_labelnames, (*labels, le))} {cumulative}"
+                )
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(
+                f"{self.name}_sum{label_str} {_format_value(self._sums[labels])}"
+            )
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+    def clear(self) -> None:
+        self._bucket_counts.clear()
+        self._sums.clear()
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[Metric] = []
+        self._collectors: list = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector) -> None:
+        """
+        Register a callable run before every render, for values that are cheaper
+        to read on scrape than to keep up to date on every change.
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# HTTP
+http_requests_total = registry.register(
+    Counter(
+        "http_requests_total",
+        "Total HTTP requests by route template",
+        ("method", "route", "status"),
+    )
+)
+http_request_duration_seconds = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency by route template",
+        ("method", "route"),
+    )
+)
+http_requests_in_flight = registry.register(
+    Gauge(
+        "http_requests_in_flight", "HTTP requests currently being served", ("method",)
+    )
+)
+
+# Cache
+cache_requests_total = registry.register(
+    Counter(
+        "cache_requests_total",
+        "Cache lookups by key family and result",
+        ("key_family", "result"),
+    )
+)
+cache_invalidations_total = registry.register(
+    Counter(
+        "cache_invalidations_total",
+        "Cache invalidations exchanged with other instances by direction",
+        ("direction",),
+    )
+)
+cache_l1_bytes = registry.register(
+    Gauge("cache_l1_bytes", "Bytes held by the in-process cache tier")
+)
+cache_l1_max_bytes = registry.register(
+    Gauge("cache_l1_max_bytes", "Capacity of the in-process cache tier in bytes")
+)
+cache_l1_entries = registry.register(
+    Gauge("cache_l1_entries", "Entries held by the in-process cache tier")
+)
+cache_l1_evictions_total = registry.register(
+    Counter(
+        "cache_l1_evictions_total",
+        "Entries removed from the in-process cache tier by reason",
+        ("reason",),
+    )
+)
+cache_tier_requests_total = registry.register(
+    Counter(
+        "cache_tier_requests_total",
+        "Cache lookups answered by each tier by result",
+        ("tier", "result"),
+    )
+)
+single_flight_calls_total = registry.register(
+    Counter(
+        "single_flight_calls_total",
+        "Coalesced service reads by method and how each call was answered",
+        ("method", "result"),
+    )
+)
+
+# MongoDB connection pool
+mongo_pool_connections = registry.register(
+    Gauge("mongo_pool_connections", "Open connections in the pool", ("address",))
+)
+mongo_pool_checked_out = registry.register(
+    Gauge(
+        "mongo_pool_checked_out_connections",
+        "Connections currently checked out of the pool",
+        ("address",),
+    )
+)
+mongo_pool_max_size = registry.register(
+    Gauge("mongo_pool_max_size", "Maximum size of the pool", ("address",))
+)
+mongo_pool_checkout_failures_total = registry.register(
+    Counter(
+        "mongo_pool_checkout_failures_total",
+        "Failed connection checkouts by reason",
+        ("address", "reason"),
+    )
+)
+
+# Background components
+password_hash_pending = registry.register(
+    Gauge("password_hash_pending", "Queued and running password hashing jobs")
+)
+password_hash_rejected_total = registry.register(
+    Counter(
+        "password_hash_rejected_total",
+        "Password hashing jobs rejected because the queue was full",
+    )
+)
+write_behind_queued = registry.register(
+    Gauge(
+        "write_behind_queued_documents",
+        "Documents waiting in a write-behind buffer",
+        ("buffer",),
+    )
+)
+write_behind_failed_total = registry.register(
+    Counter(
+        "write_behind_failed_documents_total",
+        "Documents a write-behind buffer failed to write",
+        ("buffer",),
+    )
+)
+
+# Cache key prefixes reported as their own family, any other key is "other"
+CACHE_KEY_FAMILIES = (
+    ("all_lessons", "all_lessons"),
+    ("category_", "category_*"),
+    ("download_", "download_*"),
+    ("all_sections", "all_sections"),
+)
+
+
+def cache_key_family(key: str) -> str:
+    for prefix, family in CACHE_KEY_FAMILIES:
+        if key.startswith(prefix):
+            return family
+    return "other"
+
+
+class CacheMetricsPlugin(BasePlugin):
+    """aiocache plugin counting hits and misses per cache key family."""
+
+    async def post_get(self, client, key, *args, ret=None, **kwargs):
+        cache_requests_total.inc(
+            cache_key_family(str(key)), "miss" if ret is None else "hit"
+        )
@@ -0,0 +1,222 @@
+import logging
+from bisect import bisect_left
+from collections import deque
+
+from pymongo import monitoring
+
+from app.context import get_request_id
+from app.metrics import (
+    mongo_pool_checked_out,
+    mongo_pool_checkout_failures_total,
+    mongo_pool_connections,
+    mongo_pool_max_size,
+)
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency buckets in milliseconds, the last bucket is +Inf
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+RECENT_COMMANDS_MAX_SIZE = 1000
+
+# Commands that carry the collection name in a field other than the command name
+_COLLECTION_FIELDS = {"getMore": "collection"}
+
+
+class CommandStats:
+    """Latency histogram and document counts of one (collection, command) pair."""
+
+    def __init__(self):
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.failures = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.documents = 0
+        self.max_documents = 0
+
+    def record(self, duration_ms: float, documents: int, failed: bool) -> None:
+        self.bucket_counts[bisect_left(LATENCY_BUCKETS_MS, duration_ms)] += 1
+        self.count += 1
+        self.failures += failed
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.documents += documents
+        self.max_documents = max(self.max_documents, documents)
+
+    def to_dict(self) -> dict:
+        buckets = {
+            str(bound): count
+            for bound, count in zip(
+                (*LATENCY_BUCKETS_MS, "+Inf"), self.bucket_counts, strict=True
+            )
+        }
+        return {
+            "count": self.count,
+            "failures": self.failures,
+            "total_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "avg_documents": (
+                round(self.documents / self.count, 1) if self.count else 0.0
+            ),
+            "max_documents": self.max_documents,
+            "latency_buckets_ms": buckets,
+        }
+
+
+def _reply_documents(reply: dict) -> int:
+    """
+    The number of documents a reply returned (cursor batches) or wrote (``n``).
+    Counted from fields already decoded, as measuring the encoded reply would
+    cost about as much as decoding it again.
+    """
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", ())))
+    n = reply.get("n")
+    return n if isinstance(n, int) else 0
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """
+    Records the latency and document count of every command sent by a client,
+    aggregated per collection and command name. The most recent commands are
+    kept along with the id of the API request that issued them, so a slow
+    request can be traced back to its queries.
+    """
+
+    def __init__(self, recent_max_size: int = RECENT_COMMANDS_MAX_SIZE):
+        self.stats: dict[tuple[str, str], CommandStats] = {}
+        self.recent: deque[dict] = deque(maxlen=recent_max_size)
+        # Started commands waiting for their reply, keyed by connection and
+        # operation id
+        self._in_flight: dict[tuple, tuple[str, str]] = {}
+
+    @staticmethod
+    def _collection_name(event: monitoring.CommandStartedEvent) -> str:
+        field = _COLLECTION_FIELDS.get(event.command_name, event.command_name)
+        collection = event.command.get(field)
+        return collection if isinstance(collection, str) else ""
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        self._in_flight[(event.connection_id, event.request_id)] = (
+            self._collection_name(event),
+            get_request_id(),
+        )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._record(event, _reply_documents(event.reply), failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._record(event, 0, failed=True)
+
+    def _record(
+        self,
+        event: monitoring.CommandSucceededEvent | monitoring.CommandFailedEvent,
+        documents: int,
+        failed: bool,
+    ) -> None:
+        collection, request_id = self._in_flight.pop(
+            (event.connection_id, event.request_id), ("", get_request_id())
+        )
+        duration_ms = event.duration_micros / 1000
+
+        key = (collection, event.command_name)
+        if key not in self.stats:
+            self.stats[key] = CommandStats()
+        self.stats[key].record(duration_ms, documents, failed)
+
+        self.recent.append(
+            {
+                "request_id": request_id,
+                "collection": collection,
+                "command": event.command_name,
+                "duration_ms": round(duration_ms, 3),
+                "documents": documents,
+                "failed": failed,
+            }
+        )
+        logger.debug(
+            f"[{request_id}] mongo {event.command_name} {collection} "
+            f"took {duration_ms:.3f}ms ({documents} documents)"
+        )
+
+    def snapshot(self, request_id: str | None = None) -> dict:
+        """
+        Aggregates per collection and command, slowest in total first, and the
+        recent commands (optionally only those of one request).
+        """
+        commands = [
+            {"collection": collection, "command": command, **stats.to_dict()}
+            for (collection, command), stats in self.stats.items()
+        ]
+        commands.sort(key=lambda command: command["total_ms"], reverse=True)
+
+        recent = list(self.recent)
+        if request_id:
+            recent = [
+                command for command in recent if command["request_id"] == request_id
+            ]
+
+        return {"commands": commands, "recent": recent}
+
+    def reset(self) -> None:
+        self.stats.clear()
+        self.recent.clear()
+        self._in_flight.clear()
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Keeps the connection pool gauges of app.metrics up to date."""
+
+    @staticmethod
+    def _address(event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        mongo_pool_max_size.set(
+            event.options.get("maxPoolSize", 100), self._address(event)
+        )
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        pass
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        address = self._address(event)
+        mongo_pool_connections.set(0, address)
+        mongo_pool_checked_out.set(0, address)
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        mongo_pool_connections.inc(self._address(event))
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        mongo_pool_connections.dec(self._address(event))
+
+    def connection_check_out_started(
+        self, event: monitoring.ConnectionCheckOutStartedEvent
+    ) -> None:
+        pass
+
+    def connection_check_out_failed(
+        self, event: monitoring.ConnectionCheckOutFailedEvent
+    ) -> None:
+        mongo_pool_checkout_failures_total.inc(self._address(event), event.reason)
+
+    def connection_checked_out(
+        self, event: monitoring.ConnectionCheckedOutEvent
+    ) -> None:
+        mongo_pool_checked_out.inc(self._address(event))
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        mongo_pool_checked_out.dec(self._address(event))
+
+
+command_listener = MongoCommandListener()
+pool_listener = PoolMetricsListener()
@@ -0,0 +1,120 @@
+import time
+from collections import OrderedDict
+from typing import Any
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Fields that are never needed to authenticate or authorize a request.
+# completed_lessons and push_subscriptions are unbounded, so they are left out
+# of the cached principal and loaded only by the routes that need them.
+PRINCIPAL_PROJECTION = {
+    "password": 0,
+    "reset_token": 0,
+    "reset_token_expires": 0,
+    "completed_lessons": 0,
+    "push_subscriptions": 0,
+}
+
+
+class TTLCache:
+    """
+    Bounded in-process LRU cache whose entries expire after a fixed TTL.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._evict(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+
+        if key in self._entries:
+            self._evict(key)
+
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+
+        while len(self._entries) > self.max_size:
+            oldest_key = next(iter(self._entries))
+            self._evict(oldest_key)
+
+    def invalidate(self, key: str) -> None:
+        self._evict(str(key))
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _evict(self, key: str) -> Any | None:
+        entry = self._entries.pop(key, None)
+        return entry[1] if entry is not None else None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class PrincipalCache(TTLCache):
+    """
+    Cache of authenticated principals keyed by the token subject (username),
+    holding the projected user document. A secondary index by user id allows
+    services, which only know the id, to invalidate an entry after a write.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        super().__init__(max_size, ttl)
+        self._subjects_by_id: dict[str, str] = {}
+
+    def set(self, subject: str, principal: dict[str, Any]) -> None:
+        super().set(subject, principal)
+        if subject in self._entries:
+            self._subjects_by_id[str(principal["_id"])] = subject
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop the cached principal of the user with the given id, if any."""
+        subject = self._subjects_by_id.get(str(user_id))
+        if subject is not None:
+            self._evict(subject)
+
+    def clear(self) -> None:
+        super().clear()
+        self._subjects_by_id.clear()
+
+    def _evict(self, subject: str) -> dict[str, Any] | None:
+        principal = super()._evict(subject)
+        if principal is not None:
+            self._subjects_by_id.pop(str(principal["_id"]), None)
+        return principal
+
+
+principal_cache = PrincipalCache(
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+# Maps user ids to their current token version, used to revoke claims-bearing
+# tokens without reading the full user document on every request.
+token_version_cache = TTLCache(
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl=settings.TOKEN_VERSION_CACHE_TTL_SECONDS,
+)
+
+
+def invalidate_user(user_id: str) -> None:
+    """Drop every cached authentication entry for the given user."""
+    principal_cache.invalidate(user_id)
+    token_version_cache.invalidate(user_id)
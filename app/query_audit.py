@@ -0,0 +1,160 @@
+"""
+Query-plan audit for the query shapes issued by services/*.py.
+
+Runs explain() on each shape and reports the ones whose winning plan contains a
+collection scan. Usage:
+
+    python -m app.query_audit [--database lingua-tile] [--ensure-indexes]
+
+Exits with status 1 if any shape that is expected to use an index scans the
+whole collection.
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+from bson import ObjectId
+from pymongo.asynchronous.database import AsyncDatabase
+
+from app.database import create_mongo_client
+from app.indexes import ensure_indexes
+
+
+class QueryShape(NamedTuple):
+    name: str
+    collection: str
+    filter: dict
+    sort: list[tuple[str, int]] | None = None
+    # Full-collection listings are allowed to scan
+    expect_collscan: bool = False
+
+
+_sample_id = str(ObjectId())
+_now = datetime.now(timezone.utc)
+
+QUERY_SHAPES: list[QueryShape] = [
+    # UserService / auth
+    QueryShape("users by username", "users", {"username": "sample"}),
+    QueryShape("users by email", "users", {"email": "sample@example.com"}),
+    QueryShape("users by id", "users", {"_id": ObjectId(_sample_id)}),
+    QueryShape(
+        "users by reset token",
+        "users",
+        {"reset_token": "sample", "reset_token_expires": {"$gt": _now}},
+    ),
+    QueryShape("all users", "users", {}, expect_collscan=True),
+    # LessonService
+    QueryShape("all lessons", "lessons", {}, sort=[("order_index", 1)]),
+    QueryShape(
+        "lessons by category",
+        "lessons",
+        {"category": {"$regex": "^grammar", "$options": "i"}},
+        sort=[("order_index", 1)],
+    ),
+    QueryShape("lesson by id", "lessons", {"_id": ObjectId(_sample_id)}),
+    QueryShape(
+        "lesson review by lesson and user",
+        "lesson_reviews",
+        {"lesson_id": _sample_id, "user_id": _sample_id},
+    ),
+    QueryShape("lesson reviews by user", "lesson_reviews", {"user_id": _sample_id}),
+    QueryShape(
+        "overdue lesson reviews by user",
+        "lesson_reviews",
+        {"user_id": _sample_id, "next_review": {"$lte": _now}},
+    ),
+    QueryShape(
+        "review history by user",
+        "review_logs",
+        {"user_id": _sample_id},
+        sort=[("review_date", -1)],
+    ),
+    # CardService
+    QueryShape("all cards", "cards", {}, expect_collscan=True),
+    QueryShape("cards by lesson", "cards", {"lesson_ids": _sample_id}),
+    QueryShape("cards by ids", "cards", {"_id": {"$in": [ObjectId(_sample_id)]}}),
+    # SectionService
+    QueryShape("all sections", "sections", {}, sort=[("order_index", 1)]),
+    QueryShape("section by id", "sections", {"_id": ObjectId(_sample_id)}),
+    QueryShape(
+        "lessons by section",
+        "lessons",
+        {"section_id": ObjectId(_sample_id)},
+        sort=[("order_index", 1)],
+    ),
+    QueryShape(
+        "sections containing lessons",
+        "sections",
+        {"lesson_ids": {"$in": [_sample_id]}},
+    ),
+]
+
+
+def find_stages(plan) -> set[str]:
+    """Collect the names of every stage in an explain() plan tree."""
+    stages = set()
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.add(plan["stage"])
+        for value in plan.values():
+            stages |= find_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            stages |= find_stages(item)
+    return stages
+
+
+async def audit_query_shapes(db: AsyncDatabase) -> list[tuple[QueryShape, set[str]]]:
+    """Explain every query shape and return the stages used by its winning plan."""
+    results = []
+    for shape in QUERY_SHAPES:
+        cursor = db[shape.collection].find(shape.filter)
+        if shape.sort:
+            cursor = cursor.sort(shape.sort)
+        explanation = await cursor.explain()
+        winning_plan = explanation.get("queryPlanner", {}).get("winningPlan", {})
+        results.append((shape, find_stages(winning_plan)))
+    return results
+
+
+async def main(database: str, apply_indexes: bool) -> int:
+    client = create_mongo_client()
+    try:
+        db = client[database]
+        if apply_indexes:
+            await ensure_indexes(db)
+
+        failures = 0
+        for shape, stages in await audit_query_shapes(db):
+            collscan = "COLLSCAN" in stages
+            if collscan and not shape.expect_collscan:
+                status = "COLLSCAN"
+                failures += 1
+            elif collscan:
+                status = "collscan (expected)"
+            else:
+                status = "ok"
+            print(
+                f"{status:<20} {shape.collection:<15} {shape.name:<35} "
+                f"{', '.join(sorted(stages))}"
+            )
+    finally:
+        await client.close()
+
+    print(f"\n{failures} unexpected collection scan(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--database", default="lingua-tile")
+    parser.add_argument(
+        "--ensure-indexes",
+        action="store_true",
+        help="apply the index registry before auditing",
+    )
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.database, args.ensure_indexes)))
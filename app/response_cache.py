@@ -0,0 +1,152 @@
+import functools
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+
+from aiocache import caches
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse, Response
+
+from app.cache_tags import entry_tags, pack_entry, stamp, unpack_entry, versioned_key
+
+logger = logging.getLogger(__name__)
+
+JSON_MEDIA_TYPE = "application/json"
+
+# Cached responses whose expiry and hits are tracked for refresh-ahead
+MAX_TRACKED_KEYS = 1024
+
+
+def _raw(value):
+    # Bodies are stored as they will be sent, without a serializer round trip
+    return value
+
+
+def encode_body(result) -> bytes | None:
+    """
+    The JSON body FastAPI would send for ``result``, or None when the result is
+    not a plain JSON response (a stream, a redirect, an error) and is not cached.
+    """
+    if isinstance(result, Response):
+        if result.status_code != 200 or result.media_type != JSON_MEDIA_TYPE:
+            return None
+        return getattr(result, "body", None)
+    return JSONResponse(content=jsonable_encoder(result)).body
+
+
+class HotKeys:
+    """
+    When each cached response expires and how often it was served since it was
+    stored, so that the busy ones can be recomputed shortly before they expire
+    (see app.cache_warmup).
+    """
+
+    def __init__(self, max_keys: int = MAX_TRACKED_KEYS):
+        self.max_keys = max_keys
+        self._keys: OrderedDict[str, list] = OrderedDict()
+
+    def stored(self, key: str, ttl: int) -> None:
+        self._keys[key] = [time.monotonic() + ttl, ttl, 0]
+        self._keys.move_to_end(key)
+        while len(self._keys) > self.max_keys:
+            self._keys.popitem(last=False)
+
+    def hit(self, key: str) -> None:
+        entry = self._keys.get(key)
+        if entry is not None:
+            entry[2] += 1
+
+    def due(self, within: float, min_hits: int) -> list[tuple[str, int]]:
+        """Keys served at least ``min_hits`` times that expire within ``within``."""
+        now = time.monotonic()
+        due = []
+        for key, (expires_at, ttl, hits) in list(self._keys.items()):
+            if expires_at <= now:
+                # Expired without being refreshed, the cache no longer holds it
+                del self._keys[key]
+            elif expires_at - now <= within and hits >= min_hits:
+                due.append((key, ttl))
+        return due
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+hot_keys = HotKeys()
+
+
+def response_slot(key: str) -> tuple[str, int]:
+    """
+    Where a response for ``key`` computed from now on is stored: its versioned
+    key and the stamp of its entry (see app.cache_tags). Taken before the
+    response is computed, so a write that lands meanwhile outdates it.
+    """
+    return versioned_key(key), stamp()
+
+
+async def store_response(
+    key: str, result, ttl: int, slot: tuple[str, int], alias: str = "default"
+):
+    """
+    Cache the JSON body of ``result`` in the ``slot`` of ``key``, tagged with
+    what it depends on. Returns the body, or None when the result is not
+    cacheable.
+    """
+    body = encode_body(result)
+    if body is None:
+        return None
+
+    stored_key, entry_stamp = slot
+    value = pack_entry(body, entry_stamp, entry_tags(key, result))
+    try:
+        await caches.get(alias).set(stored_key, value, ttl=ttl, dumps_fn=_raw)
+        hot_keys.stored(key, ttl)
+    except Exception:
+        logger.exception("Couldn't cache response %s", key)
+    return body
+
+
+def cached_response(
+    ttl: int, key_builder: Callable[..., str], alias: str = "default"
+) -> Callable:
+    """
+    Cache the encoded JSON body of a route. A hit returns the stored bytes as
+    they are, skipping unpickling, ``jsonable_encoder`` and response model
+    serialization, which ``aiocache.cached`` would all repeat on every hit.
+
+    ``key_builder`` is called like the ``aiocache.cached`` one. Entries are
+    stored under a versioned form of its key and dropped when a tag they depend
+    on is invalidated (see app.cache_tags); clearing the key as a namespace
+    still removes every version. Cache errors are logged and the route is
+    served uncached, as with ``aiocache.cached``.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            cache = caches.get(alias)
+            key = key_builder(func, *args, **kwargs)
+            slot = response_slot(key)
+
+            body = None
+            try:
+                value = await cache.get(slot[0], loads_fn=_raw)
+                if value is not None:
+                    body = unpack_entry(value)
+            except Exception:
+                # Serve from the database while the cache is unavailable
+                logger.exception("Couldn't read cached response %s", key)
+            if body is not None:
+                hot_keys.hit(key)
+                return Response(content=body, media_type=JSON_MEDIA_TYPE)
+
+            result = await func(*args, **kwargs)
+            body = await store_response(key, result, ttl, slot, alias)
+            if body is None:
+                return result
+            return Response(content=body, media_type=JSON_MEDIA_TYPE)
+
+        return wrapper
+
+    return decorator
@@ -1,3 +1,111 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
 from passlib.context import CryptContext
 
+from app.config import get_settings
+from app.metrics import password_hash_pending, password_hash_rejected_total, registry
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification on a dedicated thread pool so that it
+    never blocks the event loop. bcrypt releases the GIL while it works, so a
+    small pool of threads is enough to use the available cores.
+
+    The number of queued and running jobs is capped; once the cap is reached new
+    jobs are rejected with a 503 instead of piling up behind a login burst.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: ThreadPoolExecutor | None = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="password-hasher"
+            )
+        return self._executor
+
+    async def _run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            logger.warning("Password hashing queue is saturated, rejecting request")
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, please try again shortly",
+            )
+
+        self.pending += 1
+        queued_at = time.perf_counter()
+
+        def timed_call():
+            return time.perf_counter(), func(*args)
+
+        try:
+            loop = asyncio.get_running_loop()
+            started_at, result = await loop.run_in_executor(self.executor, timed_call)
+        finally:
+            self.pending -= 1
+
+        # Time spent waiting for a free worker thread
+        self._record_wait(started_at - queued_at)
+        return result
+
+    def _record_wait(self, wait_seconds: float) -> None:
+        self.completed += 1
+        self.total_wait_seconds += wait_seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(pwd_context.verify, password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_seconds": self.total_wait_seconds / self.completed
+            if self.completed
+            else 0.0,
+            "max_wait_seconds": self.max_wait_seconds,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
+
+
+def _collect_metrics() -> None:
+    password_hash_pending.set(password_hasher.pending)
+    password_hash_rejected_total.set(password_hasher.rejected)
+
+
+registry.add_collector(_collect_metrics)
@@ -0,0 +1,162 @@
+import asyncio
+import functools
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+
+from app.catalog_version import catalog_version
+from app.config import get_settings
+from app.metrics import registry, single_flight_calls_total
+
+settings = get_settings()
+
+# Previous results kept per decorated method for stale-while-revalidate
+MAX_STALE_ENTRIES = 256
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: the first caller (the leader) runs the
+    call as a task and later callers await the same task instead of repeating it.
+    The task is shielded, so a leader whose request is cancelled does not take
+    the other callers down with it. Exceptions reach every caller.
+
+    With ``stale_for`` set, the last result of each call is kept for that many
+    seconds, and callers arriving while a new call is in flight get it straight
+    away instead of waiting (stale-while-revalidate).
+
+    ``generation`` separates calls made before and after a change to the data:
+    a call never joins a flight, or gets a result, from another generation.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        stale_for: float | None = None,
+        generation: Callable[[], Hashable] | None = None,
+    ):
+        self.name = name
+        self.stale_for = stale_for
+        self.generation = generation
+        self._in_flight: dict[Hashable, asyncio.Task] = {}
+        self._results: OrderedDict[Hashable, tuple[Hashable, float, object]] = (
+            OrderedDict()
+        )
+        self.leaders = 0
+        self.shared = 0
+        self.stale = 0
+
+    async def do(self, key: Hashable, call: Callable):
+        generation = self.generation() if self.generation else None
+        flight_key = (generation, key)
+
+        task = self._in_flight.get(flight_key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(call())
+            self._in_flight[flight_key] = task
+            task.add_done_callback(
+                functools.partial(self._landed, flight_key, key, generation)
+            )
+        else:
+            stale = self._stale_result(key, generation)
+            if stale is not None:
+                self.stale += 1
+                return stale[0]
+            self.shared += 1
+
+        return await asyncio.shield(task)
+
+    def _stale_result(self, key: Hashable, generation: Hashable) -> tuple | None:
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        result_generation, landed_at, result = entry
+        if result_generation != generation:
+            return None
+        if time.monotonic() - landed_at > self.stale_for:
+            return None
+        return (result,)
+
+    def _landed(
+        self,
+        flight_key: Hashable,
+        key: Hashable,
+        generation: Hashable,
+        task: asyncio.Task,
+    ) -> None:
+        self._in_flight.pop(flight_key, None)
+        if self.stale_for is None or task.cancelled() or task.exception() is not None:
+            return
+
+        self._results[key] = (generation, time.monotonic(), task.result())
+        self._results.move_to_end(key)
+        while len(self._results) > MAX_STALE_ENTRIES:
+            self._results.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._in_flight),
+            "leaders": self.leaders,
+            "shared": self.shared,
+            "stale": self.stale,
+        }
+
+
+_flights: list[SingleFlight] = []
+
+
+def _call_key(args: tuple, kwargs: dict) -> Hashable:
+    # Arguments may be lists (sparse fieldsets), so key on their repr
+    return repr((args, sorted(kwargs.items())))
+
+
+def single_flight(
+    stale_for: float | None = None,
+    generation: Callable[[], Hashable] | None = None,
+) -> Callable:
+    """
+    Coalesce concurrent calls of a service method made with the same arguments
+    against the same database. See SingleFlight.
+    """
+
+    def decorator(func):
+        flight = SingleFlight(func.__qualname__, stale_for, generation)
+        _flights.append(flight)
+
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            key = (self.db.name, _call_key(args, kwargs))
+            return await flight.do(key, lambda: func(self, *args, **kwargs))
+
+        wrapper.flight = flight
+        return wrapper
+
+    return decorator
+
+
+def catalog_generation() -> int:
+    """Generation of catalog reads, which changes with every catalog write."""
+    return catalog_version.value
+
+
+def catalog_read(serve_stale: bool = False) -> Callable:
+    """
+    single_flight for catalog reads, whose flights and stale results end with
+    the next catalog write. Listing reads may serve stale results, for up to
+    SINGLE_FLIGHT_STALE_SECONDS.
+    """
+    return single_flight(
+        stale_for=settings.SINGLE_FLIGHT_STALE_SECONDS if serve_stale else None,
+        generation=catalog_generation,
+    )
+
+
+def _collect_metrics() -> None:
+    for flight in _flights:
+        single_flight_calls_total.set(flight.leaders, flight.name, "leader")
+        single_flight_calls_total.set(flight.shared, flight.name, "shared")
+        single_flight_calls_total.set(flight.stale, flight.name, "stale")
+
+
+registry.add_collector(_collect_metrics)
@@ -0,0 +1,308 @@
+import re
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from aiocache.base import BaseCache
+from aiocache.serializers import BaseSerializer
+
+# Approximate bookkeeping cost of one L1 entry on top of its key and value
+ENTRY_OVERHEAD_BYTES = 128
+# Keys fetched per SCAN call, and deleted per DEL, when clearing a key prefix
+REDIS_SCAN_COUNT = 500
+
+_REDIS_GLOB_SPECIAL = re.compile(r"([*?\[\]\\])")
+
+
+class BytesSerializer(BaseSerializer):
+    """Passes values through untouched; the tiered cache has serialized them."""
+
+    DEFAULT_ENCODING = None
+
+    def dumps(self, value):
+        return value
+
+    def loads(self, value):
+        return value
+
+
+class ByteSizeLRU:
+    """
+    In-process LRU of serialized values bounded by their total size in bytes.
+    Every entry has its own expiry; values larger than ``max_entry_bytes`` are
+    not kept at all, so one large bundle cannot flush the rest of the cache.
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries: OrderedDict[str, tuple[float | None, bytes]] = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejected = 0
+
+    @staticmethod
+    def _entry_size(key: str, value: bytes) -> int:
+        return len(key) + len(value) + ENTRY_OVERHEAD_BYTES
+
+    def get(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes, ttl: float | None) -> None:
+        self._remove(key)
+
+        size = self._entry_size(key, value)
+        if size > min(self.max_entry_bytes, self.max_bytes):
+            self.rejected += 1
+            return
+
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._entries[key] = (expires_at, value)
+        self.size_bytes += size
+
+        while self.size_bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def delete(self, key: str) -> bool:
+        return self._remove(key)
+
+    def exists(self, key: str) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and (entry[0] is None or entry[0] >= time.monotonic())
+
+    def clear(self, prefix: str | None = None) -> None:
+        if not prefix:
+            self._entries.clear()
+            self.size_bytes = 0
+            return
+
+        for key in [key for key in self._entries if key.startswith(prefix)]:
+            self._remove(key)
+
+    def _remove(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self.size_bytes -= self._entry_size(key, entry[1])
+        return True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "max_entry_bytes": self.max_entry_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "rejected": self.rejected,
+        }
+
+
+def _redis_cache(url: str, key_prefix: str) -> BaseCache:
+    # Optional dependency, only needed when the Redis tier is enabled
+    from aiocache import RedisCache
+
+    parsed = urlparse(url)
+    return RedisCache(
+        serializer=BytesSerializer(),
+        namespace=key_prefix,
+        endpoint=parsed.hostname or "localhost",
+        port=parsed.port or 6379,
+        db=int(parsed.path.lstrip("/") or 0),
+        password=parsed.password,
+    )
+
+
+async def clear_redis_prefix(client, prefix: str) -> int:
+    """
+    Delete every Redis key starting with ``prefix``. aiocache's own clear only
+    matches ``{namespace}:*``, which the cache keys (``all_lessons``,
+    ``download_<id>``) never have, and flushes the whole database when given no
+    namespace. SCAN walks the keyspace in steps instead of blocking Redis the way
+    KEYS does.
+    """
+    pattern = _REDIS_GLOB_SPECIAL.sub(r"\\\1", prefix) + "*"
+    deleted = 0
+    batch = []
+    async for key in client.scan_iter(match=pattern, count=REDIS_SCAN_COUNT):
+        batch.append(key)
+        if len(batch) >= REDIS_SCAN_COUNT:
+            deleted += await client.delete(*batch)
+            batch = []
+    if batch:
+        deleted += await client.delete(*batch)
+    return deleted
+
+
+class TieredCache(BaseCache):
+    """
+    aiocache backend with a bounded in-process L1 in front of an optional shared
+    L2 (Redis). Values reach the backend already serialized, which lets L1
+    account for their exact size.
+
+    Writes go to both tiers. An L1 miss falls through to L2 and the value found
+    there is kept in L1 for at most ``l1_ttl`` seconds, since L1 cannot see the
+    remaining TTL of the L2 entry. Other instances clear their L1 when they
+    receive an invalidation (see app.cache_invalidation).
+
+    L2 keys start with ``key_prefix``, and clearing the cache only deletes those,
+    so the Redis database can be shared with other data.
+    """
+
+    NAME = "tiered"
+
+    def __init__(
+        self,
+        l1_max_bytes: int = 64 * 1024 * 1024,
+        l1_max_entry_bytes: int = 8 * 1024 * 1024,
+        l1_ttl: float = 60,
+        redis_url: str | None = None,
+        key_prefix: str = "",
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        if redis_url and not key_prefix:
+            raise ValueError(
+                "The Redis tier needs a key prefix, or clearing the cache would "
+                "delete every key in its database"
+            )
+        self.l1 = ByteSizeLRU(l1_max_bytes, l1_max_entry_bytes)
+        self.l1_ttl = l1_ttl
+        self.l2 = _redis_cache(redis_url, key_prefix) if redis_url else None
+        self.l2_hits = 0
+        self.l2_misses = 0
+
+    def build_key(self, key: str, namespace: str | None = None) -> str:
+        return self._str_build_key(key, namespace)
+
+    def _l1_ttl(self, ttl: float | None) -> float:
+        # Without an L2 the L1 entry is the only copy and keeps the full TTL
+        if self.l2 is None:
+            return ttl
+        return min(ttl, self.l1_ttl) if ttl else self.l1_ttl
+
+    async def _get(self, key, encoding="utf-8", _conn=None):
+        value = self.l1.get(key)
+        if value is not None or self.l2 is None:
+            return value
+
+        value = await self.l2.get(key)
+        if value is None:
+            self.l2_misses += 1
+            return None
+
+        self.l2_hits += 1
+        self.l1.set(key, value, self.l1_ttl)
+        return value
+
+    async def _gets(self, key, encoding="utf-8", _conn=None):
+        return await self._get(key, encoding)
+
+    async def _multi_get(self, keys, encoding="utf-8", _conn=None):
+        return [await self._get(key, encoding) for key in keys]
+
+    async def _set(self, key, value, ttl=None, _cas_token=None, _conn=None):
+        if _cas_token is not None and _cas_token != await self._get(key):
+            return 0
+
+        self.l1.set(key, value, self._l1_ttl(ttl))
+        if self.l2 is not None:
+            await self.l2.set(key, value, ttl=ttl)
+        return True
+
+    async def _multi_set(self, pairs, ttl=None, _conn=None):
+        for key, value in pairs:
+            await self._set(key, value, ttl)
+        return True
+
+    async def _add(self, key, value, ttl=None, _conn=None):
+        if await self._exists(key):
+            raise ValueError(f"Key {key} already exists, use .set to update the value")
+        return await self._set(key, value, ttl)
+
+    async def _exists(self, key, _conn=None):
+        if self.l1.exists(key):
+            return True
+        return self.l2 is not None and await self.l2.exists(key)
+
+    async def _increment(self, key, delta, _conn=None):
+        # As documented for aiocache's increment, for values that are not integers
+        raise TypeError(
+            "The tiered cache stores serialized values, which cannot be incremented"
+        )
+
+    async def _expire(self, key, ttl, _conn=None):
+        value = await self._get(key)
+        if value is None:
+            return False
+        await self._set(key, value, ttl or None)
+        return True
+
+    async def _delete(self, key, _conn=None):
+        deleted = self.l1.delete(key)
+        if self.l2 is not None:
+            deleted = bool(await self.l2.delete(key)) or deleted
+        return int(deleted)
+
+    async def _clear(self, namespace=None, _conn=None):
+        # A namespace is a plain key prefix in both tiers, so that a clear
+        # removes every version of a key (``all_lessons@<version>``) from each
+        self.clear_local(namespace)
+        if self.l2 is not None:
+            await clear_redis_prefix(self.l2.client, self.l2.build_key(namespace or ""))
+        return True
+
+    def clear_local(self, namespace: str | None = None) -> None:
+        """Clear L1 only, for invalidations already applied to the shared L2."""
+        self.l1.clear(namespace)
+
+    async def _raw(self, command, *args, encoding="utf-8", _conn=None, **kwargs):
+        # Sent to Redis as given: keys are not prefixed and L1 is bypassed
+        if self.l2 is None:
+            raise RuntimeError(
+                f"Cannot send {command!r} to Redis, the cache has no Redis tier"
+            )
+        return await self.l2.raw(command, *args, **kwargs)
+
+    async def _redlock_release(self, key, value):
+        if await self._get(key) == value:
+            return await self._delete(key)
+        return 0
+
+    async def _close(self, *args, _conn=None, **kwargs):
+        if self.l2 is not None:
+            await self.l2.close()
+
+    def stats(self) -> dict:
+        return {
+            "l1": self.l1.stats(),
+            "l2": {
+                "enabled": self.l2 is not None,
+                "hits": self.l2_hits,
+                "misses": self.l2_misses,
+            },
+        }
@@ -0,0 +1,87 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from app.config import get_settings
+from models.sentences import split_sentence
+
+settings = get_settings()
+
+
+def _load_tagger() -> None:
+    """
+    Worker initializer. A worker started with TOKENIZER_START_METHOD imports
+    models.sentences afresh and so builds its own MeCab tagger; parsing once here
+    loads the dictionary before the first chunk arrives.
+    """
+    split_sentence("")
+
+
+def _split_sentences(sentences: list[str]) -> list[list[str]]:
+    return [split_sentence(sentence) for sentence in sentences]
+
+
+class SentenceTokenizer:
+    """
+    Splits sentences into words with MeCab on a pool of worker processes. MeCab
+    holds the GIL while it parses and a Tagger must not be shared between
+    threads, so each worker process loads its own tagger instead. Workers are not
+    forked from the server, whose threads and MeCab state a fork would copy.
+
+    Small batches are tokenized inline, where starting the pool or shipping the
+    sentences to it would cost more than the parsing itself.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        min_batch_size: int,
+        chunk_size: int,
+        start_method: str = "forkserver",
+    ):
+        self.max_workers = max_workers
+        self.min_batch_size = min_batch_size
+        self.chunk_size = chunk_size
+        self.start_method = start_method
+        self._executor: ProcessPoolExecutor | None = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+                initializer=_load_tagger,
+            )
+        return self._executor
+
+    async def split_many(self, sentences: list[str]) -> list[list[str]]:
+        """The words of every sentence, in the order the sentences were given."""
+        if len(sentences) < self.min_batch_size or self.max_workers <= 1:
+            return _split_sentences(sentences)
+
+        loop = asyncio.get_running_loop()
+        chunks = [
+            sentences[i : i + self.chunk_size]
+            for i in range(0, len(sentences), self.chunk_size)
+        ]
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(self.executor, _split_sentences, chunk)
+                for chunk in chunks
+            )
+        )
+        return [words for chunk_words in results for words in chunk_words]
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+sentence_tokenizer = SentenceTokenizer(
+    max_workers=settings.TOKENIZER_WORKERS,
+    min_batch_size=settings.TOKENIZER_MIN_BATCH_SIZE,
+    chunk_size=settings.TOKENIZER_CHUNK_SIZE,
+    start_method=settings.TOKENIZER_START_METHOD,
+)
@@ -0,0 +1,195 @@
+import asyncio
+import logging
+
+from bson import ObjectId
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.errors import BulkWriteError, ConnectionFailure
+
+from app.config import get_settings
+from app.metrics import registry, write_behind_failed_total, write_behind_queued
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Queued by stop() to tell the flush loop to write what it holds and exit
+_STOP = object()
+DUPLICATE_KEY_ERROR = 11000
+
+
+class WriteBehindBuffer:
+    """
+    Collects documents in memory and inserts them in batches with
+    ``insert_many(ordered=False)``. A batch is flushed once it holds
+    ``max_batch_size`` documents or ``flush_interval_seconds`` after its first
+    document arrived, whichever comes first.
+
+    The queue is bounded: when the database falls behind, ``put`` waits for room
+    instead of letting the buffer grow without limit. Documents still queued when
+    the buffer is stopped are flushed before ``stop`` returns.
+
+    A batch that fails on a transient error (a network error, a primary step-down
+    or a timeout) is retried up to ``max_retries`` times with exponential
+    backoff. Documents are given their ids before the first attempt, so a retry
+    cannot write one twice. Batches are only dropped on permanent errors, such
+    as a document that cannot be encoded, or once the retries run out.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_batch_size: int,
+        flush_interval_seconds: float,
+        max_queue_size: int,
+        max_retries: int = 5,
+        retry_backoff_seconds: float = 0.5,
+    ):
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_queue_size = max_queue_size
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self._collection: AsyncCollection | None = None
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self.flushes = 0
+        self.written = 0
+        self.failed = 0
+        self.retries = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, collection: AsyncCollection) -> None:
+        if self.running:
+            return
+        self._collection = collection
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.create_task(self._run(), name=f"write-behind-{self.name}")
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    async def put(self, document: dict) -> None:
+        """Queue a document for insertion, waiting while the queue is full."""
+        await self._queue.put(document)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            if first is _STOP:
+                return
+
+            batch = [first]
+            stopping = False
+            deadline = loop.time() + self.flush_interval_seconds
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    document = await asyncio.wait_for(self._queue.get(), timeout)
+                except TimeoutError:
+                    break
+                if document is _STOP:
+                    stopping = True
+                    break
+                batch.append(document)
+
+            await self._flush(batch)
+            if stopping:
+                return
+
+    async def _flush(self, batch: list[dict]) -> None:
+        self.flushes += 1
+        for document in batch:
+            document.setdefault("_id", ObjectId())
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self._collection.insert_many(batch, ordered=False)
+                self.written += len(batch)
+                return
+            except BulkWriteError as e:
+                self._record_write_errors(batch, e, retried=attempt > 0)
+                return
+            except ConnectionFailure:
+                if attempt == self.max_retries:
+                    break
+                delay = self.retry_backoff_seconds * 2**attempt
+                self.retries += 1
+                logger.warning(
+                    f"Write-behind flush to {self.name} failed, retrying "
+                    f"{len(batch)} documents in {delay:.1f}s",
+                    exc_info=True,
+                )
+                await asyncio.sleep(delay)
+            except Exception:
+                # A permanent error (e.g. a document bson cannot encode) fails the
+                # whole batch, but must not end the flush loop while put() queues
+                self.failed += len(batch)
+                logger.exception(
+                    f"Write-behind flush to {self.name} failed, dropped "
+                    f"{len(batch)} documents"
+                )
+                return
+
+        self.failed += len(batch)
+        logger.error(
+            f"Write-behind flush to {self.name} failed after {self.max_retries} "
+            f"retries, dropped {len(batch)} documents"
+        )
+
+    def _record_write_errors(
+        self, batch: list[dict], error: BulkWriteError, retried: bool
+    ) -> None:
+        # With ordered=False every other document of the batch was still written.
+        # After a retry, documents the interrupted attempt had already written
+        # come back as duplicates of themselves.
+        write_errors = [
+            write_error
+            for write_error in error.details.get("writeErrors", [])
+            if not (retried and write_error.get("code") == DUPLICATE_KEY_ERROR)
+        ]
+        self.written += len(batch) - len(write_errors)
+        self.failed += len(write_errors)
+        if write_errors:
+            logger.error(
+                f"Write-behind flush to {self.name} failed for {len(write_errors)} "
+                f"of {len(batch)} documents"
+            )
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_queue_size": self.max_queue_size,
+            "flushes": self.flushes,
+            "written": self.written,
+            "failed": self.failed,
+            "retries": self.retries,
+        }
+
+
+review_log_buffer = WriteBehindBuffer(
+    "review_logs",
+    max_batch_size=settings.REVIEW_LOG_BATCH_SIZE,
+    flush_interval_seconds=settings.REVIEW_LOG_FLUSH_INTERVAL_SECONDS,
+    max_queue_size=settings.REVIEW_LOG_MAX_QUEUE_SIZE,
+    max_retries=settings.REVIEW_LOG_FLUSH_RETRIES,
+    retry_backoff_seconds=settings.REVIEW_LOG_RETRY_BACKOFF_SECONDS,
+)
+
+
+def _collect_metrics() -> None:
+    stats = review_log_buffer.stats()
+    write_behind_queued.set(stats["queued"], review_log_buffer.name)
+    write_behind_failed_total.set(stats["failed"], review_log_buffer.name)
+
+
+registry.add_collector(_collect_metrics)
@@ -63,7 +63,9 @@ class Sentence(BaseModel):
     def create(cls, full_sentence: str, possible_answers=None, words=None):
         if possible_answers is None:
             possible_answers = []
-        words = split_sentence(full_sentence)
+        # Words may already have been split, e.g. by a bulk import
+        if words is None:
+            words = split_sentence(full_sentence)
         return cls(
             _id=str(ObjectId()),
             full_sentence=full_sentence,
@@ -41,6 +41,7 @@ class User(BaseModel):
     level: int = Field(default=1)
     xp: int = Field(default=0)
     learning_mode: str = Field(default="map")  # "map" or "list"
+    token_version: int = Field(default=0)  # Bumped to revoke issued tokens
 
     class Config:
         arbitrary_types_allowed = True
@@ -1,6 +1,39 @@
+from bson import ObjectId
+from pymongo.asynchronous.collection import AsyncCollection
 from pymongo.asynchronous.database import AsyncDatabase
 
+from app.database import catalog_session, get_catalog_collection, get_collection
+
+
+def reference_values(object_id: str) -> list:
+    """
+    Both forms a reference to ``object_id`` may be stored in, as older writes
+    stored some ``lesson_ids`` entries as ObjectIds rather than strings.
+    """
+    return [str(object_id), ObjectId(object_id)]
+
+
+def apply_set(document: dict, fields: dict) -> dict:
+    """
+    The document as stored once ``{"$set": fields}`` has been applied to it.
+    Updates return the atomic pre-image, from which the new state follows without
+    reading the document again.
+    """
+    return {**document, **fields}
+
 
 class BaseService:
     def __init__(self, db: AsyncDatabase):
         self.db = db
+
+    def get_collection(self, name: str) -> AsyncCollection:
+        """Get a collection with its configured write concern profile."""
+        return get_collection(self.db, name)
+
+    def get_catalog_collection(self, name: str) -> AsyncCollection:
+        """Get a collection whose reads follow the catalog read preference."""
+        return get_catalog_collection(self.db, name)
+
+    def catalog_session(self):
+        """Causally consistent session for catalog reads and writes."""
+        return catalog_session(self.db.client)
@@ -1,49 +1,95 @@
+import logging
+from collections.abc import AsyncIterator
+
 from bson import ObjectId
 from fastapi import HTTPException
+from pydantic import ValidationError
 from pymongo.asynchronous.collection import AsyncCollection
-from pymongo.results import InsertOneResult
+from pymongo.asynchronous.cursor import AsyncCursor
+from pymongo.errors import BulkWriteError
 
+from app.cache_invalidation import invalidate_cache
+from app.single_flight import catalog_read
 from models.cards import Card
 from models.update_card import UpdateCard
-from services.base import BaseService
+from services.base import BaseService, apply_set, reference_values
+from services.links import LinkUpdates
+from utils.pagination import CursorPage, paginate
+from utils.projection import build_projection, partial_model
+
+# Cards validated and inserted per round trip by a streaming import
+IMPORT_CHUNK_SIZE = 1000
 
 
 class CardService(BaseService):
     @property
     def collection(self) -> AsyncCollection:
-        return self.db["cards"]
+        return self.get_collection("cards")
 
     @property
     def lesson_collection(self) -> AsyncCollection:
-        return self.db["lessons"]
+        return self.get_collection("lessons")
 
-    async def get_all_cards(self) -> list[Card]:
-        cards = await self.collection.find().to_list(length=None)
-        return [Card(**card) for card in cards]
+    async def _invalidate_cache(self, card_docs: list[dict], *lesson_id_lists: list):
+        """
+        Invalidate the cached responses that bundle the written cards, and those
+        of the lessons whose ``card_ids`` the write may change along with the
+        lesson listing. Cards have no cached listing of their own.
+        """
+        tags = [f"card:{card_doc['_id']}" for card_doc in card_docs]
+        lesson_ids = {str(lesson_id) for ids in lesson_id_lists for lesson_id in ids}
+        if lesson_ids:
+            tags.append("lessons")
+            tags.extend(f"lesson:{lesson_id}" for lesson_id in lesson_ids)
+        await invalidate_cache([], tags=tags)
 
-    async def create_card(self, card: Card) -> Card:
-        result: InsertOneResult = await self.collection.insert_one(
-            card.model_dump(by_alias=True, exclude={"id"})
+    async def get_all_cards(self, fields: list[str] | None = None) -> list[Card]:
+        projection = build_projection(Card, fields) if fields else None
+        cards = await self.collection.find({}, projection).to_list(length=None)
+        card_model = partial_model(Card) if fields else Card
+        return [card_model(**card) for card in cards]
+
+    def iter_all_cards(self, fields: list[str] | None = None) -> AsyncCursor:
+        projection = build_projection(Card, fields) if fields else None
+        return self.collection.find({}, projection)
+
+    async def get_cards_page(
+        self,
+        limit: int | None = None,
+        cursor: str | None = None,
+        fields: list[str] | None = None,
+    ) -> CursorPage[Card]:
+        projection = build_projection(Card, fields) if fields else None
+        cards, next_cursor = await paginate(
+            self.collection,
+            {},
+            sort=[("_id", 1)],
+            limit=limit,
+            cursor=cursor,
+            projection=projection,
+        )
+        card_model = partial_model(Card) if fields else Card
+        return CursorPage[card_model](
+            items=[card_model(**card) for card in cards], next_cursor=next_cursor
         )
-        new_card = await self.collection.find_one({"_id": result.inserted_id})
 
-        if new_card is None:
-            raise HTTPException(
-                status_code=500, detail="Card was not created successfully"
-            )
+    async def create_card(self, card: Card) -> Card:
+        # insert_one sets the generated _id on the document
+        new_card = card.model_dump(by_alias=True, exclude={"id"})
+        async with self.catalog_session() as session:
+            await self.collection.insert_one(new_card, session=session)
 
-        # Update the lessons that the card is in
-        if new_card.get("lesson_ids"):
-            lesson_object_ids = [
-                ObjectId(lesson_id) for lesson_id in new_card["lesson_ids"]
-            ]
-            await self.lesson_collection.update_many(
-                {"_id": {"$in": lesson_object_ids}},
-                {"$addToSet": {"card_ids": str(new_card["_id"])}},
+            # Update the lessons that the card is in
+            links = LinkUpdates(self.db)
+            links.link_card_lessons(
+                new_card["_id"], [], new_card.get("lesson_ids") or []
             )
+            await links.apply(session)
+        await self._invalidate_cache([new_card], new_card.get("lesson_ids") or [])
 
         return Card(**new_card)
 
+    @catalog_read()
     async def get_card_by_id(self, card_id: str) -> Card:
         card = await self.collection.find_one({"_id": ObjectId(card_id)})
         if card is None:
@@ -52,10 +98,14 @@ class CardService(BaseService):
             )
         return Card(**card)
 
+    @catalog_read()
     async def get_cards_by_lesson(self, lesson_id: str) -> list[Card]:
-        cards = await self.collection.find({"lesson_ids": lesson_id}).to_list(
-            length=None
-        )
+        async with self.catalog_session() as session:
+            cards = await (
+                self.get_catalog_collection("cards")
+                .find({"lesson_ids": lesson_id}, session=session)
+                .to_list(length=None)
+            )
         return [Card(**card) for card in cards]
 
     async def update_card(self, card_id: str, updated_info: UpdateCard) -> Card:
@@ -63,55 +113,63 @@ class CardService(BaseService):
             k: v for k, v in updated_info.model_dump().items() if v is not None
         }
 
-        old_card = await self.collection.find_one_and_update(
-            {"_id": ObjectId(card_id)}, {"$set": card_info_to_update}
-        )
-        if old_card is None:
-            raise HTTPException(
-                status_code=404, detail=f"Card with id {card_id} was not found"
-            )
-
-        updated_card_doc = await self.collection.find_one({"_id": ObjectId(card_id)})
-        if updated_card_doc is None:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Card with id {card_id} was not found after update",
+        async with self.catalog_session() as session:
+            old_card = await self.collection.find_one_and_update(
+                {"_id": ObjectId(card_id)},
+                {"$set": card_info_to_update},
+                session=session,
             )
-
-        if "lesson_ids" in card_info_to_update:
-            new_lesson_ids = [
-                ObjectId(lesson_id) for lesson_id in card_info_to_update["lesson_ids"]
-            ]
-
-            if new_lesson_ids:
-                await self.lesson_collection.update_many(
-                    {"_id": {"$in": new_lesson_ids}},
-                    {"$addToSet": {"card_ids": card_id}},
+            if old_card is None:
+                raise HTTPException(
+                    status_code=404, detail=f"Card with id {card_id} was not found"
                 )
 
-            # Remove card from lessons it's no longer in
-            if old_card.get("lesson_ids"):
-                removed_lesson_ids = set(old_card["lesson_ids"]) - set(
-                    card_info_to_update["lesson_ids"]
+            if "lesson_ids" in card_info_to_update:
+                links = LinkUpdates(self.db)
+                links.link_card_lessons(
+                    card_id,
+                    old_card.get("lesson_ids") or [],
+                    card_info_to_update["lesson_ids"],
                 )
-                if removed_lesson_ids:
-                    await self.lesson_collection.update_many(
-                        {
-                            "_id": {
-                                "$in": [
-                                    ObjectId(lesson_id)
-                                    for lesson_id in removed_lesson_ids
-                                ]
-                            }
-                        },
-                        {"$pull": {"card_ids": card_id}},
-                    )
+                await links.apply(session)
+
+        updated_card_doc = apply_set(old_card, card_info_to_update)
+
+        if "lesson_ids" in card_info_to_update:
+            await self._invalidate_cache(
+                [updated_card_doc],
+                old_card.get("lesson_ids") or [],
+                card_info_to_update["lesson_ids"],
+            )
+        else:
+            await self._invalidate_cache([updated_card_doc])
 
         return Card(**updated_card_doc)
 
     async def delete_card(self, card_id: str) -> None:
-        await self.collection.delete_one({"_id": ObjectId(card_id)})
-        await self.lesson_collection.update_many({}, {"$pull": {"card_ids": card_id}})
+        async with self.catalog_session() as session:
+            card = await self.collection.find_one_and_delete(
+                {"_id": ObjectId(card_id)},
+                projection={"lesson_ids": 1},
+                session=session,
+            )
+            if card is None:
+                return
+
+            # Only the lessons the card points back to can reference it. The card
+            # is already gone, so malformed entries are skipped rather than raised on
+            lesson_ids = [
+                ObjectId(lesson_id)
+                for lesson_id in card.get("lesson_ids") or []
+                if ObjectId.is_valid(lesson_id)
+            ]
+            if lesson_ids:
+                await self.lesson_collection.update_many(
+                    {"_id": {"$in": lesson_ids}},
+                    {"$pull": {"card_ids": {"$in": reference_values(card_id)}}},
+                    session=session,
+                )
+        await self._invalidate_cache([card], card.get("lesson_ids") or [])
 
     async def get_cards_by_ids(self, card_ids: list[str]) -> list[Card]:
         object_ids = [ObjectId(card_id) for card_id in card_ids]
@@ -139,28 +197,129 @@ class CardService(BaseService):
         # Prepare documents for insertion
         card_docs = [card.model_dump(by_alias=True, exclude={"id"}) for card in cards]
 
-        # Bulk insert all cards
-        result = await self.collection.insert_many(card_docs)
-
-        # Fetch all newly created cards
-        new_cards = await self.collection.find(
-            {"_id": {"$in": result.inserted_ids}}
-        ).to_list(length=len(result.inserted_ids))
-
-        # Collect all lesson_id -> card_id mappings for batch update
-        lesson_to_cards: dict[str, list[str]] = {}
-        for card in new_cards:
-            card_id = str(card["_id"])
-            for lesson_id in card.get("lesson_ids", []):
-                if lesson_id not in lesson_to_cards:
-                    lesson_to_cards[lesson_id] = []
-                lesson_to_cards[lesson_id].append(card_id)
-
-        # Batch update lessons with new card associations
-        for lesson_id, card_ids in lesson_to_cards.items():
-            await self.lesson_collection.update_one(
-                {"_id": ObjectId(lesson_id)},
-                {"$addToSet": {"card_ids": {"$each": card_ids}}},
+        async with self.catalog_session() as session:
+            # Bulk insert all cards, insert_many sets the generated _id on each one
+            await self.collection.insert_many(card_docs, session=session)
+
+            # One update per lesson, all sent in a single bulk write
+            links = LinkUpdates(self.db)
+            links.link_cards_to_lessons(
+                {card["_id"]: card.get("lesson_ids") or [] for card in card_docs}
             )
+            await links.apply(session)
+        await self._invalidate_cache(
+            card_docs, *(card.get("lesson_ids") or [] for card in card_docs)
+        )
+
+        return [Card(**card) for card in card_docs]
+
+    async def import_cards(
+        self,
+        rows: AsyncIterator[tuple[int, dict | str]],
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+    ) -> AsyncIterator[dict]:
+        """
+        Create cards from a stream of ``(line number, row)`` pairs, where a row
+        is either the card's fields or a parse error. Rows are validated and
+        inserted ``chunk_size`` at a time, so only one chunk is held in memory,
+        and a progress report is yielded after every chunk followed by a summary.
+        """
+        totals = {"inserted": 0, "failed": 0}
+        chunk: list[tuple[int, dict | str]] = []
+        chunk_number = 0
+
+        async def flush() -> dict:
+            nonlocal chunk_number
+            chunk_number += 1
+            report = await self._import_chunk(chunk)
+            chunk.clear()
+            totals["inserted"] += report["inserted"]
+            totals["failed"] += len(report["errors"])
+            logging.info(
+                f"Card import chunk {chunk_number}: {report['inserted']} inserted, "
+                f"{len(report['errors'])} rejected"
+            )
+            return {"chunk": chunk_number, **report}
+
+        async for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield await flush()
+
+        if chunk:
+            yield await flush()
+
+        yield {"done": True, "chunks": chunk_number, **totals}
+
+    async def _import_chunk(self, rows: list[tuple[int, dict | str]]) -> dict:
+        errors = []
+        card_docs = []
+        line_numbers = []
+        for line_number, row in rows:
+            if isinstance(row, str):
+                errors.append({"line": line_number, "error": row})
+                continue
+            try:
+                card = Card.model_validate(row)
+            except ValidationError as e:
+                errors.append({"line": line_number, "error": _validation_message(e)})
+                continue
+            invalid_ids = [
+                lesson_id
+                for lesson_id in card.lesson_ids
+                if not ObjectId.is_valid(lesson_id)
+            ]
+            if invalid_ids:
+                errors.append(
+                    {
+                        "line": line_number,
+                        "error": f"Invalid lesson id: {invalid_ids[0]}",
+                    }
+                )
+                continue
+            card_docs.append(card.model_dump(by_alias=True, exclude={"id"}))
+            line_numbers.append(line_number)
+
+        failed_indexes = set()
+        if card_docs:
+            try:
+                await self.collection.insert_many(card_docs, ordered=False)
+            except BulkWriteError as e:
+                for write_error in e.details.get("writeErrors", []):
+                    failed_indexes.add(write_error["index"])
+                    errors.append(
+                        {
+                            "line": line_numbers[write_error["index"]],
+                            "error": write_error.get("errmsg", "Write failed"),
+                        }
+                    )
+
+        inserted = [
+            card_doc
+            for index, card_doc in enumerate(card_docs)
+            if index not in failed_indexes
+        ]
+        links = LinkUpdates(self.db)
+        links.link_cards_to_lessons(
+            {card["_id"]: card.get("lesson_ids") or [] for card in inserted}
+        )
+        await links.apply()
+        if inserted:
+            await self._invalidate_cache(
+                inserted, *(card.get("lesson_ids") or [] for card in inserted)
+            )
+
+        errors.sort(key=lambda error: error["line"])
+        return {
+            "received": len(rows),
+            "inserted": len(inserted),
+            "ids": [str(card["_id"]) for card in inserted],
+            "errors": errors,
+        }
+
 
-        return [Card(**card) for card in new_cards]
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}"
+        for detail in error.errors()
+    )
@@ -1,60 +1,106 @@
+import asyncio
 import random
 import re
 from datetime import datetime, timezone
 
-from aiocache import caches
 from bson import ObjectId
 from fastapi import HTTPException
+from pymongo import ReturnDocument
 from pymongo.asynchronous.collection import AsyncCollection
-
+from pymongo.asynchronous.cursor import AsyncCursor
+from pymongo.errors import DuplicateKeyError
+
+from app.cache_invalidation import invalidate_cache
+from app.principal_cache import principal_cache
+from app.single_flight import catalog_read
+from app.tokenizer import sentence_tokenizer
+from app.write_behind import review_log_buffer
 from models.lesson_review import LessonReview
 from models.lessons import Lesson
 from models.review_log import ReviewLog
 from models.sentences import Sentence
 from models.update_lesson import UpdateLesson
 from models.users import User
-from services.base import BaseService
-from utils.streaks import update_user_streak
-from utils.xp import add_xp_to_user
+from services.base import BaseService, apply_set, reference_values
+from services.links import LinkUpdates
+from utils.pagination import CursorPage, paginate
+from utils.projection import build_projection, partial_model
+from utils.streaks import streak_update_expression
+from utils.xp import add_xp_to_user, level_up_expression
+
+LESSON_CATEGORIES = ("grammar", "flashcards", "practice")
+
+# XP awarded the first time a lesson of each category is completed
+FIRST_COMPLETION_XP = {"grammar": 20, "practice": 15, "flashcards": 10}
+
+# Times a review is recomputed when concurrent submissions keep changing its state
+REVIEW_UPDATE_ATTEMPTS = 5
 
 
 class LessonService(BaseService):
     @property
     def collection(self) -> AsyncCollection:
-        return self.db["lessons"]
+        return self.get_collection("lessons")
+
+    @property
+    def catalog_collection(self) -> AsyncCollection:
+        """Lessons collection for reads that may be served by secondaries."""
+        return self.get_catalog_collection("lessons")
 
     @property
     def review_collection(self) -> AsyncCollection:
-        return self.db["lesson_reviews"]
+        return self.get_collection("lesson_reviews")
 
     @property
     def log_collection(self) -> AsyncCollection:
-        return self.db["review_logs"]
+        return self.get_collection("review_logs")
 
     @property
     def user_collection(self) -> AsyncCollection:
-        return self.db["users"]
+        return self.get_collection("users")
 
     @property
     def card_collection(self) -> AsyncCollection:
-        return self.db["cards"]
+        return self.get_collection("cards")
 
     @property
     def section_collection(self) -> AsyncCollection:
-        return self.db["sections"]
-
-    async def _invalidate_cache(self, keys: list[str] | None = None):
-        cache = caches.get("default")
-        await cache.delete(key="all_lessons")
-        if keys:
-            for key in keys:
-                await cache.delete(key=key)
-
-    async def get_all_lessons(self) -> list[Lesson]:
-        lessons = (
-            await self.collection.find().sort("order_index", 1).to_list(length=None)
+        return self.get_collection("sections")
+
+    async def _invalidate_cache(
+        self, keys: list[str] | None = None, tags: list[str] | None = None
+    ):
+        # Clearing by prefix also drops the sparse fieldset variants of each key
+        await invalidate_cache(
+            ["all_lessons", *(keys or [])], tags=["lessons", *(tags or [])]
         )
-        return [Lesson(**lesson) for lesson in lessons]
+
+    @staticmethod
+    def _lesson_tags(lesson_id, *lesson_docs: dict) -> list[str]:
+        """
+        The cache tags a write to a lesson invalidates: the lesson, the cards
+        and sections it links to, whose link fields the write may change, and
+        the section listing when a section link is involved.
+        """
+        tags = [f"lesson:{lesson_id}"]
+        for lesson_doc in lesson_docs:
+            card_ids = lesson_doc.get("card_ids") or []
+            tags.extend(f"card:{card_id}" for card_id in card_ids)
+            if lesson_doc.get("section_id"):
+                tags.extend(["sections", f"section:{lesson_doc['section_id']}"])
+        return tags
+
+    @catalog_read(serve_stale=True)
+    async def get_all_lessons(self, fields: list[str] | None = None) -> list[Lesson]:
+        projection = build_projection(Lesson, fields) if fields else None
+        async with self.catalog_session() as session:
+            lessons = (
+                await self.catalog_collection.find({}, projection, session=session)
+                .sort("order_index", 1)
+                .to_list(length=None)
+            )
+        lesson_model = partial_model(Lesson) if fields else Lesson
+        return [lesson_model(**lesson) for lesson in lessons]
 
     async def create_lesson(self, lesson: Lesson) -> Lesson:
         lesson.category = lesson.category.title()
@@ -69,49 +115,112 @@ class LessonService(BaseService):
                 for sentence in lesson.sentences
             ]
 
-        result = await self.collection.insert_one(
-            lesson.model_dump(by_alias=True, exclude={"id"})
-        )
-        new_lesson = await self.collection.find_one(
-            {"_id": ObjectId(result.inserted_id)}
-        )
-
-        await self._invalidate_cache(keys=[f"category_{lesson.category.lower()}"])
+        async with self.catalog_session() as session:
+            # insert_one sets the generated _id on the document
+            new_lesson = lesson.model_dump(by_alias=True, exclude={"id"})
+            await self.collection.insert_one(new_lesson, session=session)
 
-        if new_lesson and new_lesson.get("card_ids"):
-            card_object_ids = [ObjectId(card_id) for card_id in new_lesson["card_ids"]]
-            await self.card_collection.update_many(
-                {"_id": {"$in": card_object_ids}},
-                {"$addToSet": {"lesson_ids": new_lesson["_id"]}},
+            links = LinkUpdates(self.db)
+            links.link_lesson_cards(
+                new_lesson["_id"], [], new_lesson.get("card_ids") or []
             )
-
-        if new_lesson and new_lesson.get("section_id"):
-            await self.section_collection.update_one(
-                {"_id": ObjectId(new_lesson["section_id"])},
-                {"$addToSet": {"lesson_ids": new_lesson["_id"]}},
+            links.link_lesson_section(
+                new_lesson["_id"], None, new_lesson.get("section_id")
             )
+            await links.apply(session)
+
+        await self._invalidate_cache(
+            keys=[f"category_{lesson.category.lower()}"],
+            tags=self._lesson_tags(new_lesson["_id"], new_lesson),
+        )
 
         return Lesson(**new_lesson)
 
+    async def create_lessons_bulk(self, lessons: list[Lesson]) -> list[Lesson]:
+        """
+        Create many lessons at once: every sentence is tokenized on the tokenizer
+        pool, the lessons are inserted with a single insert_many and their card
+        and section links are written in one bulk write per collection.
+        """
+        if not lessons:
+            return []
+
+        sentences = [
+            sentence for lesson in lessons for sentence in lesson.sentences or []
+        ]
+        words = iter(
+            await sentence_tokenizer.split_many(
+                [sentence.full_sentence for sentence in sentences]
+            )
+        )
+        for lesson in lessons:
+            lesson.category = lesson.category.title()
+            if lesson.sentences is not None:
+                lesson.sentences = [
+                    Sentence.create(
+                        full_sentence=sentence.full_sentence,
+                        possible_answers=sentence.possible_answers,
+                        words=next(words),
+                    )
+                    for sentence in lesson.sentences
+                ]
+
+        lesson_docs = [
+            lesson.model_dump(by_alias=True, exclude={"id"}) for lesson in lessons
+        ]
+        async with self.catalog_session() as session:
+            # insert_many sets the generated _id on each document
+            await self.collection.insert_many(lesson_docs, session=session)
+
+            links = LinkUpdates(self.db)
+            for lesson_doc in lesson_docs:
+                links.link_lesson_cards(
+                    lesson_doc["_id"], [], lesson_doc.get("card_ids") or []
+                )
+                links.link_lesson_section(
+                    lesson_doc["_id"], None, lesson_doc.get("section_id")
+                )
+            await links.apply(session)
+
+        categories = {lesson.category.lower() for lesson in lessons}
+        await self._invalidate_cache(
+            keys=[f"category_{category}" for category in sorted(categories)],
+            tags=[
+                tag
+                for lesson_doc in lesson_docs
+                for tag in self._lesson_tags(lesson_doc["_id"], lesson_doc)
+            ],
+        )
+
+        return [Lesson(**lesson_doc) for lesson_doc in lesson_docs]
+
     async def get_total_lesson_count(self) -> dict:
         total_lessons = await self.collection.count_documents({})
         return {"total": total_lessons}
 
-    async def get_lessons_by_category(self, category: str) -> list[Lesson]:
-        if category.lower() not in ["grammar", "flashcards", "practice"]:
+    @catalog_read(serve_stale=True)
+    async def get_lessons_by_category(
+        self, category: str, fields: list[str] | None = None
+    ) -> list[Lesson]:
+        if category.lower() not in LESSON_CATEGORIES:
             raise HTTPException(
                 status_code=400,
                 detail="Category must be one of 'grammar', 'flashcards', or 'practice'",
             )
-        lessons = (
-            await self.collection.find(
-                {"category": {"$regex": f"^{category}", "$options": "i"}}
+        projection = build_projection(Lesson, fields) if fields else None
+        async with self.catalog_session() as session:
+            lessons = (
+                await self.catalog_collection.find(
+                    {"category": {"$regex": f"^{category}", "$options": "i"}},
+                    projection,
+                    session=session,
+                )
+                .sort("order_index", 1)
+                .to_list(length=None)
             )
-            .sort("order_index", 1)
-            .to_list(length=None)
-        )
 
-        return [Lesson(**lesson) for lesson in lessons]
+        lesson_model = partial_model(Lesson) if fields else Lesson
+        return [lesson_model(**lesson) for lesson in lessons]
 
     async def get_lesson_review(
         self, lesson_id: str, user_id: str
@@ -200,188 +309,132 @@ class LessonService(BaseService):
         if not updated_info.section_id:
             lesson_info_to_update["section_id"] = None
 
-        old_lesson = await self.collection.find_one_and_update(
-            {"_id": ObjectId(lesson_id)}, {"$set": lesson_info_to_update}
-        )
-        if old_lesson is None:
-            raise HTTPException(
-                status_code=404, detail=f"Lesson wih id {lesson_id} not found"
+        # Catalog reads that follow, including cache refills, see these writes even
+        # when served by a secondary
+        async with self.catalog_session() as session:
+            old_lesson = await self.collection.find_one_and_update(
+                {"_id": ObjectId(lesson_id)},
+                {"$set": lesson_info_to_update},
+                session=session,
             )
+            if old_lesson is None:
+                raise HTTPException(
+                    status_code=404, detail=f"Lesson wih id {lesson_id} not found"
+                )
+
+            updated_lesson = apply_set(old_lesson, lesson_info_to_update)
+
+            links = LinkUpdates(self.db)
+            links.link_lesson_cards(
+                lesson_id,
+                old_lesson.get("card_ids") or [],
+                updated_lesson.get("card_ids") or [],
+            )
+            links.link_lesson_section(
+                lesson_id,
+                old_lesson.get("section_id"),
+                updated_lesson.get("section_id"),
+            )
+            await links.apply(session)
 
         keys_to_invalidate = []
         if old_lesson.get("category"):
             keys_to_invalidate.append(f"category_{old_lesson['category'].lower()}")
 
-        updated_lesson = await self.collection.find_one({"_id": ObjectId(lesson_id)})
-        if updated_lesson is None:
-            raise HTTPException(
-                status_code=404, detail=f"Lesson with id {lesson_id} failed to update"
-            )
-
         if updated_lesson.get("category") and updated_lesson.get(
             "category"
         ) != old_lesson.get("category"):
             keys_to_invalidate.append(f"category_{updated_lesson['category'].lower()}")
 
-        await self._invalidate_cache(keys=keys_to_invalidate)
+        await self._invalidate_cache(
+            keys=keys_to_invalidate,
+            tags=self._lesson_tags(lesson_id, old_lesson, updated_lesson),
+        )
 
-        # If cards were in the old lesson but not the new lesson, remove the lesson id from them
-        if old_lesson.get("card_ids"):
-            cards_to_remove = set(old_lesson["card_ids"]) - set(
-                updated_lesson.get("card_ids", [])
-            )
-            if cards_to_remove:
-                await self.card_collection.update_many(
-                    {
-                        "_id": {
-                            "$in": [ObjectId(card_id) for card_id in cards_to_remove]
-                        }
-                    },
-                    {"$pull": {"lesson_ids": lesson_id}},
-                )
+        return Lesson(**updated_lesson)
 
-        # If the lesson contains cards, update the cards to reflect the new lesson
-        if updated_lesson.get("card_ids"):
-            current_card_ids = [
-                ObjectId(card_id) for card_id in updated_lesson["card_ids"]
-            ]
-            await self.card_collection.update_many(
-                {"_id": {"$in": current_card_ids}},
-                {"$addToSet": {"lesson_ids": lesson_id}},
+    async def delete_lesson(self, lesson_id: str) -> None:
+        async with self.catalog_session() as session:
+            lesson = await self.collection.find_one_and_delete(
+                {"_id": ObjectId(lesson_id)},
+                projection={"category": 1, "card_ids": 1, "section_id": 1},
+                session=session,
             )
 
-        # Handle updates to the section_id fields
-        old_section_id = old_lesson.get("section_id")
-        new_section_id = updated_lesson.get("section_id")
-
-        if old_section_id and old_section_id != new_section_id:
-            await self.section_collection.update_one(
-                {"_id": ObjectId(old_section_id)},
-                {"$pull": {"lesson_ids": lesson_id}},
+            # Both filters are served by the lesson_ids indexes
+            references = {"$in": reference_values(lesson_id)}
+            await self.card_collection.update_many(
+                {"lesson_ids": references},
+                {"$pull": {"lesson_ids": references}},
+                session=session,
             )
-
-        if new_section_id and new_section_id != old_section_id:
-            await self.section_collection.update_one(
-                {"_id": ObjectId(new_section_id)},
-                {"$addToSet": {"lesson_ids": lesson_id}},
+            await self.section_collection.update_many(
+                {"lesson_ids": references},
+                {"$pull": {"lesson_ids": references}},
+                session=session,
             )
 
-        return Lesson(**updated_lesson)
-
-    async def delete_lesson(self, lesson_id: str) -> None:
-        lesson = await self.collection.find_one({"_id": ObjectId(lesson_id)})
-
-        await self.collection.delete_one({"_id": ObjectId(lesson_id)})
-
         keys = []
         if lesson and lesson.get("category"):
             keys.append(f"category_{lesson['category'].lower()}")
-        await self._invalidate_cache(keys=keys)
-
-        await self.card_collection.update_many(
-            {"lesson_ids": ObjectId(lesson_id)},
-            {"$pull": {"lesson_ids": lesson_id}},
-        )
-
-        await self.section_collection.update_one(
-            {"lesson_ids": ObjectId(lesson_id)},
-            {"$pull": {"lesson_ids": lesson_id}},
+        await self._invalidate_cache(
+            keys=keys, tags=self._lesson_tags(lesson_id, lesson or {})
         )
 
     async def submit_review(
         self, lesson_id: str, user_id: str, overall_performance: int, current_user: User
     ) -> dict:
-        lesson: Lesson | None = await self.collection.find_one(
-            {"_id": ObjectId(lesson_id)}
+        lesson, lesson_review = await asyncio.gather(
+            self.collection.find_one({"_id": ObjectId(lesson_id)}, {"category": 1}),
+            self.review_collection.find_one(
+                {"lesson_id": lesson_id, "user_id": user_id}
+            ),
         )
         if not lesson:
             raise HTTPException(
                 status_code=404, detail=f"Lesson with id {lesson_id} not found"
             )
 
-        lesson_review = await self.review_collection.find_one(
-            {"lesson_id": lesson_id, "user_id": user_id}
-        )
-
-        # If the lesson review does not exist, create a new one
-        if not lesson_review:
-            lesson_review_obj = LessonReview(lesson_id=lesson_id, user_id=user_id)
-            lesson_review_obj.review(overall_performance)
-            await self.review_collection.insert_one(
-                lesson_review_obj.model_dump(by_alias=True, exclude={"id"})
-            )
-
-        else:  # Otherwise update the existing one
-            lesson_review_obj = LessonReview(**lesson_review)
-            lesson_review_obj.review(overall_performance)
-            await self.review_collection.find_one_and_update(
-                {
-                    "lesson_id": lesson_id,
-                    "user_id": user_id,
-                },
-                {
-                    "$set": {
-                        k: v
-                        for k, v in lesson_review_obj.model_dump().items()
-                        if k != "_id"
-                    }
-                },
-            )
-
+        now = datetime.now(timezone.utc)
         review_log = ReviewLog(
             lesson_id=lesson_id,
             user_id=user_id,
-            review_date=datetime.now(timezone.utc),
+            review_date=now,
             rating=overall_performance,
         )
-        await self.log_collection.insert_one(
-            review_log.model_dump(by_alias=True, exclude={"id"})
-        )
-
-        update_user_streak(current_user)
 
-        xp_to_add = 10
-        is_first_completion = False
-
-        # Check if lesson is already completed
-        if lesson_id in current_user.completed_lessons:
-            # Already completed, repeat review awards 5 XP
-            xp_to_add = 5
-        else:
-            # First time completion
-            is_first_completion = True
-            if lesson:
-                category = lesson.get("category", "").lower()
-                if category == "grammar":
-                    xp_to_add = 20
-                elif category == "practice":
-                    xp_to_add = 15
-                elif category == "flashcards":
-                    xp_to_add = 10
-
-        new_xp, new_level, leveled_up = add_xp_to_user(
-            current_user.xp, current_user.level, xp_to_add
+        # Repeat reviews award 5 XP, first completions depend on the category
+        first_completion_xp = FIRST_COMPLETION_XP.get(
+            lesson.get("category", "").lower(), 10
         )
 
-        update_fields = {
-            "current_streak": current_user.current_streak,
-            "last_activity_date": current_user.last_activity_date,
-            "xp": new_xp,
-            "level": new_level,
-        }
+        # The three writes are independent, so send them concurrently
+        _, _, user_before = await asyncio.gather(
+            self._review_lesson(lesson_id, user_id, overall_performance, lesson_review),
+            self._record_review_log(review_log),
+            self.user_collection.find_one_and_update(
+                {"_id": ObjectId(user_id)},
+                self._progress_update_pipeline(
+                    lesson_id, first_completion_xp, current_user.timezone, now
+                ),
+                projection={
+                    "xp": 1,
+                    "level": 1,
+                    "completed_lessons": {"$elemMatch": {"$eq": lesson_id}},
+                },
+                return_document=ReturnDocument.BEFORE,
+            ),
+        )
+        principal_cache.invalidate(user_id)
 
-        # If first completion, add to completed_lessons
-        if is_first_completion:
-            update_operation = {
-                "$set": update_fields,
-                "$addToSet": {"completed_lessons": lesson_id},
-            }
-        else:
-            update_operation = {"$set": update_fields}
+        if user_before is None:
+            raise HTTPException(status_code=404, detail="User not found")
 
-        await self.user_collection.update_one(
-            {"_id": ObjectId(user_id)},
-            update_operation,
+        # The pipeline was applied atomically to user_before, so replaying it here
+        # yields exactly the values that were stored
+        xp_to_add = 5 if user_before.get("completed_lessons") else first_completion_xp
+        new_xp, new_level, leveled_up = add_xp_to_user(
+            user_before.get("xp", 0), user_before.get("level", 1), xp_to_add
         )
 
         return {
@@ -392,6 +445,124 @@ class LessonService(BaseService):
             "leveled_up": leveled_up,
         }
 
+    async def _record_review_log(self, review_log: ReviewLog) -> None:
+        document = review_log.model_dump(by_alias=True, exclude={"id"})
+        # Batched by the write-behind buffer when the app runs it
+        if review_log_buffer.running:
+            await review_log_buffer.put(document)
+        else:
+            await self.log_collection.insert_one(document)
+
+    async def _review_lesson(
+        self,
+        lesson_id: str,
+        user_id: str,
+        overall_performance: int,
+        lesson_review: dict | None,
+    ) -> None:
+        """
+        Apply a review to the user's spaced repetition state for the lesson. The
+        new state is computed in Python (FSRS) from ``lesson_review``, so it is
+        only written if the stored state is still the one it was computed from.
+        When a concurrent submission changed it first, the review is recomputed
+        on top of that submission instead of overwriting it.
+        """
+        review_filter = {"lesson_id": lesson_id, "user_id": user_id}
+        for _ in range(REVIEW_UPDATE_ATTEMPTS):
+            if lesson_review is None:
+                state = LessonReview(lesson_id=lesson_id, user_id=user_id)
+            else:
+                state = LessonReview(**lesson_review)
+            state.review(overall_performance)
+            fields = state.model_dump(exclude={"id", "lesson_id", "user_id"})
+
+            if lesson_review is None:
+                try:
+                    await self.review_collection.insert_one({**review_filter, **fields})
+                    return
+                except DuplicateKeyError:
+                    # A concurrent submission created the review first
+                    pass
+            else:
+                # card_object records the time of the last review, so it changes
+                # with every write
+                result = await self.review_collection.update_one(
+                    {
+                        "_id": lesson_review["_id"],
+                        "card_object": lesson_review["card_object"],
+                    },
+                    {"$set": fields},
+                )
+                if result.matched_count:
+                    return
+
+            lesson_review = await self.review_collection.find_one(review_filter)
+
+        raise HTTPException(
+            status_code=409,
+            detail="The review was changed by another submission, please retry",
+        )
+
+    @staticmethod
+    def _progress_update_pipeline(
+        lesson_id: str, first_completion_xp: int, timezone_name: str, now: datetime
+    ) -> list[dict]:
+        """
+        Update pipeline that records a review on the user document: it updates the
+        streak, awards XP (levelling up as needed) and marks the lesson as
+        completed, all computed from the stored document in a single atomic write.
+        """
+        completed_lessons = {"$ifNull": ["$completed_lessons", []]}
+        return [
+            {
+                "$set": {
+                    "_already_completed": {
+                        "$in": [{"$literal": lesson_id}, completed_lessons]
+                    },
+                    "current_streak": streak_update_expression(timezone_name, now),
+                    "last_activity_date": now,
+                }
+            },
+            {
+                "$set": {
+                    "_progress": level_up_expression(
+                        {
+                            "$add": [
+                                {"$ifNull": ["$xp", 0]},
+                                {
+                                    "$cond": [
+                                        "$_already_completed",
+                                        5,
+                                        first_completion_xp,
+                                    ]
+                                },
+                            ]
+                        },
+                        {"$ifNull": ["$level", 1]},
+                    )
+                }
+            },
+            {
+                "$set": {
+                    "xp": "$_progress.xp",
+                    "level": "$_progress.level",
+                    "completed_lessons": {
+                        "$cond": [
+                            "$_already_completed",
+                            completed_lessons,
+                            {
+                                "$concatArrays": [
+                                    completed_lessons,
+                                    [{"$literal": lesson_id}],
+                                ]
+                            },
+                        ]
+                    },
+                }
+            },
+            {"$unset": ["_already_completed", "_progress"]},
+        ]
+
     async def get_review_history(self, user_id: str) -> list[ReviewLog]:
         if not user_id:
             raise HTTPException(status_code=404, detail="User not found")
@@ -402,3 +573,26 @@ class LessonService(BaseService):
             .to_list(length=None)
         )
         return [ReviewLog(**log) for log in logs]
+
+    def iter_review_history(self, user_id: str) -> AsyncCursor:
+        if not user_id:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        return self.log_collection.find({"user_id": user_id}).sort("review_date", -1)
+
+    async def get_review_history_page(
+        self, user_id: str, limit: int | None = None, cursor: str | None = None
+    ) -> CursorPage[ReviewLog]:
+        if not user_id:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        logs, next_cursor = await paginate(
+            self.log_collection,
+            {"user_id": user_id},
+            sort=[("review_date", -1)],
+            limit=limit,
+            cursor=cursor,
+        )
+        return CursorPage[ReviewLog](
+            items=[ReviewLog(**log) for log in logs], next_cursor=next_cursor
+        )
@@ -0,0 +1,201 @@
+from collections import defaultdict
+from collections.abc import Iterable
+
+from bson import ObjectId
+from pymongo import UpdateMany, UpdateOne
+from pymongo.asynchronous.client_session import AsyncClientSession
+from pymongo.asynchronous.database import AsyncDatabase
+
+from app.config import get_settings
+from app.database import get_collection
+from services.base import reference_values
+
+settings = get_settings()
+
+
+def _object_ids(ids: Iterable) -> list[ObjectId]:
+    return [ObjectId(object_id) for object_id in ids]
+
+
+def _references(ids: Iterable) -> list:
+    return [value for object_id in ids for value in reference_values(object_id)]
+
+
+class LinkUpdates:
+    """
+    Keeps the references between cards, lessons and sections in sync.
+
+    Cards list their lessons in ``lesson_ids`` and lessons list their cards in
+    ``card_ids``; sections list their lessons in ``lesson_ids`` and lessons point
+    back with ``section_id``. The ``link_*`` methods diff the old and new
+    references of an edited document and queue the updates its counterparts need;
+    ``apply`` then sends them with a single ``bulk_write`` per collection, inside
+    a transaction when MONGO_LINK_TRANSACTIONS is enabled.
+
+    ``card_ids`` and ``lesson_ids`` entries are written as strings and
+    ``section_id`` as an ObjectId, as the section endpoints have always done.
+    Removals match both forms, since older documents hold either.
+    """
+
+    def __init__(self, db: AsyncDatabase):
+        self.db = db
+        self._operations: dict[str, list[UpdateOne | UpdateMany]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return sum(len(operations) for operations in self._operations.values())
+
+    def _add(self, collection_name: str, operation: UpdateOne | UpdateMany) -> None:
+        self._operations[collection_name].append(operation)
+
+    def link_lesson_cards(
+        self, lesson_id: str, old_card_ids: Iterable, new_card_ids: Iterable
+    ) -> None:
+        """Sync ``cards.lesson_ids`` with a lesson's ``card_ids``."""
+        old_card_ids = {str(card_id) for card_id in old_card_ids}
+        new_card_ids = {str(card_id) for card_id in new_card_ids}
+
+        if new_card_ids:
+            self._add(
+                "cards",
+                UpdateMany(
+                    {"_id": {"$in": _object_ids(new_card_ids)}},
+                    {"$addToSet": {"lesson_ids": str(lesson_id)}},
+                ),
+            )
+        if removed := old_card_ids - new_card_ids:
+            self._add(
+                "cards",
+                UpdateMany(
+                    {"_id": {"$in": _object_ids(removed)}},
+                    {"$pull": {"lesson_ids": {"$in": reference_values(lesson_id)}}},
+                ),
+            )
+
+    def link_lesson_section(
+        self, lesson_id: str, old_section_id: str | None, new_section_id: str | None
+    ) -> None:
+        """Sync ``sections.lesson_ids`` with a lesson's ``section_id``."""
+        old_section_id = str(old_section_id) if old_section_id else None
+        new_section_id = str(new_section_id) if new_section_id else None
+        if old_section_id == new_section_id:
+            return
+
+        if old_section_id:
+            self._add(
+                "sections",
+                UpdateOne(
+                    {"_id": ObjectId(old_section_id)},
+                    {"$pull": {"lesson_ids": {"$in": reference_values(lesson_id)}}},
+                ),
+            )
+        if new_section_id:
+            self._add(
+                "sections",
+                UpdateOne(
+                    {"_id": ObjectId(new_section_id)},
+                    {"$addToSet": {"lesson_ids": str(lesson_id)}},
+                ),
+            )
+
+    def link_card_lessons(
+        self, card_id: str, old_lesson_ids: Iterable, new_lesson_ids: Iterable
+    ) -> None:
+        """Sync ``lessons.card_ids`` with a card's ``lesson_ids``."""
+        old_lesson_ids = {str(lesson_id) for lesson_id in old_lesson_ids}
+        new_lesson_ids = {str(lesson_id) for lesson_id in new_lesson_ids}
+
+        if new_lesson_ids:
+            self._add(
+                "lessons",
+                UpdateMany(
+                    {"_id": {"$in": _object_ids(new_lesson_ids)}},
+                    {"$addToSet": {"card_ids": str(card_id)}},
+                ),
+            )
+        if removed := old_lesson_ids - new_lesson_ids:
+            self._add(
+                "lessons",
+                UpdateMany(
+                    {"_id": {"$in": _object_ids(removed)}},
+                    {"$pull": {"card_ids": {"$in": reference_values(card_id)}}},
+                ),
+            )
+
+    def link_cards_to_lessons(self, card_lesson_ids: dict[str, Iterable]) -> None:
+        """
+        Add newly created cards to their lessons, one update per lesson however
+        many of the cards it receives.
+        """
+        lesson_to_cards: dict[str, list[str]] = defaultdict(list)
+        for card_id, lesson_ids in card_lesson_ids.items():
+            for lesson_id in lesson_ids:
+                lesson_to_cards[str(lesson_id)].append(str(card_id))
+
+        for lesson_id, card_ids in lesson_to_cards.items():
+            self._add(
+                "lessons",
+                UpdateOne(
+                    {"_id": ObjectId(lesson_id)},
+                    {"$addToSet": {"card_ids": {"$each": card_ids}}},
+                ),
+            )
+
+    def link_section_lessons(
+        self, section_id: str, old_lesson_ids: Iterable, new_lesson_ids: Iterable
+    ) -> None:
+        """
+        Sync ``lessons.section_id`` with a section's ``lesson_ids``. A lesson
+        belongs to one section only, so newly added lessons are also removed from
+        any other section that listed them.
+        """
+        old_lesson_ids = {str(lesson_id) for lesson_id in old_lesson_ids}
+        new_lesson_ids = {str(lesson_id) for lesson_id in new_lesson_ids}
+
+        if removed := old_lesson_ids - new_lesson_ids:
+            self._add(
+                "lessons",
+                UpdateMany(
+                    {"_id": {"$in": _object_ids(removed)}},
+                    {"$unset": {"section_id": ""}},
+                ),
+            )
+        if new_lesson_ids:
+            self._add(
+                "lessons",
+                UpdateMany(
+                    {"_id": {"$in": _object_ids(new_lesson_ids)}},
+                    {"$set": {"section_id": ObjectId(section_id)}},
+                ),
+            )
+            references = _references(new_lesson_ids)
+            self._add(
+                "sections",
+                UpdateMany(
+                    {
+                        "_id": {"$ne": ObjectId(section_id)},
+                        "lesson_ids": {"$in": references},
+                    },
+                    {"$pull": {"lesson_ids": {"$in": references}}},
+                ),
+            )
+
+    async def apply(self, session: AsyncClientSession | None = None) -> None:
+        """Write the queued updates, one bulk_write per collection."""
+        if not self._operations:
+            return
+
+        if not settings.MONGO_LINK_TRANSACTIONS:
+            await self._write(session)
+        elif session is not None:
+            await session.with_transaction(self._write)
+        else:
+            async with self.db.client.start_session() as session:
+                await session.with_transaction(self._write)
+
+        self._operations.clear()
+
+    async def _write(self, session: AsyncClientSession | None) -> None:
+        for collection_name, operations in self._operations.items():
+            await get_collection(self.db, collection_name).bulk_write(
+                operations, ordered=False, session=session
+            )
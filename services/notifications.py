@@ -6,20 +6,24 @@ from pymongo import AsyncMongoClient
 from pywebpush import WebPushException, webpush
 
 from app.config import get_settings
+from app.database import create_mongo_client, get_collection
 
 settings = get_settings()
 
 
-async def check_overdue_reviews():
+async def check_overdue_reviews(client: AsyncMongoClient | None = None):
     """
     Background job to check for overdue reviews and send push notifications.
+    Pass the application's client to reuse its connection pool; otherwise a
+    client is created for this run.
     """
-    mongo_host = settings.MONGO_HOST
-    client = AsyncMongoClient(mongo_host)
+    owns_client = client is None
+    if owns_client:
+        client = create_mongo_client()
     try:
         db = client["lingua-tile"]
-        user_collection = db["users"]
-        lesson_review_collection = db["lesson_reviews"]
+        user_collection = get_collection(db, "users")
+        lesson_review_collection = get_collection(db, "lesson_reviews")
 
         vapid_private_key = settings.VAPID_PRIVATE_KEY
         vapid_claims = settings.VAPID_CLAIMS_SUB
@@ -96,4 +100,5 @@ async def check_overdue_reviews():
     except Exception as e:
         logging.error(f"Error in check_overdue_reviews: {e}")
     finally:
-        await client.close()
+        if owns_client:
+            await client.close()
@@ -1,103 +1,163 @@
-from aiocache import caches
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
 from bson import ObjectId
 from fastapi import HTTPException
 from pymongo.asynchronous.collection import AsyncCollection
 
+from app.cache_invalidation import invalidate_cache
+from app.single_flight import catalog_read
 from models.cards import Card
 from models.lessons import Lesson
 from models.sections import Section
 from models.update_section import UpdateSection
-from services.base import BaseService
+from services.base import BaseService, apply_set, reference_values
+from services.links import LinkUpdates
+from utils.projection import build_projection, partial_model
 
 
 class SectionService(BaseService):
     @property
     def collection(self) -> AsyncCollection:
-        return self.db["sections"]
+        return self.get_collection("sections")
 
     @property
     def lesson_collection(self) -> AsyncCollection:
-        return self.db["lessons"]
+        return self.get_collection("lessons")
 
     @property
     def card_collection(self) -> AsyncCollection:
-        return self.db["cards"]
+        return self.get_collection("cards")
+
+    async def _invalidate_cache(
+        self, keys: list[str] | None = None, tags: list[str] | None = None
+    ):
+        # Clearing by prefix also drops the sparse fieldset variants of each key
+        await invalidate_cache(
+            ["all_sections", *(keys or [])], tags=["sections", *(tags or [])]
+        )
 
-    async def _invalidate_cache(self, keys: list[str] | None = None):
-        cache = caches.get("default")
-        await cache.delete(key="all_sections")
-        if keys:
-            for key in keys:
-                await cache.delete(key=key)
+    @staticmethod
+    def _section_tags(section_id, *lesson_id_lists: list) -> list[str]:
+        """
+        The cache tags a write to a section invalidates: the section, and the
+        lessons whose section link it may change along with the lesson listing.
+        """
+        tags = [f"section:{section_id}"]
+        lesson_ids = {str(lesson_id) for ids in lesson_id_lists for lesson_id in ids}
+        if lesson_ids:
+            tags.append("lessons")
+            tags.extend(f"lesson:{lesson_id}" for lesson_id in lesson_ids)
+        return tags
 
     async def create_section(self, section: Section) -> Section:
-        inserted_section = await self.collection.insert_one(
-            section.model_dump(by_alias=True, exclude={"id"})
-        )
-        new_section = await self.collection.find_one(
-            {"_id": inserted_section.inserted_id}
+        # insert_one sets the generated _id on the document
+        new_section = section.model_dump(by_alias=True, exclude={"id"})
+        lesson_ids = new_section.get("lesson_ids") or []
+        async with self.catalog_session() as session:
+            await self.collection.insert_one(new_section, session=session)
+
+            links = LinkUpdates(self.db)
+            links.link_section_lessons(new_section["_id"], [], lesson_ids)
+            await links.apply(session)
+
+        await self._invalidate_cache(
+            tags=self._section_tags(new_section["_id"], lesson_ids)
         )
 
-        if new_section is None:
-            raise HTTPException(status_code=500, detail="Section creation failed")
-
-        await self._invalidate_cache()
-
-        if new_section.get("lesson_ids"):
-            lesson_object_ids = [
-                ObjectId(lesson_id) for lesson_id in new_section["lesson_ids"]
-            ]
-
-            await self.lesson_collection.update_many(
-                {"_id": {"$in": lesson_object_ids}},
-                {"$set": {"section_id": str(new_section["_id"])}},
-            )
-
-            # Logic from original endpoint: remove these lessons from other sections
-            await self.collection.update_many(
-                {
-                    "_id": {"$ne": new_section["_id"]},
-                    "lesson_ids": {"$in": new_section["lesson_ids"]},
-                },
-                {"$pull": {"lesson_ids": {"$in": new_section["lesson_ids"]}}},
-            )
-
         return Section(**new_section)
 
-    async def get_all_sections(self) -> list[Section]:
+    @catalog_read(serve_stale=True)
+    async def get_all_sections(self, fields: list[str] | None = None) -> list[Section]:
+        projection = build_projection(Section, fields) if fields else None
         sections = (
-            await self.collection.find().sort("order_index", 1).to_list(length=None)
-        )
-        return [Section(**section) for section in sections]
-
-    async def get_section_for_download(self, section_id: str) -> dict:
-        section = await self.collection.find_one({"_id": ObjectId(section_id)})
-        if section is None:
-            raise HTTPException(status_code=404, detail="Section not found")
-
-        lessons = (
-            await self.lesson_collection.find({"section_id": section["_id"]})
+            await self.collection.find({}, projection)
             .sort("order_index", 1)
             .to_list(length=None)
         )
+        section_model = partial_model(Section) if fields else Section
+        return [section_model(**section) for section in sections]
 
-        card_ids = []
-        for lesson in lessons:
-            if "card_ids" in lesson and lesson["card_ids"]:
-                card_ids.extend([ObjectId(cid) for cid in lesson["card_ids"]])
-
-        cards = []
-        if card_ids:
-            cards = await self.card_collection.find({"_id": {"$in": card_ids}}).to_list(
-                length=None
+    @catalog_read(serve_stale=True)
+    async def get_section_for_download(self, section_id: str) -> dict:
+        async with self.catalog_session() as session:
+            section = await self.get_catalog_collection("sections").find_one(
+                {"_id": ObjectId(section_id)}, session=session
+            )
+            if section is None:
+                raise HTTPException(status_code=404, detail="Section not found")
+
+            lessons = (
+                await self.get_catalog_collection("lessons")
+                .find(
+                    {"section_id": {"$in": reference_values(section["_id"])}},
+                    session=session,
+                )
+                .sort("order_index", 1)
+                .to_list(length=None)
             )
 
+            card_ids = []
+            for lesson in lessons:
+                if "card_ids" in lesson and lesson["card_ids"]:
+                    card_ids.extend([ObjectId(cid) for cid in lesson["card_ids"]])
+
+            cards = []
+            if card_ids:
+                cards = (
+                    await self.get_catalog_collection("cards")
+                    .find({"_id": {"$in": card_ids}}, session=session)
+                    .to_list(length=None)
+                )
+
         return {
             "section": Section(**section),
             "lessons": [Lesson(**lesson) for lesson in lessons],
             "cards": [Card(**card) for card in cards],
         }
 
+    async def get_popular_section_ids(self, limit: int, days: int) -> list[str]:
+        """
+        The sections whose lessons were reviewed most over the last ``days``
+        days, most reviewed first.
+        """
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        review_counts = await (
+            await self.get_collection("review_logs").aggregate(
+                [
+                    {"$match": {"review_date": {"$gte": since}}},
+                    {"$group": {"_id": "$lesson_id", "reviews": {"$sum": 1}}},
+                ]
+            )
+        ).to_list(length=None)
+        if not review_counts:
+            return []
+
+        lessons = await self.lesson_collection.find(
+            {
+                "_id": {
+                    "$in": [
+                        ObjectId(count["_id"])
+                        for count in review_counts
+                        if ObjectId.is_valid(count["_id"])
+                    ]
+                },
+                "section_id": {"$ne": None},
+            },
+            {"section_id": 1},
+        ).to_list(length=None)
+        lesson_sections = {
+            str(lesson["_id"]): lesson["section_id"] for lesson in lessons
+        }
+
+        section_reviews: Counter[str] = Counter()
+        for count in review_counts:
+            section_id = lesson_sections.get(str(count["_id"]))
+            if section_id is not None:
+                section_reviews[str(section_id)] += count["reviews"]
+        return [section_id for section_id, _ in section_reviews.most_common(limit)]
+
+    @catalog_read()
     async def get_section(self, section_id: str) -> Section:
         section = await self.collection.find_one({"_id": ObjectId(section_id)})
         if section is None:
@@ -110,60 +170,50 @@ class SectionService(BaseService):
         section_info_to_update = {
             k: v for k, v in updated_info.model_dump().items() if v is not None
         }
-        old_section = await self.collection.find_one_and_update(
-            {"_id": ObjectId(section_id)}, {"$set": section_info_to_update}
-        )
-
-        if old_section is None:
-            raise HTTPException(status_code=404, detail="Section not found")
-
-        await self._invalidate_cache(keys=[f"download_{section_id}"])
-
-        updated_section = await self.collection.find_one({"_id": ObjectId(section_id)})
-
-        # Handle removing lessons
-        if old_section.get("lesson_ids"):
-            removed_lesson_ids = set(old_section["lesson_ids"]) - set(
-                updated_section.get("lesson_ids", [])
+        async with self.catalog_session() as session:
+            old_section = await self.collection.find_one_and_update(
+                {"_id": ObjectId(section_id)},
+                {"$set": section_info_to_update},
+                session=session,
             )
-            if removed_lesson_ids:
-                await self.lesson_collection.update_many(
-                    {
-                        "_id": {
-                            "$in": [
-                                ObjectId(lesson_id) for lesson_id in removed_lesson_ids
-                            ]
-                        }
-                    },
-                    {"$unset": {"section_id": ""}},
-                )
 
-        # Handle adding lessons
-        if updated_section.get("lesson_ids"):
-            current_lesson_ids = [
-                ObjectId(lesson_id) for lesson_id in updated_section["lesson_ids"]
-            ]
+            if old_section is None:
+                raise HTTPException(status_code=404, detail="Section not found")
 
-            if current_lesson_ids:
-                await self.lesson_collection.update_many(
-                    {"_id": {"$in": current_lesson_ids}},
-                    {"$set": {"section_id": updated_section["_id"]}},
-                )
+            updated_section = apply_set(old_section, section_info_to_update)
 
-                # Remove from other sections
-                await self.collection.update_many(
-                    {
-                        "_id": {"$ne": ObjectId(section_id)},
-                        "lesson_ids": {"$in": updated_section["lesson_ids"]},
-                    },
-                    {"$pull": {"lesson_ids": {"$in": updated_section["lesson_ids"]}}},
-                )
+            old_lesson_ids = old_section.get("lesson_ids") or []
+            new_lesson_ids = updated_section.get("lesson_ids") or []
+            links = LinkUpdates(self.db)
+            links.link_section_lessons(section_id, old_lesson_ids, new_lesson_ids)
+            await links.apply(session)
+
+        await self._invalidate_cache(
+            keys=[f"download_{section_id}"],
+            tags=self._section_tags(section_id, old_lesson_ids, new_lesson_ids),
+        )
 
         return Section(**updated_section)
 
     async def delete_section(self, section_id: str) -> None:
-        await self.collection.delete_one({"_id": ObjectId(section_id)})
-        await self.lesson_collection.update_many(
-            {"section_id": section_id}, {"$unset": {"section_id": ""}}
+        async with self.catalog_session() as session:
+            section = await self.collection.find_one_and_delete(
+                {"_id": ObjectId(section_id)},
+                projection={"lesson_ids": 1},
+                session=session,
+            )
+            await self.lesson_collection.update_many(
+                {"section_id": {"$in": reference_values(section_id)}},
+                {"$unset": {"section_id": ""}},
+                session=session,
+            )
+        await self._invalidate_cache(
+            keys=[f"download_{section_id}"],
+            # Lessons may point to the section without being listed by it
+            tags=[
+                "lessons",
+                *self._section_tags(
+                    section_id, (section or {}).get("lesson_ids") or []
+                ),
+            ],
         )
-        await self._invalidate_cache(keys=[f"download_{section_id}"])
@@ -1,17 +1,20 @@
 from bson import ObjectId
 from fastapi import HTTPException
 from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.cursor import AsyncCursor
 
-from app.security import pwd_context
+from app.principal_cache import invalidate_user, principal_cache
+from app.security import password_hasher
 from models.update_user import UpdateUser
 from models.users import User
-from services.base import BaseService
+from services.base import BaseService, apply_set
+from utils.pagination import CursorPage, paginate, prefix_filter
 
 
 class UserService(BaseService):
     @property
     def collection(self) -> AsyncCollection:
-        return self.db["users"]
+        return self.get_collection("users")
 
     async def create_user(self, user: User) -> User:
         if await self.collection.find_one({"username": user.username}):
@@ -26,7 +29,7 @@ class UserService(BaseService):
         if not user.password:
             raise HTTPException(status_code=400, detail="Password is required")
 
-        user.hash_password()
+        user.password = await password_hasher.hash(user.password)
         await self.collection.insert_one(user.model_dump(by_alias=True, exclude={"id"}))
 
         if hasattr(user, "password"):
@@ -46,6 +49,31 @@ class UserService(BaseService):
         users = await self.collection.find().to_list(length=None)
         return [User(**user) for user in users]
 
+    def iter_all_users(self) -> AsyncCursor:
+        """Cursor over every user, without password hashes or reset tokens."""
+        return self.collection.find(
+            {}, {"password": 0, "reset_token": 0, "reset_token_expires": 0}
+        )
+
+    async def get_users_page(
+        self,
+        limit: int | None = None,
+        cursor: str | None = None,
+        search: str | None = None,
+    ) -> CursorPage[User]:
+        """Retrieve one page of users, optionally filtered by username/email prefix."""
+        users, next_cursor = await paginate(
+            self.collection,
+            prefix_filter(["username", "email"], search),
+            sort=[("_id", 1)],
+            limit=limit,
+            cursor=cursor,
+            projection={"password": 0, "reset_token": 0, "reset_token_expires": 0},
+        )
+        return CursorPage[User](
+            items=[User(**user) for user in users], next_cursor=next_cursor
+        )
+
     async def update_user(self, user_id: str, updated_info: UpdateUser) -> User:
         user_info_to_update = {
             k: v for k, v in updated_info.model_dump().items() if v is not None
@@ -53,33 +81,70 @@ class UserService(BaseService):
 
         if "password" in user_info_to_update:
             if user_info_to_update["password"].strip() != "":
-                user_info_to_update["password"] = pwd_context.hash(
+                user_info_to_update["password"] = await password_hasher.hash(
                     user_info_to_update["password"]
                 )
             else:
                 del user_info_to_update["password"]
 
+        # Tokens issued before a password or role change are revoked by bumping the
+        # token version, decided against the stored roles in the same update
+        revoke_tokens = {"$literal": "password" in user_info_to_update}
+        if "roles" in user_info_to_update:
+            revoke_tokens = {
+                "$or": [
+                    revoke_tokens,
+                    {"$ne": ["$roles", {"$literal": user_info_to_update["roles"]}]},
+                ]
+            }
+        token_version = {"$ifNull": ["$token_version", 0]}
+
         old_user = await self.collection.find_one_and_update(
-            {"_id": ObjectId(user_id)}, {"$set": user_info_to_update}
+            {"_id": ObjectId(user_id)},
+            [
+                {
+                    "$set": {
+                        "token_version": {
+                            "$cond": [
+                                revoke_tokens,
+                                {"$add": [token_version, 1]},
+                                token_version,
+                            ]
+                        },
+                        **{
+                            field: {"$literal": value}
+                            for field, value in user_info_to_update.items()
+                        },
+                    }
+                }
+            ],
         )
         if old_user is None:
             raise HTTPException(
                 status_code=404, detail=f"User with id {user_id} not found"
             )
 
-        updated_user = await self.collection.find_one({"_id": ObjectId(user_id)})
+        invalidate_user(user_id)
+
+        updated_user = apply_set(old_user, user_info_to_update)
+        roles_changed = "roles" in user_info_to_update and user_info_to_update[
+            "roles"
+        ] != old_user.get("roles")
+        if "password" in user_info_to_update or roles_changed:
+            updated_user["token_version"] = old_user.get("token_version", 0) + 1
         return User(**updated_user)
 
     async def delete_user(self, user_id: str) -> None:
         result = await self.collection.delete_one({"_id": ObjectId(user_id)})
+        invalidate_user(user_id)
         if result.deleted_count == 0:
             raise HTTPException(
                 status_code=404, detail=f"User with id {user_id} not found"
             )
 
     async def reset_progress(self, user_id: str) -> None:
-        lesson_review_collection = self.db["lesson_reviews"]
-        review_logs_collection = self.db["review_logs"]
+        lesson_review_collection = self.get_collection("lesson_reviews")
+        review_logs_collection = self.get_collection("review_logs")
 
         await lesson_review_collection.delete_many({"user_id": user_id})
         await review_logs_collection.delete_many({"user_id": user_id})
@@ -88,6 +153,7 @@ class UserService(BaseService):
             {"_id": ObjectId(user_id)},
             {"$set": {"xp": 0, "completed_lessons": [], "level": 1}},
         )
+        principal_cache.invalidate(user_id)
 
     async def get_user_activity(self, user_id: str) -> list[dict]:
         pipeline = [
@@ -103,7 +169,7 @@ class UserService(BaseService):
             {"$sort": {"_id": 1}},
         ]
 
-        review_collection: AsyncCollection = self.db["review_logs"]
+        review_collection: AsyncCollection = self.get_collection("review_logs")
         agg_result = await review_collection.aggregate(pipeline)
         activity_data = await agg_result.to_list(length=None)
 
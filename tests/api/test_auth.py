@@ -1,6 +1,9 @@
+import jwt
 import pytest
 from bson import ObjectId
 
+from app.config import get_settings
+from app.principal_cache import invalidate_user
 from app.security import pwd_context
 from tests.factories import UserFactory
 
@@ -86,3 +89,43 @@ async def test_user_cannot_view_other_user(client, db):
 
     # Verify fail code
     assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_claims_token_is_revoked_by_version_bump(client, db, monkeypatch):
+    monkeypatch.setattr(get_settings(), "JWT_CLAIMS_MODE", True)
+
+    password = "adminpass"
+    admin = UserFactory.build(roles=["admin"], password=pwd_context.hash(password))
+    admin_id = ObjectId()
+    admin_data = admin.model_dump(by_alias=True, exclude={"id"})
+    admin_data["_id"] = admin_id
+    admin_data["token_version"] = 0
+    await db["users"].insert_one(admin_data)
+
+    login_res = await client.post(
+        "/api/auth/login", json={"username": admin.username, "password": password}
+    )
+    token = login_res.json()["token"]
+    claims = jwt.decode(token, options={"verify_signature": False})
+    assert claims["uid"] == str(admin_id)
+    assert claims["roles"] == ["admin"]
+    assert claims["ver"] == 0
+
+    response = await client.post(
+        "/api/sections/create",
+        json={"name": "Claims Section"},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 201
+
+    # Revoke the token by bumping the user's token version
+    await db["users"].update_one({"_id": admin_id}, {"$inc": {"token_version": 1}})
+    invalidate_user(str(admin_id))
+
+    response = await client.post(
+        "/api/sections/create",
+        json={"name": "Another Section"},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 401
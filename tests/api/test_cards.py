@@ -1,3 +1,5 @@
+import json
+
 import pytest
 from bson import ObjectId
 
@@ -119,6 +121,50 @@ async def test_delete_card_admin(client, db):
     assert await db["cards"].find_one({"_id": card_id}) is None
 
 
+@pytest.mark.asyncio
+async def test_delete_card_only_updates_referencing_lessons(client, db):
+    hashed = pwd_context.hash("adminpw")
+    admin = UserFactory.build(roles=["admin"], password=hashed)
+    await db["users"].insert_one(admin.model_dump(by_alias=True, exclude={"id"}))
+    token = (
+        await client.post(
+            "/api/auth/login", json={"username": admin.username, "password": "adminpw"}
+        )
+    ).json()["token"]
+
+    card_id = ObjectId()
+    lesson_id = ObjectId()
+    other_lesson_id = ObjectId()
+    lesson = LessonFactory.build(card_ids=[str(card_id)])
+    other_card_id = str(ObjectId())
+    other_lesson = LessonFactory.build(card_ids=[other_card_id])
+    await db["lessons"].insert_many(
+        [
+            {"_id": lesson_id, **lesson.model_dump(by_alias=True, exclude={"id"})},
+            {
+                "_id": other_lesson_id,
+                **other_lesson.model_dump(by_alias=True, exclude={"id"}),
+            },
+        ]
+    )
+    # A malformed back-reference must not stop the valid ones from being cleaned
+    card = CardFactory.build(lesson_ids=[str(lesson_id), "not-an-object-id"])
+    await db["cards"].insert_one(
+        {"_id": card_id, **card.model_dump(by_alias=True, exclude={"id"})}
+    )
+
+    response = await client.delete(
+        f"/api/cards/delete/{str(card_id)}",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    assert response.status_code == 204
+    lesson = await db["lessons"].find_one({"_id": lesson_id})
+    assert lesson["card_ids"] == []
+    other_lesson = await db["lessons"].find_one({"_id": other_lesson_id})
+    assert other_lesson["card_ids"] == [other_card_id]
+
+
 @pytest.mark.asyncio
 async def test_get_cards_by_ids_preserves_order(client, db):
     # Setup
@@ -141,3 +187,46 @@ async def test_get_cards_by_ids_preserves_order(client, db):
     data = response.json()
     assert data[0]["_id"] == str(c2_id)
     assert data[1]["_id"] == str(c1_id)
+
+
+@pytest.mark.asyncio
+async def test_import_cards_reports_rejected_lines(client, db):
+    hashed = pwd_context.hash("adminpw")
+    admin = UserFactory.build(roles=["admin"], password=hashed)
+    await db["users"].insert_one(admin.model_dump(by_alias=True, exclude={"id"}))
+    token = (
+        await client.post(
+            "/api/auth/login", json={"username": admin.username, "password": "adminpw"}
+        )
+    ).json()["token"]
+
+    lesson = LessonFactory.build(card_ids=[])
+    lesson_id = ObjectId()
+    await db["lessons"].insert_one(
+        {"_id": lesson_id, **lesson.model_dump(by_alias=True, exclude={"id"})}
+    )
+
+    body = "\n".join(
+        [
+            '{"front_text": "A", "back_text": "a", "lesson_ids": ["%s"]}' % lesson_id,
+            '{"front_text": "B"}',
+            '{"front_text": "C", "back_text": "c"}',
+        ]
+    )
+    response = await client.post(
+        "/api/cards/import?chunk_size=2",
+        content=body,
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/x-ndjson",
+        },
+    )
+
+    assert response.status_code == 201
+    assert response.headers["content-type"] == "application/x-ndjson"
+    *chunks, summary = [json.loads(line) for line in response.text.splitlines()]
+    assert summary == {"done": True, "chunks": 2, "inserted": 2, "failed": 1}
+    assert chunks[0]["errors"][0]["line"] == 2
+    first_card_id = chunks[0]["ids"][0]
+    linked_lesson = await db["lessons"].find_one({"_id": lesson_id})
+    assert linked_lesson["card_ids"] == [first_card_id]
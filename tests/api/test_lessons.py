@@ -1,8 +1,12 @@
+import asyncio
+
 import pytest
 from bson import ObjectId
 
 from app.security import pwd_context
-from tests.factories import LessonFactory, UserFactory
+from models.lesson_review import LessonReview
+from services.lessons import LessonService
+from tests.factories import CardFactory, LessonFactory, UserFactory
 
 
 @pytest.mark.asyncio
@@ -52,6 +56,56 @@ async def test_create_lesson_admin(client, db):
     assert "_id" in res_data
 
 
+@pytest.mark.asyncio
+async def test_create_lessons_bulk_links_cards(client, db):
+    hashed = pwd_context.hash("adminpass")
+    admin = UserFactory.build(roles=["admin"], password=hashed)
+    await db["users"].insert_one(admin.model_dump(by_alias=True, exclude={"id"}))
+
+    login_res = await client.post(
+        "/api/auth/login", json={"username": admin.username, "password": "adminpass"}
+    )
+    token = login_res.json()["token"]
+
+    card = CardFactory.build()
+    card_id = ObjectId()
+    await db["cards"].insert_one(
+        {"_id": card_id, **card.model_dump(by_alias=True, exclude={"id"})}
+    )
+
+    data = [
+        {
+            "title": f"Lesson {i}",
+            "category": "practice",
+            "card_ids": [str(card_id)],
+            "sentences": [
+                {
+                    "full_sentence": "私は学生です",
+                    "possible_answers": ["I am a student"],
+                }
+            ],
+        }
+        for i in range(3)
+    ]
+    response = await client.post(
+        "/api/lessons/create-bulk",
+        json=data,
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    assert response.status_code == 201
+    lessons = response.json()
+    assert [lesson["title"] for lesson in lessons] == [
+        "Lesson 0",
+        "Lesson 1",
+        "Lesson 2",
+    ]
+    assert lessons[0]["sentences"][0]["words"]
+
+    linked_card = await db["cards"].find_one({"_id": card_id})
+    assert set(linked_card["lesson_ids"]) == {lesson["_id"] for lesson in lessons}
+
+
 @pytest.mark.asyncio
 async def test_create_lesson_user_forbidden(client, db):
     # Setup User
@@ -126,3 +180,90 @@ async def test_review_lesson(client, db):
     updated_user = await db["users"].find_one({"_id": ObjectId(user_id)})
     assert updated_user["xp"] == 20
     assert lesson_id in updated_user["completed_lessons"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reviews_of_a_lesson_are_not_lost(db):
+    lesson_id, user_id = str(ObjectId()), str(ObjectId())
+    review = LessonReview(lesson_id=lesson_id, user_id=user_id)
+    await db["lesson_reviews"].insert_one(review.model_dump(exclude={"id"}))
+    read = await db["lesson_reviews"].find_one({"lesson_id": lesson_id})
+
+    # Both submissions computed their new state from the same read
+    service = LessonService(db)
+    await asyncio.gather(
+        service._review_lesson(lesson_id, user_id, 3, read),
+        service._review_lesson(lesson_id, user_id, 3, read),
+    )
+
+    # Two "Good" reviews graduate a new card out of learning, one does not
+    stored = await db["lesson_reviews"].find_one({"lesson_id": lesson_id})
+    assert stored["card_object"]["state"] == 2
+    assert await db["lesson_reviews"].count_documents({}) == 1
+
+
+@pytest.mark.asyncio
+async def test_get_all_lessons_sparse_fields(client, db):
+    lesson = LessonFactory.build(title="Sparse Lesson", order_index=1)
+    await db["lessons"].insert_one(lesson.model_dump(by_alias=True, exclude={"id"}))
+
+    response = await client.get(
+        "/api/lessons/all", params={"fields": "title,category,order_index"}
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 1
+    assert set(data[0]) == {"_id", "title", "category", "order_index"}
+    assert data[0]["title"] == "Sparse Lesson"
+
+
+@pytest.mark.asyncio
+async def test_get_all_lessons_cache_hit_skips_database(client, db, mongo_commands):
+    lesson = LessonFactory.build(title="Cached Lesson", order_index=1)
+    await db["lessons"].insert_one(lesson.model_dump(by_alias=True, exclude={"id"}))
+
+    first = await client.get("/api/lessons/all")
+
+    with mongo_commands.expect():
+        second = await client.get("/api/lessons/all")
+
+    assert second.status_code == 200
+    assert second.headers["content-type"] == "application/json"
+    assert second.content == first.content
+    assert second.json()[0]["title"] == "Cached Lesson"
+
+
+@pytest.mark.asyncio
+async def test_get_all_lessons_not_modified(client, db, mongo_commands):
+    lesson = LessonFactory.build(title="Tagged Lesson", order_index=1)
+    await db["lessons"].insert_one(lesson.model_dump(by_alias=True, exclude={"id"}))
+
+    first = await client.get("/api/lessons/all")
+    etag = first.headers["etag"]
+    assert "must-revalidate" in first.headers["cache-control"]
+
+    with mongo_commands.expect():
+        not_modified = await client.get(
+            "/api/lessons/all", headers={"If-None-Match": etag}
+        )
+
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+    assert not_modified.content == b""
+
+
+@pytest.mark.asyncio
+async def test_lesson_write_changes_etag(client, db):
+    first = await client.get("/api/lessons/all")
+    etag = first.headers["etag"]
+
+    await LessonService(db).create_lesson(
+        LessonFactory.build(title="New Lesson", section_id=None, sentences=[])
+    )
+
+    response = await client.get("/api/lessons/all", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()[0]["title"] == "New Lesson"
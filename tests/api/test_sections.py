@@ -2,6 +2,10 @@ import pytest
 from bson import ObjectId
 
 from app.security import pwd_context
+from models.update_card import UpdateCard
+from models.update_lesson import UpdateLesson
+from services.cards import CardService
+from services.lessons import LessonService
 from tests.factories import CardFactory, LessonFactory, SectionFactory, UserFactory
 
 
@@ -151,3 +155,43 @@ async def test_download_section_structure(client, db):
     assert data["lessons"][0]["_id"] == str(lesson_id)
     assert len(data["cards"]) == 1
     assert data["cards"][0]["_id"] == str(card_id)
+
+
+async def insert_section_bundle(db) -> tuple[str, str, str]:
+    section_id, lesson_id, card_id = ObjectId(), ObjectId(), ObjectId()
+
+    section_data = SectionFactory.build().model_dump(by_alias=True, exclude={"id"})
+    section_data.update(_id=section_id, lesson_ids=[str(lesson_id)])
+    lesson_data = LessonFactory.build().model_dump(by_alias=True, exclude={"id"})
+    lesson_data.update(_id=lesson_id, section_id=section_id, card_ids=[str(card_id)])
+    card_data = CardFactory.build().model_dump(by_alias=True, exclude={"id"})
+    card_data.update(_id=card_id, lesson_ids=[str(lesson_id)])
+
+    await db["sections"].insert_one(section_data)
+    await db["lessons"].insert_one(lesson_data)
+    await db["cards"].insert_one(card_data)
+    return str(section_id), str(lesson_id), str(card_id)
+
+
+@pytest.mark.asyncio
+async def test_card_edit_refreshes_cached_download(client, db):
+    section_id, _, card_id = await insert_section_bundle(db)
+    await client.get(f"/api/sections/{section_id}/download")
+
+    await CardService(db).update_card(card_id, UpdateCard(front_text="Edited"))
+
+    response = await client.get(f"/api/sections/{section_id}/download")
+    assert response.json()["cards"][0]["front_text"] == "Edited"
+
+
+@pytest.mark.asyncio
+async def test_lesson_edit_refreshes_cached_download(client, db):
+    section_id, lesson_id, _ = await insert_section_bundle(db)
+    await client.get(f"/api/sections/{section_id}/download")
+
+    await LessonService(db).update_lesson(
+        lesson_id, UpdateLesson(title="Edited", section_id=section_id)
+    )
+
+    response = await client.get(f"/api/sections/{section_id}/download")
+    assert response.json()["lessons"][0]["title"] == "Edited"
@@ -166,3 +166,38 @@ async def test_reset_user_progress(client: AsyncClient, db):
     assert user_after["xp"] == 0
     count_after = await review_collection.count_documents({"user_id": user_id})
     assert count_after == 0
+
+
+@pytest.mark.asyncio
+async def test_admin_get_users_paginated(client, db):
+    admin_pw = "adminpw"
+    admin = UserFactory.build(
+        username="admin", password=pwd_context.hash(admin_pw), roles=["admin"]
+    )
+    await db["users"].insert_one(admin.model_dump(by_alias=True, exclude={"id"}))
+    for i in range(3):
+        user = UserFactory.build(username=f"student{i}", email=f"student{i}@test.com")
+        await db["users"].insert_one(user.model_dump(by_alias=True, exclude={"id"}))
+
+    login_res = await client.post(
+        "/api/auth/login", json={"username": admin.username, "password": admin_pw}
+    )
+    headers = {"Authorization": f"Bearer {login_res.json()['token']}"}
+
+    first_page = await client.get(
+        "/api/users/admin/all", params={"limit": 2, "q": "student"}, headers=headers
+    )
+    assert first_page.status_code == 200
+    first_data = first_page.json()
+    assert [u["username"] for u in first_data["items"]] == ["student0", "student1"]
+    assert first_data["next_cursor"] is not None
+    assert all(u.get("password") is None for u in first_data["items"])
+
+    second_page = await client.get(
+        "/api/users/admin/all",
+        params={"limit": 2, "q": "student", "cursor": first_data["next_cursor"]},
+        headers=headers,
+    )
+    second_data = second_page.json()
+    assert [u["username"] for u in second_data["items"]] == ["student2"]
+    assert second_data["next_cursor"] is None
@@ -0,0 +1,33 @@
+from contextlib import contextmanager
+
+from pymongo import monitoring
+
+# Commands the driver sends on its own, which are not issued by service code
+DRIVER_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "endSessions"}
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Records the commands sent by a client, for asserting round trip counts."""
+
+    def __init__(self):
+        self.commands: list[str] = []
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command_name not in DRIVER_COMMANDS:
+            self.commands.append(event.command_name)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        pass
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        pass
+
+    @contextmanager
+    def expect(self, *command_names: str):
+        """Assert that the block sends exactly these commands, in this order."""
+        start = len(self.commands)
+        yield
+        issued = self.commands[start:]
+        assert issued == list(command_names), (
+            f"expected commands {list(command_names)}, issued {issued}"
+        )
@@ -1,11 +1,16 @@
 import pytest
 import pytest_asyncio
+from aiocache import caches
 from httpx import ASGITransport, AsyncClient
 from pymongo import AsyncMongoClient
 
 from api import dependencies
 from app.config import get_settings
 from app.main import app
+from app.principal_cache import principal_cache, token_version_cache
+from tests.command_counter import CommandCounter
+
+command_counter = CommandCounter()
 
 
 @pytest_asyncio.fixture
@@ -24,13 +29,21 @@ def settings():
 @pytest_asyncio.fixture
 async def db_client(settings):
     if settings.MONGO_HOST:
-        client = AsyncMongoClient(settings.MONGO_HOST)
+        client = AsyncMongoClient(
+            settings.MONGO_HOST, event_listeners=[command_counter]
+        )
         yield client
         await client.close()
     else:
         yield None
 
 
+@pytest.fixture
+def mongo_commands():
+    """Records the commands sent to MongoDB, see CommandCounter.expect."""
+    return command_counter
+
+
 @pytest_asyncio.fixture
 async def db(db_client):
     if db_client:
@@ -52,6 +65,9 @@ async def override_dependency(db_client):
     yield
 
     app.dependency_overrides = {}
+    principal_cache.clear()
+    await caches.get("default").clear()
+    token_version_cache.clear()
 
     if db_client:
         await db_client["lingua-tile-test"].users.delete_many({})
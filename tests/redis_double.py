@@ -0,0 +1,113 @@
+import re
+
+from aiocache import RedisCache
+
+from app.tiered_cache import BytesSerializer
+
+
+def _glob_regex(pattern: str) -> re.Pattern:
+    """Redis MATCH patterns, limited to ``*``, ``?`` and backslash escapes."""
+    regex = ""
+    escaped = False
+    for char in pattern:
+        if escaped:
+            regex += re.escape(char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == "*":
+            regex += ".*"
+        elif char == "?":
+            regex += "."
+        else:
+            regex += re.escape(char)
+    return re.compile(regex, re.DOTALL)
+
+
+def _key(key: str | bytes) -> bytes:
+    return key.encode() if isinstance(key, str) else key
+
+
+class RedisDouble:
+    """
+    In-memory stand-in for the redis.asyncio client, implementing the commands
+    the cache uses. Keys are returned as bytes, like a client that does not
+    decode responses. Expiry is not modelled.
+    """
+
+    def __init__(self):
+        self.data: dict[bytes, bytes] = {}
+        self.sorted_sets: dict[bytes, dict[bytes, float]] = {}
+        self.commands: list[str] = []
+
+    async def get(self, key):
+        return self.data.get(_key(key))
+
+    async def set(self, key, value):
+        self.data[_key(key)] = value
+        return True
+
+    async def setex(self, key, ttl, value):
+        return await self.set(key, value)
+
+    async def psetex(self, key, ttl, value):
+        return await self.set(key, value)
+
+    async def exists(self, key):
+        return int(_key(key) in self.data)
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(_key(key), None) is not None for key in keys)
+
+    async def keys(self, pattern):
+        self.commands.append("KEYS")
+        regex = _glob_regex(pattern)
+        return [key for key in self.data if regex.fullmatch(key.decode())]
+
+    async def scan_iter(self, match="*", count=None):
+        self.commands.append("SCAN")
+        regex = _glob_regex(match)
+        for key in list(self.data):
+            if regex.fullmatch(key.decode()):
+                yield key
+
+    async def zadd(self, key, mapping, gt=False):
+        members = self.sorted_sets.setdefault(_key(key), {})
+        added = 0
+        for member, score in mapping.items():
+            member = _key(member)
+            if member not in members:
+                added += 1
+            elif gt and score <= members[member]:
+                continue
+            members[member] = float(score)
+        return added
+
+    async def zremrangebyscore(self, key, min, max):
+        members = self.sorted_sets.get(_key(key), {})
+        low = float(min)
+        high = float(max)
+        removed = [member for member, score in members.items() if low <= score <= high]
+        for member in removed:
+            del members[member]
+        return len(removed)
+
+    async def zrange(self, key, start, end, withscores=False):
+        members = sorted(
+            self.sorted_sets.get(_key(key), {}).items(), key=lambda item: item[1]
+        )
+        members = members[start : None if end == -1 else end + 1]
+        if withscores:
+            return members
+        return [member for member, _ in members]
+
+    async def flushdb(self):
+        self.data.clear()
+        return True
+
+
+def redis_cache_double(key_prefix: str | None = None) -> RedisCache:
+    """An aiocache RedisCache, as the tiered cache builds it, over a RedisDouble."""
+    cache = RedisCache(serializer=BytesSerializer(), namespace=key_prefix)
+    cache.client = RedisDouble()
+    return cache
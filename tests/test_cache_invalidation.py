@@ -0,0 +1,103 @@
+import pytest
+from aiocache import caches
+
+from app import cache_invalidation
+from app.cache_invalidation import (
+    LocalBroker,
+    LocalInvalidationBus,
+    _clear_cache,
+    invalidate_cache,
+    load_shared_tag_versions,
+)
+from app.cache_tags import SharedTagVersions, TagVersions
+from tests.redis_double import RedisDouble, redis_cache_double
+
+
+@pytest.mark.asyncio
+async def test_invalidations_reach_other_instances_only():
+    broker = LocalBroker()
+    publisher = LocalInvalidationBus(broker)
+    peer = LocalInvalidationBus(broker)
+    publisher_received, peer_received = [], []
+
+    async def on_publisher(namespaces):
+        publisher_received.append(namespaces)
+
+    async def on_peer(namespaces):
+        peer_received.append(namespaces)
+
+    publisher.subscribe(on_publisher)
+    peer.subscribe(on_peer)
+
+    await publisher.publish(["all_lessons", "category_grammar"])
+
+    assert peer_received == [["all_lessons", "category_grammar"]]
+    assert publisher_received == []
+
+
+@pytest.mark.asyncio
+async def test_failing_handler_does_not_stop_delivery():
+    broker = LocalBroker()
+    publisher = LocalInvalidationBus(broker)
+    peer = LocalInvalidationBus(broker)
+    received = []
+
+    async def failing(namespaces):
+        raise RuntimeError("boom")
+
+    async def recording(namespaces):
+        received.append(namespaces)
+
+    peer.subscribe(failing)
+    peer.subscribe(recording)
+
+    await publisher.publish(["all_sections"])
+
+    assert received == [["all_sections"]]
+    assert peer.stats()["received"] == 1
+
+
+@pytest.mark.asyncio
+async def test_catalog_version_reaches_other_instances():
+    broker = LocalBroker()
+    publisher = LocalInvalidationBus(broker)
+    peer = LocalInvalidationBus(broker)
+    versions = []
+    peer.subscribe_version(lambda version, tags: versions.append((version, tags)))
+
+    await publisher.publish(["all_lessons"], catalog_version=42, tags=["lessons"])
+    await publisher.publish(["all_sections"])
+
+    assert versions == [(42, ["lessons"])]
+
+
+@pytest.mark.asyncio
+async def test_clearing_a_namespace_removes_bare_redis_keys(monkeypatch):
+    l2 = redis_cache_double()
+    monkeypatch.setattr(caches.get("default"), "l2", l2)
+    # Cache keys have no "namespace:" separator
+    for key in ("all_lessons", "all_lessons@1f", "all_sections"):
+        await l2.client.set(key, b"cached")
+
+    await _clear_cache(["all_lessons"])
+
+    assert list(l2.client.data) == [b"all_sections"]
+    assert "KEYS" not in l2.client.commands
+
+
+@pytest.mark.asyncio
+async def test_instances_started_later_learn_the_invalidated_tags(monkeypatch):
+    shared = SharedTagVersions("redis://localhost", "tag-versions", 3600)
+    shared._redis = RedisDouble()
+    monkeypatch.setattr(cache_invalidation, "shared_tag_versions", shared)
+    await invalidate_cache([], tags=["section:1"])
+    written_before = cache_invalidation.tag_versions.key_version(["section:1"])
+
+    # A new instance, whose own versions start out empty
+    later = TagVersions()
+    monkeypatch.setattr(cache_invalidation, "tag_versions", later)
+    await load_shared_tag_versions()
+
+    assert later.key_version(["section:1"]) == written_before
+    # Shared entries from before it started are validated rather than ignored
+    assert later.trusted_from == 0
@@ -0,0 +1,89 @@
+import pytest
+
+from app.cache_tags import (
+    SharedTagVersions,
+    TagVersions,
+    entry_tags,
+    key_tags,
+    pack_entry,
+    tag_versions,
+    unpack_entry,
+)
+from app.catalog_version import now_us
+from tests.factories import CardFactory, LessonFactory
+from tests.redis_double import RedisDouble
+
+
+def test_key_version_follows_the_newest_tag():
+    versions = TagVersions()
+    assert versions.key_version(["lessons"]) == 0
+
+    versions.invalidate(["lessons"], versions.trusted_from + 5)
+    versions.invalidate(["lessons"], versions.trusted_from + 3)
+
+    assert versions.key_version(["lessons", "sections"]) == versions.trusted_from + 5
+
+
+def test_entries_outdated_by_later_invalidations():
+    versions = TagVersions()
+    stamp = versions.trusted_from + 10
+
+    versions.invalidate(["card:1"], stamp)
+    assert versions.is_current(["card:1", "lesson:1"], stamp)
+
+    versions.invalidate(["card:1"], stamp + 1)
+    assert not versions.is_current(["card:1", "lesson:1"], stamp)
+
+
+def test_entries_from_before_the_process_started_are_not_trusted():
+    versions = TagVersions()
+
+    assert not versions.is_current([], versions.trusted_from - 1)
+
+
+def test_entries_from_before_the_process_started_are_trusted_once_loaded():
+    versions = TagVersions()
+    started_at = versions.trusted_from
+
+    versions.load({"card:1": started_at - 10, "lessons": started_at - 5})
+
+    assert versions.is_current(["card:1"], started_at - 8)
+    assert not versions.is_current(["card:1"], started_at - 12)
+    assert versions.key_version(["lessons"]) == started_at - 5
+
+
+@pytest.mark.asyncio
+async def test_shared_tag_versions_keep_the_newest_version_of_each_tag():
+    shared = SharedTagVersions("redis://localhost", "tag-versions", 3600)
+    shared._redis = RedisDouble()
+    version = now_us()
+
+    await shared.save(["card:1", "lessons"], version)
+    # A concurrent writer with an older version lands last
+    await shared.save(["lessons"], version - 1)
+    await shared.save(["lesson:old"], version - 7200 * 1_000_000)
+
+    assert await shared.load() == {"card:1": version, "lessons": version}
+
+
+def test_catalog_keys_and_download_entries_declare_their_tags():
+    lesson = LessonFactory.build(id="66f0c1")
+    card = CardFactory.build(id="66f0c2")
+
+    assert key_tags("all_lessons:fields=title") == ["lessons"]
+    assert key_tags("category_grammar") == ["lessons"]
+    assert key_tags("download_66f0c0") == ["section:66f0c0"]
+    assert entry_tags(
+        "download_66f0c0", {"section": None, "lessons": [lesson], "cards": [card]}
+    ) == ["lesson:66f0c1", "card:66f0c2"]
+    assert entry_tags("all_lessons", [lesson]) == []
+
+
+def test_packed_entries_round_trip_until_invalidated():
+    stamp = tag_versions.trusted_from + 10**9
+    value = pack_entry(b'{"lessons":[]}', stamp, ["card:test-entry"])
+
+    assert unpack_entry(value) == b'{"lessons":[]}'
+
+    tag_versions.invalidate(["card:test-entry"], stamp + 1)
+    assert unpack_entry(value) is None
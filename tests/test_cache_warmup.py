@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+from app.cache_warmup import CacheWarmer, response_loader
+from app.response_cache import HotKeys
+from services.sections import SectionService
+from tests.factories import LessonFactory, SectionFactory
+
+
+def test_due_keys_are_hot_and_close_to_expiry():
+    keys = HotKeys()
+    keys.stored("all_lessons", ttl=30)
+    keys.stored("all_sections", ttl=30)
+    keys.stored("download_1", ttl=3600)
+    for _ in range(3):
+        keys.hit("all_lessons")
+        keys.hit("download_1")
+
+    assert keys.due(within=60, min_hits=3) == [("all_lessons", 30)]
+
+
+def test_expired_keys_are_forgotten():
+    keys = HotKeys()
+    keys.stored("all_lessons", ttl=-1)
+
+    assert keys.due(within=60, min_hits=0) == []
+    assert len(keys) == 0
+
+
+def test_sparse_fieldsets_are_not_reloaded():
+    assert response_loader("all_lessons") is not None
+    assert response_loader("download_66f0c1") is not None
+    assert response_loader("all_lessons:fields=title") is None
+    assert response_loader("something_else") is None
+
+
+async def insert_section_with_reviews(db, reviews: int) -> str:
+    section = SectionFactory.build()
+    section_data = section.model_dump(by_alias=True, exclude={"id"})
+    section_id = (await db["sections"].insert_one(section_data)).inserted_id
+
+    lesson = LessonFactory.build(section_id=None)
+    lesson_data = lesson.model_dump(by_alias=True, exclude={"id"})
+    lesson_data["section_id"] = section_id
+    lesson_id = (await db["lessons"].insert_one(lesson_data)).inserted_id
+
+    if reviews:
+        await db["review_logs"].insert_many(
+            [
+                {
+                    "lesson_id": str(lesson_id),
+                    "user_id": str(ObjectId()),
+                    "review_date": datetime.now(timezone.utc) - timedelta(hours=1),
+                    "rating": 3,
+                }
+                for _ in range(reviews)
+            ]
+        )
+    return str(section_id)
+
+
+@pytest.mark.asyncio
+async def test_popular_sections_rank_by_recent_reviews(db):
+    quiet = await insert_section_with_reviews(db, reviews=1)
+    busy = await insert_section_with_reviews(db, reviews=3)
+    await insert_section_with_reviews(db, reviews=0)
+
+    ranked = await SectionService(db).get_popular_section_ids(limit=5, days=7)
+
+    assert ranked == [busy, quiet]
+
+
+@pytest.mark.asyncio
+async def test_warm_fills_the_catalog_responses(client, db, mongo_commands):
+    section_id = await insert_section_with_reviews(db, reviews=2)
+    warmer = CacheWarmer(refresh_ahead_seconds=60, interval_seconds=15, min_hits=3)
+
+    await warmer.warm(db)
+
+    with mongo_commands.expect():
+        lessons = await client.get("/api/lessons/all")
+        download = await client.get(f"/api/sections/{section_id}/download")
+
+    assert lessons.status_code == 200
+    assert len(lessons.json()) == 1
+    assert download.json()["section"]["_id"] == section_id
@@ -0,0 +1,29 @@
+from app.catalog_version import CatalogVersion, _etag_matches
+
+
+def test_bump_always_increases():
+    version = CatalogVersion()
+    # A version far ahead of the clock, as observed from another instance
+    version.observe(version.value + 10**12)
+    before = version.value
+
+    assert version.bump() == before + 1
+    assert version.bump() == before + 2
+
+
+def test_observe_never_goes_backwards():
+    version = CatalogVersion()
+    current = version.value
+
+    version.observe(current - 1)
+    assert version.value == current
+
+    version.observe(current + 5)
+    assert version.value == current + 5
+
+
+def test_etag_matching():
+    assert _etag_matches('"abc"', '"abc"')
+    assert _etag_matches('"xyz", W/"abc"', '"abc"')
+    assert _etag_matches("*", '"abc"')
+    assert not _etag_matches('"abd"', '"abc"')
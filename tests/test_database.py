@@ -0,0 +1,119 @@
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId, Timestamp
+from pymongo import AsyncMongoClient
+
+from app import database
+from app.database import (
+    CausalClock,
+    create_mongo_client,
+    get_catalog_collection,
+    get_collection,
+    write_concern_for,
+)
+from services.sections import SectionService
+from tests.factories import SectionFactory
+
+
+def test_write_concern_profiles():
+    assert write_concern_for("review_logs").document == {"w": 1}
+    assert write_concern_for("users").document == {"w": "majority"}
+    assert write_concern_for("lessons") is None
+
+
+def test_get_collection_applies_write_concern_profile():
+    client = AsyncMongoClient("mongodb://localhost:27017", connect=False)
+    db = client["lingua-tile-test"]
+
+    assert get_collection(db, "review_logs").write_concern.document == {"w": 1}
+    assert get_collection(db, "lessons").write_concern == db.write_concern
+
+
+def test_create_mongo_client_uses_pool_settings(settings):
+    client = create_mongo_client("mongodb://localhost:27017")
+
+    pool_options = client.options.pool_options
+    assert pool_options.min_pool_size == settings.MONGO_MIN_POOL_SIZE
+    assert pool_options.max_pool_size == settings.MONGO_MAX_POOL_SIZE
+    assert "zstd" in client.options.pool_options._compression_settings.compressors
+
+
+def test_catalog_collection_follows_read_preference(monkeypatch):
+    monkeypatch.setattr(
+        database.settings, "MONGO_CATALOG_READ_PREFERENCE", "secondaryPreferred"
+    )
+    client = AsyncMongoClient("mongodb://localhost:27017", connect=False)
+    db = client["lingua-tile-test"]
+
+    catalog = get_catalog_collection(db, "lessons")
+
+    assert catalog.read_preference.mongos_mode == "secondaryPreferred"
+    assert get_collection(db, "users").read_preference.mongos_mode == "primary"
+
+
+def test_causal_clock_keeps_latest_times():
+    clock = CausalClock()
+    earlier = SimpleNamespace(
+        cluster_time={"clusterTime": Timestamp(10, 1)},
+        operation_time=Timestamp(10, 1),
+    )
+    later = SimpleNamespace(
+        cluster_time={"clusterTime": Timestamp(20, 1)},
+        operation_time=Timestamp(20, 1),
+    )
+
+    clock.observe(later)
+    clock.observe(earlier)
+
+    assert clock.cluster_time == {"clusterTime": Timestamp(20, 1)}
+    assert clock.operation_time == Timestamp(20, 1)
+
+
+class FakeSession:
+    """A causal session that reports a fixed cluster and operation time."""
+
+    def __init__(self, time: Timestamp):
+        self.cluster_time = {"clusterTime": time}
+        self.operation_time = time
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def advance_cluster_time(self, cluster_time):
+        pass
+
+    def advance_operation_time(self, operation_time):
+        pass
+
+
+class FakeSessionCollection:
+    def __init__(self):
+        self.sessions = []
+
+    async def insert_one(self, document, session=None):
+        document["_id"] = ObjectId()
+        self.sessions.append(session)
+
+
+@pytest.mark.asyncio
+async def test_catalog_writes_advance_catalog_clock(monkeypatch):
+    monkeypatch.setattr(
+        database.settings, "MONGO_CATALOG_READ_PREFERENCE", "secondaryPreferred"
+    )
+    clock = CausalClock()
+    monkeypatch.setattr(database, "catalog_clock", clock)
+    session = FakeSession(Timestamp(30, 1))
+    collection = FakeSessionCollection()
+    db = SimpleNamespace(
+        client=SimpleNamespace(start_session=lambda causal_consistency: session),
+        get_collection=lambda name, write_concern=None: collection,
+    )
+
+    await SectionService(db).create_section(SectionFactory.build(lesson_ids=[]))
+
+    assert collection.sessions == [session]
+    assert clock.operation_time == Timestamp(30, 1)
@@ -0,0 +1,44 @@
+from bson import ObjectId
+from pymongo import AsyncMongoClient
+
+from services.links import LinkUpdates
+
+
+def link_updates():
+    client = AsyncMongoClient("mongodb://localhost:27017", connect=False)
+    return LinkUpdates(client["lingua-tile-test"])
+
+
+def test_lesson_card_diff_adds_and_removes_in_one_update_each():
+    lesson_id, kept, added, removed = (str(ObjectId()) for _ in range(4))
+    links = link_updates()
+
+    links.link_lesson_cards(lesson_id, [kept, removed], [kept, added])
+
+    add, pull = links._operations["cards"]
+    assert add._doc == {"$addToSet": {"lesson_ids": lesson_id}}
+    assert set(add._filter["_id"]["$in"]) == {ObjectId(kept), ObjectId(added)}
+    assert pull._filter == {"_id": {"$in": [ObjectId(removed)]}}
+    assert pull._doc == {
+        "$pull": {"lesson_ids": {"$in": [lesson_id, ObjectId(lesson_id)]}}
+    }
+
+
+def test_unchanged_section_queues_nothing():
+    section_id = str(ObjectId())
+    links = link_updates()
+
+    links.link_lesson_section(str(ObjectId()), ObjectId(section_id), section_id)
+
+    assert len(links) == 0
+
+
+def test_bulk_created_cards_update_each_lesson_once():
+    lesson_id = str(ObjectId())
+    cards = {str(ObjectId()): [lesson_id] for _ in range(3)}
+    links = link_updates()
+
+    links.link_cards_to_lessons(cards)
+
+    (operation,) = links._operations["lessons"]
+    assert operation._doc == {"$addToSet": {"card_ids": {"$each": list(cards)}}}
@@ -0,0 +1,62 @@
+import pytest
+
+from app.config import get_settings
+from app.metrics import Counter, Histogram, cache_key_family, http_requests_total
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+
+    lines = histogram.render()
+
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{route="/a"} 3' in lines
+    assert 'latency_seconds_sum{route="/a"} 5.55' in lines
+
+
+def test_label_values_are_escaped():
+    counter = Counter("things_total", "Things", ("name",))
+    counter.inc('a"b')
+
+    assert 'things_total{name="a\\"b"} 1' in counter.render()
+
+
+def test_cache_key_families():
+    assert cache_key_family("all_lessons") == "all_lessons"
+    assert cache_key_family("category_grammar") == "category_*"
+    assert cache_key_family("download_66f0c1") == "download_*"
+    assert cache_key_family("all_sections") == "all_sections"
+    assert cache_key_family("something_else") == "other"
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_labels_requests_by_route_template(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "METRICS_TOKEN", "secret")
+    http_requests_total.clear()
+    await client.get("/api/lessons/not-a-real-id")
+
+    response = await client.get(
+        "/api/metrics", headers={"Authorization": "Bearer secret"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
+    assert 'route="/api/lessons/{lesson_id}"' in response.text
+    assert "/api/lessons/not-a-real-id" not in response.text
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_is_denied_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "METRICS_TOKEN", None)
+
+    assert (await client.get("/api/metrics")).status_code == 403
+
+    monkeypatch.setattr(get_settings(), "METRICS_TOKEN", "secret")
+    response = await client.get("/api/metrics", headers={"Authorization": "Bearer x"})
+    assert response.status_code == 401
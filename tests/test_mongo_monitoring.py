@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+from app.context import set_request_id
+from app.mongo_monitoring import MongoCommandListener
+
+
+def started(command_name, command, request_id=1):
+    return SimpleNamespace(
+        command_name=command_name,
+        command=command,
+        connection_id=("localhost", 27017),
+        request_id=request_id,
+    )
+
+
+def succeeded(command_name, duration_micros, reply, request_id=1):
+    return SimpleNamespace(
+        command_name=command_name,
+        duration_micros=duration_micros,
+        reply=reply,
+        connection_id=("localhost", 27017),
+        request_id=request_id,
+    )
+
+
+def test_records_latency_per_collection_and_command():
+    listener = MongoCommandListener()
+    set_request_id("request-1")
+
+    listener.started(started("find", {"find": "lessons", "filter": {}}))
+    listener.succeeded(
+        succeeded("find", 3_000, {"ok": 1, "cursor": {"firstBatch": [{}, {}]}})
+    )
+    listener.started(started("getMore", {"getMore": 1, "collection": "lessons"}, 2))
+    listener.succeeded(succeeded("getMore", 40_000, {"ok": 1}, 2))
+
+    commands = listener.snapshot()["commands"]
+
+    assert [(c["collection"], c["command"]) for c in commands] == [
+        ("lessons", "getMore"),
+        ("lessons", "find"),
+    ]
+    find_stats = commands[1]
+    assert find_stats["count"] == 1
+    assert find_stats["max_ms"] == 3.0
+    assert find_stats["latency_buckets_ms"]["5"] == 1
+    assert find_stats["max_documents"] == 2
+
+
+def test_recent_commands_are_tagged_with_request_id():
+    listener = MongoCommandListener()
+
+    set_request_id("request-1")
+    listener.started(started("insert", {"insert": "review_logs"}))
+    listener.succeeded(succeeded("insert", 1_000, {"ok": 1, "n": 1}))
+    set_request_id("request-2")
+    listener.started(started("find", {"find": "users"}, 2))
+    listener.failed(
+        SimpleNamespace(
+            command_name="find",
+            duration_micros=500,
+            connection_id=("localhost", 27017),
+            request_id=2,
+        )
+    )
+
+    recent = listener.snapshot("request-2")["recent"]
+
+    assert len(recent) == 1
+    assert recent[0]["collection"] == "users"
+    assert recent[0]["failed"] is True
@@ -0,0 +1,64 @@
+import base64
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from utils.pagination import (
+    decode_cursor,
+    encode_cursor,
+    keyset_filter,
+    prefix_filter,
+)
+
+
+def test_cursor_round_trip_preserves_bson_types():
+    values = {"review_date": datetime(2024, 1, 1), "_id": ObjectId()}
+
+    assert decode_cursor(encode_cursor(values)) == values
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not-a-cursor",
+        # Valid base64 and JSON, but not a valid ObjectId
+        base64.urlsafe_b64encode(b'{"_id": {"$oid": "zz"}}').decode(),
+    ],
+)
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor(cursor)
+    assert exc_info.value.status_code == 400
+
+
+def test_keyset_filter_for_descending_compound_sort():
+    last_id = ObjectId()
+    last_date = datetime(2024, 1, 1)
+
+    query = keyset_filter(
+        [("review_date", -1), ("_id", -1)], {"review_date": last_date, "_id": last_id}
+    )
+
+    assert query == {
+        "$or": [
+            {"review_date": {"$lt": last_date}},
+            {"review_date": last_date, "_id": {"$lt": last_id}},
+        ]
+    }
+
+
+def test_keyset_filter_rejects_operator_values():
+    with pytest.raises(HTTPException):
+        keyset_filter([("_id", 1)], {"_id": {"$ne": None}})
+
+
+def test_prefix_filter_escapes_regex():
+    assert prefix_filter(["username"], None) == {}
+    assert prefix_filter(["username", "email"], "a.b") == {
+        "$or": [
+            {"username": {"$regex": "^a\\.b"}},
+            {"email": {"$regex": "^a\\.b"}},
+        ]
+    }
@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.security import PasswordHasher
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_round_trip():
+    hasher = PasswordHasher(max_workers=1, max_pending=4)
+
+    hashed = await hasher.hash("secret")
+
+    assert await hasher.verify("secret", hashed)
+    assert not await hasher.verify("wrong", hashed)
+    assert hasher.stats()["completed"] == 3
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_saturated_queue_is_rejected():
+    hasher = PasswordHasher(max_workers=1, max_pending=1)
+
+    first = asyncio.create_task(hasher.hash("secret"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await hasher.hash("another secret")
+
+    assert exc_info.value.status_code == 503
+    assert hasher.stats()["rejected"] == 1
+    await first
+    hasher.shutdown()
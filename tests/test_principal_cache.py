@@ -0,0 +1,46 @@
+import time
+
+from app.principal_cache import PrincipalCache
+
+
+def test_get_returns_cached_principal():
+    cache = PrincipalCache(max_size=10, ttl=60)
+    cache.set("alice", {"_id": "1", "username": "alice"})
+
+    assert cache.get("alice") == {"_id": "1", "username": "alice"}
+    assert cache.get("bob") is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PrincipalCache(max_size=2, ttl=60)
+    cache.set("alice", {"_id": "1"})
+    cache.set("bob", {"_id": "2"})
+
+    # Touch alice so that bob becomes the least recently used entry
+    cache.get("alice")
+    cache.set("carol", {"_id": "3"})
+
+    assert cache.get("bob") is None
+    assert cache.get("alice") is not None
+    assert cache.get("carol") is not None
+    assert len(cache) == 2
+
+
+def test_expired_entry_is_not_returned():
+    cache = PrincipalCache(max_size=10, ttl=0)
+    cache.set("alice", {"_id": "1"})
+    time.sleep(0.001)
+
+    assert cache.get("alice") is None
+    assert len(cache) == 0
+
+
+def test_invalidate_by_user_id():
+    cache = PrincipalCache(max_size=10, ttl=60)
+    cache.set("alice", {"_id": "1"})
+    cache.set("bob", {"_id": "2"})
+
+    cache.invalidate("1")
+
+    assert cache.get("alice") is None
+    assert cache.get("bob") is not None
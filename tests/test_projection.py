@@ -0,0 +1,39 @@
+import pytest
+from fastapi import HTTPException
+
+from models.lessons import Lesson
+from utils.projection import (
+    build_projection,
+    fields_cache_suffix,
+    parse_fields,
+    partial_model,
+)
+
+
+def test_parse_fields_normalizes_order_and_duplicates():
+    assert parse_fields(None) is None
+    assert parse_fields(" , ") is None
+    assert parse_fields("title, category,title") == ["category", "title"]
+    assert fields_cache_suffix("title,category") == ":fields=category,title"
+    assert fields_cache_suffix(None) == ""
+
+
+def test_build_projection_maps_aliases_and_rejects_unknown_fields():
+    assert build_projection(Lesson, ["id", "title"]) == {"_id": 1, "title": 1}
+
+    with pytest.raises(HTTPException) as exc_info:
+        build_projection(Lesson, ["title", "password"])
+    assert exc_info.value.status_code == 400
+
+
+def test_partial_model_keeps_only_loaded_fields():
+    partial_lesson = partial_model(Lesson)(
+        _id="5f9f1b9b9c9d1c0b8c8b9c9d", title="Basics", category="Grammar"
+    )
+
+    assert partial_lesson.model_dump(by_alias=True, exclude_unset=True) == {
+        "_id": "5f9f1b9b9c9d1c0b8c8b9c9d",
+        "title": "Basics",
+        # Validators of the full model still apply
+        "category": "grammar",
+    }
@@ -0,0 +1,25 @@
+from app.indexes import INDEXES
+from app.query_audit import QUERY_SHAPES, find_stages
+
+
+def test_find_stages_walks_nested_plans():
+    plan = {
+        "stage": "FETCH",
+        "inputStage": {
+            "stage": "SORT_MERGE",
+            "inputStages": [{"stage": "IXSCAN"}, {"stage": "COLLSCAN"}],
+        },
+    }
+
+    assert find_stages(plan) == {"FETCH", "SORT_MERGE", "IXSCAN", "COLLSCAN"}
+
+
+def test_index_names_are_unique_per_collection():
+    for indexes in INDEXES.values():
+        names = [index.document["name"] for index in indexes]
+        assert len(names) == len(set(names))
+
+
+def test_audited_collections_have_indexes():
+    for shape in QUERY_SHAPES:
+        assert shape.collection in INDEXES
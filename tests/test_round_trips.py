@@ -0,0 +1,78 @@
+import pytest
+from bson import ObjectId
+
+from models.update_card import UpdateCard
+from models.update_lesson import UpdateLesson
+from models.update_section import UpdateSection
+from models.update_user import UpdateUser
+from services.cards import CardService
+from services.lessons import LessonService
+from services.sections import SectionService
+from services.users import UserService
+from tests.factories import CardFactory, LessonFactory, SectionFactory, UserFactory
+
+
+@pytest.mark.asyncio
+async def test_card_writes_do_not_read_back(db, mongo_commands):
+    service = CardService(db)
+
+    with mongo_commands.expect("insert"):
+        card = await service.create_card(CardFactory.build(lesson_ids=[]))
+
+    with mongo_commands.expect("findAndModify"):
+        updated = await service.update_card(card.id, UpdateCard(front_text="New"))
+
+    assert updated.front_text == "New"
+    assert updated.back_text == card.back_text
+
+
+@pytest.mark.asyncio
+async def test_lesson_writes_do_not_read_back(db, mongo_commands):
+    service = LessonService(db)
+    card_id = str(ObjectId())
+
+    with mongo_commands.expect("insert", "update"):
+        lesson = await service.create_lesson(
+            LessonFactory.build(card_ids=[card_id], section_id=None, sentences=[])
+        )
+
+    # The card links are diffed from the pre-image: the removed card is pulled in
+    # one update, and no addToSet is sent as no card was added
+    with mongo_commands.expect("findAndModify", "update"):
+        updated = await service.update_lesson(
+            lesson.id, UpdateLesson(title="Renamed", card_ids=[])
+        )
+
+    assert updated.title == "Renamed"
+    assert updated.card_ids == []
+
+
+@pytest.mark.asyncio
+async def test_section_writes_do_not_read_back(db, mongo_commands):
+    service = SectionService(db)
+
+    with mongo_commands.expect("insert"):
+        section = await service.create_section(SectionFactory.build(lesson_ids=[]))
+
+    with mongo_commands.expect("findAndModify"):
+        updated = await service.update_section(section.id, UpdateSection(name="New"))
+
+    assert updated.name == "New"
+
+
+@pytest.mark.asyncio
+async def test_update_user_revokes_tokens_in_the_same_command(db, mongo_commands):
+    user = UserFactory.build(roles=["user"], token_version=0)
+    result = await db["users"].insert_one(
+        user.model_dump(by_alias=True, exclude={"id"})
+    )
+    user_id = str(result.inserted_id)
+    service = UserService(db)
+
+    with mongo_commands.expect("findAndModify"):
+        updated = await service.update_user(user_id, UpdateUser(roles=["admin"]))
+
+    assert updated.roles == ["admin"]
+    assert updated.token_version == 1
+    stored = await db["users"].find_one({"_id": result.inserted_id})
+    assert stored["token_version"] == 1
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from app.single_flight import SingleFlight
+
+
+class Backend:
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def read(self):
+        self.calls += 1
+        # Each call returns its own number, even if a later call started before
+        # it was released
+        call = self.calls
+        await self.release.wait()
+        return f"result {call}"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_flight():
+    flight = SingleFlight("read")
+    backend = Backend()
+
+    calls = [asyncio.create_task(flight.do("key", backend.read)) for _ in range(5)]
+    await asyncio.sleep(0)
+    backend.release.set()
+
+    assert await asyncio.gather(*calls) == ["result 1"] * 5
+    assert backend.calls == 1
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "shared": 4, "stale": 0}
+
+
+@pytest.mark.asyncio
+async def test_exceptions_reach_every_caller():
+    flight = SingleFlight("read")
+
+    async def failing():
+        await asyncio.sleep(0)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        flight.do("key", failing), flight.do("key", failing), return_exceptions=True
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_cancel_followers():
+    flight = SingleFlight("read")
+    backend = Backend()
+
+    leader = asyncio.create_task(flight.do("key", backend.read))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do("key", backend.read))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    backend.release.set()
+
+    assert await follower == "result 1"
+
+
+@pytest.mark.asyncio
+async def test_new_generation_starts_a_new_flight():
+    generation = 1
+    flight = SingleFlight("read", generation=lambda: generation)
+    backend = Backend()
+
+    first = asyncio.create_task(flight.do("key", backend.read))
+    await asyncio.sleep(0)
+    generation = 2
+    second = asyncio.create_task(flight.do("key", backend.read))
+    await asyncio.sleep(0)
+    backend.release.set()
+
+    assert await first == "result 1"
+    assert await second == "result 2"
+
+
+@pytest.mark.asyncio
+async def test_stale_result_is_served_while_refreshing():
+    flight = SingleFlight("read", stale_for=60)
+    backend = Backend()
+    backend.release.set()
+    assert await flight.do("key", backend.read) == "result 1"
+
+    backend.release.clear()
+    refresh = asyncio.create_task(flight.do("key", backend.read))
+    await asyncio.sleep(0)
+
+    # The refresh is still running, so the previous result answers at once
+    assert await flight.do("key", backend.read) == "result 1"
+    assert flight.stats()["stale"] == 1
+
+    backend.release.set()
+    assert await refresh == "result 2"
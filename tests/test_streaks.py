@@ -1,7 +1,9 @@
 from datetime import datetime, timedelta, timezone
 
 import pytest
+from bson import ObjectId
 
+from services.lessons import LessonService
 from tests.factories import UserFactory
 from utils.streaks import update_user_streak
 
@@ -96,3 +98,54 @@ def test_timezone_same_day():
     update_user_streak(user, now=now_utc)
 
     assert user.current_streak == 5
+
+
+async def stored_streak(db, user: dict, timezone_name: str, now: datetime) -> int:
+    """The streak stored after the review progress pipeline ran on ``user``."""
+    result = await db["users"].insert_one(user)
+    await db["users"].update_one(
+        {"_id": result.inserted_id},
+        LessonService._progress_update_pipeline(
+            str(ObjectId()), 10, timezone_name, now
+        ),
+    )
+    return (await db["users"].find_one({"_id": result.inserted_id}))["current_streak"]
+
+
+@pytest.mark.asyncio
+async def test_progress_pipeline_starts_a_streak(db):
+    now = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+    assert await stored_streak(db, {"xp": 0, "level": 1}, "UTC", now) == 1
+
+
+@pytest.mark.asyncio
+async def test_progress_pipeline_resets_a_missed_streak(db):
+    now = datetime(2024, 1, 3, 12, 0, tzinfo=timezone.utc)
+    user = {"current_streak": 5, "last_activity_date": now - timedelta(days=2)}
+
+    assert await stored_streak(db, user, "UTC", now) == 1
+
+
+@pytest.mark.asyncio
+async def test_progress_pipeline_counts_days_in_the_user_timezone(db):
+    # 23:30 UTC is already the next day in Tokyo (UTC+9)
+    now = datetime(2024, 1, 1, 23, 30, tzinfo=timezone.utc)
+    user = {
+        "current_streak": 5,
+        "last_activity_date": datetime(2024, 1, 1, 10, 0, tzinfo=timezone.utc),
+    }
+
+    assert await stored_streak(db, dict(user), "Asia/Tokyo", now) == 6
+    assert await stored_streak(db, dict(user), "UTC", now) == 5
+
+
+@pytest.mark.asyncio
+async def test_progress_pipeline_invalid_timezone_falls_back_to_utc(db):
+    now = datetime(2024, 1, 1, 23, 30, tzinfo=timezone.utc)
+    user = {
+        "current_streak": 5,
+        "last_activity_date": datetime(2023, 12, 31, 10, 0, tzinfo=timezone.utc),
+    }
+
+    assert await stored_streak(db, user, "Invalid/Timezone", now) == 6
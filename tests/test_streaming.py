@@ -0,0 +1,164 @@
+import json
+
+import pytest
+from starlette.requests import Request
+
+from models.cards import Card
+from utils.streaming import (
+    iter_request_lines,
+    ndjson_response,
+    ndjson_stream,
+    parse_csv_rows,
+    parse_ndjson_rows,
+    wants_ndjson,
+)
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+        self.closed = False
+
+    def batch_size(self, size):
+        self.size = size
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+    async def close(self):
+        self.closed = True
+
+
+def request_with_body(*chunks: bytes) -> Request:
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": True} for chunk in chunks
+    ]
+    messages.append({"type": "http.request", "body": b"", "more_body": False})
+
+    async def receive():
+        return messages.pop(0)
+
+    return Request({"type": "http", "headers": []}, receive)
+
+
+def test_wants_ndjson_reads_accept_header():
+    request = Request(
+        {"type": "http", "headers": [(b"accept", b"application/x-ndjson")]}
+    )
+
+    assert wants_ndjson(request)
+    assert not wants_ndjson(Request({"type": "http", "headers": []}))
+
+
+@pytest.mark.asyncio
+async def test_ndjson_response_streams_batches():
+    documents = [
+        {"_id": f"5f9f1b9b9c9d1c0b8c8b9c9{i}", "front_text": str(i), "back_text": "b"}
+        for i in range(5)
+    ]
+    cursor = FakeCursor(documents)
+
+    response = ndjson_response(cursor, Card, batch_size=2)
+    chunks = [chunk async for chunk in response.body_iterator]
+
+    # Two full batches and the remainder
+    assert len(chunks) == 3
+    lines = b"".join(chunks).decode().splitlines()
+    assert [json.loads(line)["front_text"] for line in lines] == [
+        "0",
+        "1",
+        "2",
+        "3",
+        "4",
+    ]
+    assert cursor.closed
+
+
+@pytest.mark.asyncio
+async def test_ndjson_stream_reads_the_request_body_while_streaming():
+    request = request_with_body(b'{"a": 1}\n', b'{"b": 2}\n')
+
+    async def echo_rows():
+        async for line_number, row in parse_ndjson_rows(iter_request_lines(request)):
+            yield {"line": line_number, "row": row}
+        yield {"done": True}
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    response = ndjson_stream(echo_rows(), status_code=201)
+    await response(request.scope, request.receive, send)
+
+    assert sent[0]["status"] == 201
+    body = b"".join(message.get("body", b"") for message in sent[1:])
+    assert [json.loads(line) for line in body.decode().splitlines()] == [
+        {"line": 1, "row": {"a": 1}},
+        {"line": 2, "row": {"b": 2}},
+        {"done": True},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_request_lines_are_split_across_chunks():
+    # The body is cut in the middle of a line and of a multi-byte character
+    body = '{"a": 1}\n\n{"b": "学"}'.encode()
+    request = request_with_body(body[:5], body[5:-3], body[-3:])
+
+    lines = [line async for line in iter_request_lines(request)]
+
+    assert lines == [(1, '{"a": 1}'), (3, '{"b": "学"}')]
+
+
+@pytest.mark.asyncio
+async def test_parse_rows_reports_invalid_lines():
+    request = request_with_body(b'{"front_text": "a"}\nnot json\n[1]\n')
+
+    rows = [row async for row in parse_ndjson_rows(iter_request_lines(request))]
+
+    assert rows[0] == (1, {"front_text": "a"})
+    assert rows[1][0] == 2 and rows[1][1].startswith("Invalid JSON")
+    assert rows[2] == (3, "Expected a JSON object")
+
+
+@pytest.mark.asyncio
+async def test_parse_rows_reports_lines_that_are_not_utf8():
+    request = request_with_body(b'\xef\xbb\xbf{"a": 1}\n{"b": "\xff"}\n{"c": 3}\n')
+
+    rows = [row async for row in parse_ndjson_rows(iter_request_lines(request))]
+
+    assert rows == [(1, {"a": 1}), (2, "Invalid UTF-8"), (3, {"c": 3})]
+
+
+@pytest.mark.asyncio
+async def test_parse_csv_rows_splits_list_fields():
+    request = request_with_body(
+        b"front_text,back_text,lesson_ids\r\n"
+        b'"Hello, there",\xe3\x81\x93\xe3\x82\x93,a;b\r\n'
+        b"only,two\r\n"
+    )
+
+    rows = [
+        row
+        async for row in parse_csv_rows(
+            iter_request_lines(request), list_fields={"lesson_ids"}
+        )
+    ]
+
+    assert rows == [
+        (
+            2,
+            {
+                "front_text": "Hello, there",
+                "back_text": "こん",
+                "lesson_ids": ["a", "b"],
+            },
+        ),
+        (3, "Expected 3 columns, got 2"),
+    ]
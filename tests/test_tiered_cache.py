@@ -0,0 +1,163 @@
+import pytest
+from aiocache.serializers import PickleSerializer
+
+from app import cache_config
+from app.tiered_cache import ENTRY_OVERHEAD_BYTES, ByteSizeLRU, TieredCache
+from tests.redis_double import redis_cache_double
+
+
+def entry_size(key: str, value: bytes) -> int:
+    return len(key) + len(value) + ENTRY_OVERHEAD_BYTES
+
+
+def test_least_recently_used_entries_are_evicted_by_size():
+    value = b"x" * 100
+    cache = ByteSizeLRU(max_bytes=2 * entry_size("a", value), max_entry_bytes=1024)
+    cache.set("a", value, ttl=60)
+    cache.set("b", value, ttl=60)
+
+    # Touch a so that b becomes the least recently used entry
+    cache.get("a")
+    cache.set("c", value, ttl=60)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == value
+    assert cache.get("c") == value
+    assert cache.size_bytes == 2 * entry_size("a", value)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_oversized_entries_are_not_kept():
+    cache = ByteSizeLRU(max_bytes=10_000, max_entry_bytes=500)
+    cache.set("small", b"x" * 10, ttl=60)
+    cache.set("large", b"x" * 1000, ttl=60)
+
+    assert cache.get("large") is None
+    assert cache.get("small") is not None
+    assert cache.stats()["rejected"] == 1
+
+
+def test_replacing_an_entry_updates_its_size():
+    cache = ByteSizeLRU(max_bytes=10_000, max_entry_bytes=10_000)
+    cache.set("a", b"x" * 100, ttl=60)
+    cache.set("a", b"x" * 10, ttl=60)
+
+    assert cache.size_bytes == entry_size("a", b"x" * 10)
+    assert len(cache) == 1
+
+
+def test_expired_entries_are_not_returned():
+    cache = ByteSizeLRU(max_bytes=10_000, max_entry_bytes=10_000)
+    cache.set("a", b"x", ttl=-1)
+
+    assert cache.get("a") is None
+    assert cache.size_bytes == 0
+    assert cache.stats()["expirations"] == 1
+
+
+def test_clear_by_prefix():
+    cache = ByteSizeLRU(max_bytes=10_000, max_entry_bytes=10_000)
+    cache.set("download_1", b"x", ttl=60)
+    cache.set("download_2", b"x", ttl=60)
+    cache.set("all_sections", b"x", ttl=60)
+
+    cache.clear("download_")
+
+    assert len(cache) == 1
+    assert cache.size_bytes == entry_size("all_sections", b"x")
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_bounds_serialized_values():
+    cache = TieredCache(
+        l1_max_bytes=4096, l1_max_entry_bytes=4096, serializer=PickleSerializer()
+    )
+    for section_id in range(20):
+        await cache.set(f"download_{section_id}", {"lessons": ["x" * 500]}, ttl=600)
+
+    stats = cache.stats()
+    assert stats["l1"]["size_bytes"] <= 4096
+    assert stats["l1"]["evictions"] > 0
+    assert await cache.get("download_19") == {"lessons": ["x" * 500]}
+    assert await cache.get("download_0") is None
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_clear_namespace():
+    cache = TieredCache(serializer=PickleSerializer())
+    await cache.set("all_lessons", [1, 2])
+    await cache.set("download_1", {"lessons": []})
+
+    await cache.clear(namespace="download_")
+
+    assert await cache.get("download_1") is None
+    assert await cache.get("all_lessons") == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_clear_namespace_removes_the_same_keys_from_both_tiers():
+    l2 = redis_cache_double()
+    cache = TieredCache(serializer=PickleSerializer())
+    cache.l2 = l2
+    peer = TieredCache(serializer=PickleSerializer())
+    peer.l2 = l2
+    for key in ("all_lessons@0", "all_lessons@1f", "all_sections@0"):
+        await cache.set(key, [key])
+    # The peer holds its own L1 copy, as if it had read the entry before
+    assert await peer.get("all_lessons@1f") == ["all_lessons@1f"]
+
+    await cache.clear(namespace="all_lessons")
+
+    assert await cache.get("all_lessons@0") is None
+    assert await cache.get("all_lessons@1f") is None
+    assert list(l2.client.data) == [b"all_sections@0"]
+    # Once the invalidation reaches the peer, Redis no longer holds the old entry
+    peer.clear_local("all_lessons")
+    assert await peer.get("all_lessons@1f") is None
+    assert await peer.get("all_sections@0") == ["all_sections@0"]
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_clear_only_deletes_its_own_redis_keys():
+    cache = TieredCache(serializer=PickleSerializer())
+    cache.l2 = redis_cache_double(key_prefix="app:cache:")
+    await cache.set("all_lessons@0", [1])
+    await cache.set("download_1@0", {"lessons": []})
+    await cache.l2.client.set("app:sessions:1", b"kept")
+
+    await cache.clear()
+
+    assert await cache.get("all_lessons@0") is None
+    assert list(cache.l2.client.data) == [b"app:sessions:1"]
+    assert cache.l2.client.commands == ["SCAN"]
+
+
+def test_tiered_cache_requires_a_key_prefix_for_redis():
+    with pytest.raises(ValueError, match="key prefix"):
+        TieredCache(redis_url="redis://localhost:6379/0")
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_rejects_increment_and_raw_without_redis():
+    cache = TieredCache(serializer=PickleSerializer())
+    await cache.set("counter", 1)
+
+    with pytest.raises(TypeError, match="cannot be incremented"):
+        await cache.increment("counter")
+    with pytest.raises(RuntimeError, match="no Redis tier"):
+        await cache.raw("get", "counter")
+
+
+def test_redis_backend_requires_a_redis_url(monkeypatch):
+    monkeypatch.setattr(cache_config.settings, "CACHE_BACKEND", "redis")
+    monkeypatch.setattr(cache_config.settings, "CACHE_REDIS_URL", None)
+
+    with pytest.raises(ValueError, match="CACHE_REDIS_URL"):
+        cache_config.setup_cache()
+
+    monkeypatch.setattr(
+        cache_config.settings, "CACHE_REDIS_URL", "redis://cache.internal:6379/0"
+    )
+    assert cache_config._backend_config()["redis_url"] == (
+        "redis://cache.internal:6379/0"
+    )
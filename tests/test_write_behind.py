@@ -0,0 +1,165 @@
+import asyncio
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+from app.write_behind import WriteBehindBuffer
+
+
+class FakeCollection:
+    def __init__(self):
+        self.batches = []
+
+    async def insert_many(self, documents, ordered=True):
+        assert ordered is False
+        # The ids the buffer gives documents are left out to keep assertions short
+        self.batches.append(
+            [
+                {key: value for key, value in document.items() if key != "_id"}
+                for document in documents
+            ]
+        )
+
+
+@pytest.mark.asyncio
+async def test_flushes_when_batch_is_full():
+    collection = FakeCollection()
+    buffer = WriteBehindBuffer(
+        "test", max_batch_size=3, flush_interval_seconds=60, max_queue_size=10
+    )
+    buffer.start(collection)
+
+    for i in range(3):
+        await buffer.put({"n": i})
+    await asyncio.sleep(0.01)
+
+    assert collection.batches == [[{"n": 0}, {"n": 1}, {"n": 2}]]
+    await buffer.stop()
+
+
+@pytest.mark.asyncio
+async def test_flushes_after_interval():
+    collection = FakeCollection()
+    buffer = WriteBehindBuffer(
+        "test", max_batch_size=100, flush_interval_seconds=0.01, max_queue_size=10
+    )
+    buffer.start(collection)
+
+    await buffer.put({"n": 0})
+    await asyncio.sleep(0.05)
+
+    assert collection.batches == [[{"n": 0}]]
+    await buffer.stop()
+
+
+@pytest.mark.asyncio
+async def test_stop_flushes_pending_documents():
+    collection = FakeCollection()
+    buffer = WriteBehindBuffer(
+        "test", max_batch_size=100, flush_interval_seconds=60, max_queue_size=10
+    )
+    buffer.start(collection)
+
+    await buffer.put({"n": 0})
+    await buffer.put({"n": 1})
+    await buffer.stop()
+
+    assert collection.batches == [[{"n": 0}, {"n": 1}]]
+    assert not buffer.running
+    assert buffer.stats()["written"] == 2
+
+
+class BlockedCollection(FakeCollection):
+    def __init__(self):
+        super().__init__()
+        self.unblocked = asyncio.Event()
+
+    async def insert_many(self, documents, ordered=True):
+        await self.unblocked.wait()
+        await super().insert_many(documents, ordered)
+
+
+@pytest.mark.asyncio
+async def test_put_waits_while_queue_is_full():
+    collection = BlockedCollection()
+    buffer = WriteBehindBuffer(
+        "test", max_batch_size=1, flush_interval_seconds=60, max_queue_size=1
+    )
+    buffer.start(collection)
+
+    await buffer.put({"n": 0})
+    await asyncio.sleep(0)  # the flush loop takes the first document and blocks
+    await buffer.put({"n": 1})
+
+    blocked = asyncio.create_task(buffer.put({"n": 2}))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    collection.unblocked.set()
+    await blocked
+    await buffer.stop()
+    assert collection.batches == [[{"n": 0}], [{"n": 1}], [{"n": 2}]]
+
+
+class FailingCollection(FakeCollection):
+    async def insert_many(self, documents, ordered=True):
+        if any(document.get("bad") for document in documents):
+            raise RuntimeError("cannot encode document")
+        await super().insert_many(documents, ordered)
+
+
+@pytest.mark.asyncio
+async def test_unexpected_flush_error_keeps_the_loop_running():
+    collection = FailingCollection()
+    buffer = WriteBehindBuffer(
+        "test", max_batch_size=1, flush_interval_seconds=60, max_queue_size=10
+    )
+    buffer.start(collection)
+
+    await buffer.put({"bad": True})
+    await buffer.put({"n": 1})
+    await asyncio.sleep(0.01)
+
+    assert buffer.running
+    assert collection.batches == [[{"n": 1}]]
+    await buffer.stop()
+    assert buffer.stats()["failed"] == 1
+    assert buffer.stats()["written"] == 1
+
+
+class FlakyCollection(FakeCollection):
+    def __init__(self, failures: int):
+        super().__init__()
+        self.failures = failures
+        self.attempted_ids = []
+
+    async def insert_many(self, documents, ordered=True):
+        self.attempted_ids.append([document["_id"] for document in documents])
+        if self.failures:
+            self.failures -= 1
+            raise AutoReconnect("primary stepped down")
+        await super().insert_many(documents, ordered)
+
+
+@pytest.mark.asyncio
+async def test_transient_flush_error_is_retried():
+    collection = FlakyCollection(failures=1)
+    buffer = WriteBehindBuffer(
+        "test",
+        max_batch_size=100,
+        flush_interval_seconds=60,
+        max_queue_size=10,
+        retry_backoff_seconds=0,
+    )
+    buffer.start(collection)
+
+    await buffer.put({"n": 0})
+    await buffer.stop()
+
+    assert collection.batches == [[{"n": 0}]]
+    # The retry resends the id given before the first attempt
+    first_attempt, retry = collection.attempted_ids
+    assert first_attempt == retry
+    assert buffer.stats()["written"] == 1
+    assert buffer.stats()["retries"] == 1
+    assert buffer.stats()["failed"] == 0
@@ -1,3 +1,9 @@
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+
+from services.lessons import LessonService
 from utils.xp import add_xp_to_user, calculate_xp_for_next_level
 
 
@@ -46,3 +52,40 @@ def test_multi_level_up():
     assert new_level == 3
     assert new_xp == 118  # 500 - 100 - 282
     assert leveled_up is True
+
+
+@pytest.mark.asyncio
+async def test_progress_pipeline_levels_up_across_several_thresholds(db):
+    lesson_id = str(ObjectId())
+    result = await db["users"].insert_one({"xp": 50, "level": 1})
+
+    await db["users"].update_one(
+        {"_id": result.inserted_id},
+        LessonService._progress_update_pipeline(
+            lesson_id, 450, "UTC", datetime.now(timezone.utc)
+        ),
+    )
+
+    # Same as add_xp_to_user: 500 - 100 (L1->L2) - 282 (L2->L3) = 118 at level 3
+    user = await db["users"].find_one({"_id": result.inserted_id})
+    assert (user["xp"], user["level"]) == (118, 3)
+    assert user["completed_lessons"] == [lesson_id]
+
+
+@pytest.mark.asyncio
+async def test_progress_pipeline_awards_repeat_xp_once_completed(db):
+    lesson_id = str(ObjectId())
+    result = await db["users"].insert_one(
+        {"xp": 98, "level": 1, "completed_lessons": [lesson_id]}
+    )
+
+    await db["users"].update_one(
+        {"_id": result.inserted_id},
+        LessonService._progress_update_pipeline(
+            lesson_id, 20, "UTC", datetime.now(timezone.utc)
+        ),
+    )
+
+    user = await db["users"].find_one({"_id": result.inserted_id})
+    assert (user["xp"], user["level"]) == (3, 2)
+    assert user["completed_lessons"] == [lesson_id]
@@ -0,0 +1,111 @@
+import base64
+import binascii
+import re
+from typing import Generic, TypeVar
+
+from bson import json_util
+from bson.errors import BSONError
+from fastapi import HTTPException
+from pydantic import BaseModel
+from pymongo.asynchronous.collection import AsyncCollection
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+T = TypeVar("T")
+
+
+class CursorPage(BaseModel, Generic[T]):
+    items: list[T]
+    # Opaque token to pass as ``cursor`` to fetch the next page, None on the last
+    next_cursor: str | None = None
+
+
+def encode_cursor(values: dict) -> str:
+    """Encode the sort key values of the last returned document into a token."""
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, BSONError, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor") from None
+
+    if not isinstance(values, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def prefix_filter(fields: list[str], prefix: str | None) -> dict:
+    """
+    Match documents where any of the given fields starts with ``prefix``.
+    Anchored, case-sensitive regexes can use an index on the field.
+    """
+    if not prefix:
+        return {}
+
+    pattern = {"$regex": f"^{re.escape(prefix)}"}
+    return {"$or": [{field: pattern} for field in fields]}
+
+
+def keyset_filter(sort: list[tuple[str, int]], values: dict) -> dict:
+    """
+    Build the filter selecting the documents that come after ``values`` in the
+    given sort order. For a sort on (a, b) this is
+    ``a > va OR (a == va AND b > vb)``, with comparisons flipped for descending
+    keys.
+    """
+    clauses = []
+    for i, (key, direction) in enumerate(sort):
+        # Only scalar values are accepted so a crafted cursor cannot inject operators
+        if key not in values or isinstance(values[key], (dict, list)):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+        clause = {prev_key: values[prev_key] for prev_key, _ in sort[:i]}
+        clause[key] = {"$gt" if direction == 1 else "$lt": values[key]}
+        clauses.append(clause)
+
+    return {"$or": clauses}
+
+
+async def paginate(
+    collection: AsyncCollection,
+    query: dict,
+    sort: list[tuple[str, int]],
+    limit: int | None = None,
+    cursor: str | None = None,
+    projection: dict | None = None,
+) -> tuple[list[dict], str | None]:
+    """
+    Fetch one page of documents using keyset pagination.
+    The document id is always added as the final sort key so that the order is
+    total. Returns the documents of the page and the cursor of the next page.
+    """
+    page_size = min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    if not any(key == "_id" for key, _ in sort):
+        sort = [*sort, ("_id", sort[-1][1] if sort else 1)]
+
+    if cursor:
+        after = keyset_filter(sort, decode_cursor(cursor))
+        query = {"$and": [query, after]} if query else after
+
+    if projection and all(projection.values()):
+        # The sort keys are needed to build the next cursor
+        projection = {**projection, **{key: 1 for key, _ in sort}}
+
+    # Fetch one extra document to know whether there is a next page
+    documents = (
+        await collection.find(query, projection)
+        .sort(sort)
+        .limit(page_size + 1)
+        .to_list(length=page_size + 1)
+    )
+
+    next_cursor = None
+    if len(documents) > page_size:
+        documents = documents[:page_size]
+        last = documents[-1]
+        next_cursor = encode_cursor({key: last.get(key) for key, _ in sort})
+
+    return documents, next_cursor
@@ -0,0 +1,88 @@
+from functools import lru_cache
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, Field, create_model
+from starlette.responses import JSONResponse
+
+from utils.pagination import CursorPage
+
+FIELDS_DESCRIPTION = (
+    "Comma-separated list of fields to return, e.g. "
+    "`fields=title,category,order_index,section_id`. Returns every field if omitted."
+)
+
+
+def parse_fields(fields: str | None) -> list[str] | None:
+    """
+    Parse a comma-separated ``fields`` query parameter into a sorted list of
+    unique field names. Returns None when no sparse fieldset was requested.
+    """
+    if not fields:
+        return None
+
+    parsed = sorted({field.strip() for field in fields.split(",") if field.strip()})
+    return parsed or None
+
+
+def fields_cache_suffix(fields: str | None) -> str:
+    """Suffix that keeps the cache entries of different fieldsets apart."""
+    parsed = parse_fields(fields)
+    return f":fields={','.join(parsed)}" if parsed else ""
+
+
+def build_projection(model: type[BaseModel], fields: list[str]) -> dict:
+    """
+    Convert a list of model field names (or their aliases) into a Mongo
+    projection. The document id is always included.
+    """
+    aliases = {name: field.alias or name for name, field in model.model_fields.items()}
+    known_names = set(aliases) | set(aliases.values())
+
+    unknown_fields = [field for field in fields if field not in known_names]
+    if unknown_fields:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown field(s) for {model.__name__}: {', '.join(unknown_fields)}",
+        )
+
+    projection = {"_id": 1}
+    for field in fields:
+        projection[aliases.get(field, field)] = 1
+    return projection
+
+
+@lru_cache
+def partial_model(model: type[BaseModel]) -> type[BaseModel]:
+    """
+    Build a subclass of ``model`` whose fields are all optional, used to validate
+    documents loaded with a projection. Validators of the full model still apply
+    to the fields that are present.
+    """
+    optional_fields = {
+        name: (field.annotation | None, Field(default=None, alias=field.alias))
+        for name, field in model.model_fields.items()
+    }
+    return create_model(f"Partial{model.__name__}", __base__=model, **optional_fields)
+
+
+def sparse_response(items: list[BaseModel] | CursorPage) -> JSONResponse:
+    """Serialize partial models with only the fields that were loaded."""
+    if isinstance(items, CursorPage):
+        return JSONResponse(
+            content={
+                "items": jsonable_encoder(
+                    [
+                        item.model_dump(by_alias=True, exclude_unset=True)
+                        for item in items.items
+                    ]
+                ),
+                "next_cursor": items.next_cursor,
+            }
+        )
+
+    return JSONResponse(
+        content=jsonable_encoder(
+            [item.model_dump(by_alias=True, exclude_unset=True) for item in items]
+        )
+    )
@@ -1,19 +1,27 @@
 import zoneinfo
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timedelta, timezone, tzinfo
 
 from models.users import User
 
 
-def update_user_streak(user: User, now: datetime | None = None):
+def resolve_timezone(timezone_name: str) -> tuple[str, tzinfo]:
     """
-    Updates the user's streak based on their last activity date.
+    Resolve a user's timezone name, falling back to UTC if it is invalid.
+    Returns the name to use along with the tzinfo object.
     """
-
     try:
-        user_tz = zoneinfo.ZoneInfo(user.timezone)
+        return timezone_name, zoneinfo.ZoneInfo(timezone_name)
     except Exception:
         # Fallback to UTC if timezone is invalid
-        user_tz = timezone.utc
+        return "UTC", timezone.utc
+
+
+def update_user_streak(user: User, now: datetime | None = None):
+    """
+    Updates the user's streak based on their last activity date.
+    """
+
+    _, user_tz = resolve_timezone(user.timezone)
 
     if now is None:
         now_utc = datetime.now(timezone.utc)
@@ -44,3 +52,44 @@ def update_user_streak(user: User, now: datetime | None = None):
         user.current_streak = 1
 
     user.last_activity_date = now_utc
+
+
+def streak_update_expression(timezone_name: str, now: datetime) -> dict:
+    """
+    Aggregation expression computing a user's new streak inside an update
+    pipeline, so it is derived from the stored document rather than a possibly
+    stale copy. Mirrors update_user_streak.
+    """
+    timezone_name, user_tz = resolve_timezone(timezone_name)
+    today = now.astimezone(user_tz).date()
+    yesterday = today - timedelta(days=1)
+
+    last_date = {
+        "$dateToString": {
+            "format": "%Y-%m-%d",
+            "date": "$last_activity_date",
+            "timezone": timezone_name,
+        }
+    }
+    current_streak = {"$ifNull": ["$current_streak", 0]}
+
+    return {
+        "$switch": {
+            "branches": [
+                {
+                    "case": {"$not": [{"$ifNull": ["$last_activity_date", False]}]},
+                    "then": 1,
+                },
+                # Same day: keep the streak, only the timestamp is updated
+                {
+                    "case": {"$eq": [last_date, today.isoformat()]},
+                    "then": current_streak,
+                },
+                {
+                    "case": {"$eq": [last_date, yesterday.isoformat()]},
+                    "then": {"$add": [current_streak, 1]},
+                },
+            ],
+            "default": 1,
+        }
+    }
@@ -0,0 +1,183 @@
+import codecs
+import csv
+import json
+from collections.abc import AsyncIterator, Collection
+
+from fastapi import Request
+from pydantic import BaseModel
+from pymongo.asynchronous.cursor import AsyncCursor
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_BATCH_SIZE = 500
+INVALID_UTF8_ERROR = "Invalid UTF-8"
+
+
+def wants_ndjson(request: Request) -> bool:
+    """Whether the client asked for a newline-delimited JSON stream."""
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def ndjson_response(
+    cursor: AsyncCursor,
+    model: type[BaseModel],
+    exclude_unset: bool = False,
+    exclude: set[str] | None = None,
+    batch_size: int = STREAM_BATCH_SIZE,
+) -> StreamingResponse:
+    """
+    Stream the documents of a cursor as newline-delimited JSON.
+    Documents are validated and encoded one at a time as the cursor fetches them,
+    and flushed to the client once per cursor batch, so memory use does not grow
+    with the size of the collection.
+    """
+    cursor.batch_size(batch_size)
+
+    async def encode_documents():
+        lines: list[bytes] = []
+        try:
+            async for document in cursor:
+                lines.append(
+                    model(**document)
+                    .model_dump_json(
+                        by_alias=True, exclude_unset=exclude_unset, exclude=exclude
+                    )
+                    .encode()
+                    + b"\n"
+                )
+                if len(lines) >= batch_size:
+                    yield b"".join(lines)
+                    lines = []
+
+            if lines:
+                yield b"".join(lines)
+        finally:
+            await cursor.close()
+
+    return StreamingResponse(encode_documents(), media_type=NDJSON_MEDIA_TYPE)
+
+
+class _RequestBodyStreamingResponse(StreamingResponse):
+    """
+    A StreamingResponse whose content is produced while the request body is still
+    being read. Starlette otherwise listens for the client disconnecting on the
+    same receive channel, where it would consume the body chunks the content is
+    waiting on; a disconnect still ends the stream, raised by the body reader.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def ndjson_stream(
+    items: AsyncIterator[dict], status_code: int = 200
+) -> StreamingResponse:
+    """
+    Stream dicts as newline-delimited JSON, each flushed as soon as it is
+    yielded. ``items`` may read the request body as it goes.
+    """
+
+    async def encode_items():
+        async for item in items:
+            yield json.dumps(item).encode() + b"\n"
+
+    return _RequestBodyStreamingResponse(
+        encode_items(), status_code=status_code, media_type=NDJSON_MEDIA_TYPE
+    )
+
+
+def _decode_line(line: bytes, line_number: int) -> str | None:
+    if line_number == 1:
+        line = line.removeprefix(codecs.BOM_UTF8)
+    try:
+        return line.decode("utf-8").rstrip("\r")
+    except UnicodeDecodeError:
+        return None
+
+
+async def iter_request_lines(
+    request: Request,
+) -> AsyncIterator[tuple[int, str | None]]:
+    """
+    Yield the non-blank lines of a request body with their 1-based line numbers,
+    decoding the body as it arrives instead of reading it into memory first.
+    Lines that are not valid UTF-8 are yielded as None, so the caller can report
+    them without rejecting the rest of the body.
+    """
+    # A newline byte never occurs inside a multi-byte UTF-8 character, so the
+    # body is split before decoding and each line is decoded on its own
+    buffer = b""
+    line_number = 0
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield line_number, _decode_line(line, line_number)
+
+    if buffer.strip():
+        yield line_number + 1, _decode_line(buffer, line_number + 1)
+
+
+async def parse_ndjson_rows(
+    lines: AsyncIterator[tuple[int, str | None]],
+) -> AsyncIterator[tuple[int, dict | str]]:
+    """
+    Parse each line as a JSON object. Lines that do not hold one are yielded with
+    an error message in place of the row, so the caller can report them.
+    """
+    async for line_number, line in lines:
+        if line is None:
+            yield line_number, INVALID_UTF8_ERROR
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, "Expected a JSON object"
+            continue
+        yield line_number, row
+
+
+async def parse_csv_rows(
+    lines: AsyncIterator[tuple[int, str | None]],
+    list_fields: Collection[str] = (),
+    list_separator: str = ";",
+) -> AsyncIterator[tuple[int, dict | str]]:
+    """
+    Parse CSV lines into dicts keyed by the header row. Values of ``list_fields``
+    are split on ``list_separator``. Every record must fit on one line.
+    """
+    header: list[str] | None = None
+    async for line_number, line in lines:
+        if line is None:
+            yield line_number, INVALID_UTF8_ERROR
+            continue
+        try:
+            (values,) = csv.reader([line])
+        except (csv.Error, ValueError):
+            yield line_number, "Invalid CSV record"
+            continue
+
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield line_number, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+
+        row = {}
+        for name, value in zip(header, values, strict=True):
+            if name in list_fields:
+                row[name] = [
+                    item.strip() for item in value.split(list_separator) if item.strip()
+                ]
+            else:
+                row[name] = value
+        yield line_number, row
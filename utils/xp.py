@@ -31,3 +31,43 @@ def add_xp_to_user(
             break
 
     return new_xp, new_level, leveled_up
+
+
+def xp_for_next_level_expression(level) -> dict:
+    """Aggregation expression equivalent to calculate_xp_for_next_level."""
+    return {"$trunc": {"$multiply": [100, {"$pow": [level, 1.5]}]}}
+
+
+def level_up_expression(xp, level, max_level_ups: int = 10) -> dict:
+    """
+    Aggregation expression equivalent to add_xp_to_user, for use inside an update
+    pipeline. Evaluates to a document with the new ``xp`` and ``level``.
+    Aggregation has no loops, so the level-up loop is unrolled over
+    ``max_level_ups`` iterations, far more than a single review can award.
+    """
+    return {
+        "$reduce": {
+            "input": {"$range": [0, max_level_ups]},
+            "initialValue": {"xp": xp, "level": level},
+            "in": {
+                "$cond": [
+                    {
+                        "$gte": [
+                            "$$value.xp",
+                            xp_for_next_level_expression("$$value.level"),
+                        ]
+                    },
+                    {
+                        "xp": {
+                            "$subtract": [
+                                "$$value.xp",
+                                xp_for_next_level_expression("$$value.level"),
+                            ]
+                        },
+                        "level": {"$add": ["$$value.level", 1]},
+                    },
+                    "$$value",
+                ]
+            },
+        }
+    }